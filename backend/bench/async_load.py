@@ -0,0 +1,177 @@
+# backend/bench/async_load.py
+"""
+Load test: sync (threadpool) vs. async (aiosqlite) database path.
+
+Seeds a temporary SQLite database, starts a uvicorn server in a subprocess
+whose app exposes the same work twice -- once as `def` routes on
+get_read_session/get_session and once as `async def` routes on the async
+sessions -- then drives both with the same number of concurrent clients and
+reports requests/sec and p50/p99 latency.
+
+Each request is a mood-list read plus the chart-data rollup read; with
+--write-ratio some requests instead insert a mood (create_mood vs.
+create_mood_async).
+
+  python -m bench.async_load --concurrency 200 --requests 4000
+  python -m bench.async_load --concurrency 500 --write-ratio 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+USERS = 200
+MOODS_PER_USER = 60
+
+def build_app():
+    from datetime import datetime, timedelta
+    from fastapi import Depends, FastAPI
+    from src.database import get_session, get_read_session, get_async_session, get_async_read_session
+    from src.crud_mood import (
+        create_mood, create_mood_async, list_moods_for_user, list_moods_for_user_async,
+        daily_rollups, daily_rollups_async,
+    )
+
+    app = FastAPI()
+
+    def _window():
+        today = datetime.utcnow().date()
+        return today - timedelta(days=29), today
+
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+
+    @app.get("/sync/read/{uid}")
+    def sync_read(uid: int, session = Depends(get_read_session)):
+        rows = list_moods_for_user(session, uid, limit=500)
+        return {"moods": len(rows), "days": len(daily_rollups(session, uid, *_window()))}
+
+    @app.get("/async/read/{uid}")
+    async def async_read(uid: int, session = Depends(get_async_read_session)):
+        rows = await list_moods_for_user_async(session, uid, limit=500)
+        return {"moods": len(rows), "days": len(await daily_rollups_async(session, uid, *_window()))}
+
+    @app.post("/sync/write/{uid}")
+    def sync_write(uid: int, session = Depends(get_session)):
+        return {"id": create_mood(session, uid, "load test", sentiment=0.1, risk="LOW").id}
+
+    @app.post("/async/write/{uid}")
+    async def async_write(uid: int, session = Depends(get_async_session)):
+        return {"id": (await create_mood_async(session, uid, "load test", sentiment=0.1, risk="LOW")).id}
+
+    return app
+
+def seed():
+    from datetime import datetime, timedelta
+    from sqlmodel import Session # type: ignore
+    from src.database import engine, create_db_and_tables
+    from src.models import User, Mood
+    from src.crud_mood import rebuild_mood_rollups
+
+    create_db_and_tables()
+    now = datetime.utcnow()
+    rng = random.Random(7)
+    with Session(engine) as s:
+        for i in range(USERS):
+            s.add(User(name=f"user{i}", email=f"user{i}@example.com", hashed_password="x"))
+        s.commit()
+        for uid in range(1, USERS + 1):
+            for j in range(MOODS_PER_USER):
+                s.add(Mood(user_id=uid, text="seed", date=now - timedelta(hours=12 * j), sentiment=rng.uniform(-1, 1), risk="LOW"))
+        s.commit()
+        rebuild_mood_rollups(s)
+
+def serve(port: int):
+    import uvicorn # type: ignore
+    uvicorn.run(build_app(), host="127.0.0.1", port=port, log_level="warning")
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def _drive(base: str, path: str, concurrency: int, total: int, write_ratio: float) -> dict:
+    import httpx
+
+    rng = random.Random(11)
+    plan = [("POST" if rng.random() < write_ratio else "GET", 1 + rng.randrange(USERS)) for _ in range(total)]
+    latencies, errors = [], 0
+    queue = iter(plan)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120.0) as client:
+        async def worker():
+            nonlocal errors
+            for method, uid in queue:
+                url = f"/{path}/{'write' if method == 'POST' else 'read'}/{uid}"
+                t = time.perf_counter()
+                try:
+                    r = await client.request(method, url)
+                    if r.status_code != 200:
+                        errors += 1
+                except Exception:
+                    errors += 1
+                latencies.append((time.perf_counter() - t) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2)
+    return {
+        "requests": total,
+        "errors": errors,
+        "requests_per_second": round(total / elapsed, 1),
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--write-ratio", type=float, default=0.0)
+    parser.add_argument("--serve", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve is not None:
+        serve(args.serve)
+        return 0
+
+    tmp = tempfile.mkdtemp(prefix="mh-async-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'load.db')}"
+    os.environ["DATABASE_READ_URL"] = ""
+    seed()
+
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, "-m", "bench.async_load", "--serve", str(port)], env=os.environ.copy())
+    base = f"http://127.0.0.1:{port}"
+    try:
+        import httpx
+        for _ in range(200):
+            try:
+                if httpx.get(f"{base}/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        report = {"concurrency": args.concurrency, "write_ratio": args.write_ratio}
+        for path in ("sync", "async"):
+            # short warm-up so both paths start with open connections
+            asyncio.run(_drive(base, path, min(args.concurrency, 20), 100, 0.0))
+            report[path] = asyncio.run(_drive(base, path, args.concurrency, args.requests, args.write_ratio))
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps(report, indent=2))
+    return 1 if report["sync"]["errors"] or report["async"]["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
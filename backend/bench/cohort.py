@@ -0,0 +1,166 @@
+# backend/bench/cohort.py
+"""
+Cohort analytics for one therapist with a large caseload.
+
+Seeds --patients patients linked to one therapist by a booking, with
+--days days of MoodDaily rollups each (--density of the days have entries),
+into a temporary SQLite database. Then times:
+  - the per-patient loop it replaces (avg_mood_for_user 7/30 + daily_rollups
+    per patient), on --baseline-sample patients and extrapolated,
+  - the cold load (caseload + one rollup query into the matrices) for the
+    default 90-day window and for a year,
+  - analyze() over 30/90/365 days (the vectorized part),
+  - a cached request, and a mood write followed by a request.
+Checks the 7/30-day averages against avg_mood_for_user and the trend
+against numpy.polyfit for a sample of patients, and the in-place updates
+against a fresh load.
+
+  python -m bench.cohort --patients 10000 --days 365
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--density", type=float, default=0.8, help="share of days with at least one entry")
+    parser.add_argument("--baseline-sample", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    tmp = tempfile.mkdtemp(prefix="mh-cohort-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'cohort.db')}"
+    os.environ["DATABASE_READ_URL"] = ""
+
+    import numpy as np
+    from sqlmodel import Session # type: ignore
+    from src import models  # noqa: F401
+    from src.database import engine, create_db_and_tables
+    from src.crud_mood import avg_mood_for_user, daily_rollups, create_mood
+    from src.cohort import CohortCache
+
+    create_db_and_tables()
+    now = datetime.utcnow()
+    today = now.date()
+    t = time.perf_counter()
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("INSERT INTO user (id, name, email, hashed_password, role, created_at) VALUES (1, 't', 't@example.com', 'x', 'therapist', ?)", (now,))
+        cur.executemany("INSERT INTO user (id, name, email, hashed_password, role, created_at) VALUES (?, 'p', ?, 'x', 'patient', ?)",
+                        [(p, f"p{p}@example.com", now) for p in range(2, args.patients + 2)])
+        cur.executemany("INSERT INTO booking (patient_id, therapist_id, datetime, status, created_at) VALUES (?, 1, ?, 'scheduled', ?)",
+                        [(p, now, now) for p in range(2, args.patients + 2)])
+        days = [(today - timedelta(days=d)).isoformat() for d in range(args.days)]
+        rows = 0
+        for p in range(2, args.patients + 2):
+            drift = rng.uniform(-0.004, 0.004)
+            batch = []
+            for d, day in enumerate(days):
+                if rng.random() >= args.density:
+                    continue
+                n = rng.randint(1, 3)
+                h, m = rng.randint(0, n), 0
+                m = rng.randint(0, n - h)
+                batch.append((p, day, round(n * max(-1.0, min(1.0, rng.gauss(-drift * d, 0.4))), 3), n, h, m, n - h - m))
+            cur.executemany("INSERT INTO mooddaily (user_id, day, sentiment_sum, count, high, medium, low) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            rows += len(batch)
+        raw.commit()
+    finally:
+        raw.close()
+    seed_s = time.perf_counter() - t
+
+    sample = rng.sample(range(2, args.patients + 2), min(args.baseline_sample, args.patients))
+    with Session(engine) as s:
+        t = time.perf_counter()
+        for p in sample:
+            avg_mood_for_user(s, p, 7)
+            avg_mood_for_user(s, p, 30)
+            daily_rollups(s, p, today - timedelta(days=89), today)
+        per_patient = (time.perf_counter() - t) / len(sample)
+
+    cold = {}
+    for w in (90, min(365, args.days)):
+        with Session(engine) as s:
+            t = time.perf_counter()
+            CohortCache().load(s, 1, w)
+            cold[f"{w}_days_s"] = round(time.perf_counter() - t, 2)
+    cache = CohortCache()
+    with Session(engine) as s:
+        data = cache.load(s, 1, min(365, args.days))
+
+    analyze = {}
+    for w in (30, 90, min(365, args.days)):
+        times = []
+        for _ in range(5):
+            data.results.clear()
+            t = time.perf_counter()
+            result = data.analyze(days=w, sort="trend", limit=50)
+            times.append(time.perf_counter() - t)
+        analyze[f"{w}_days_ms"] = round(statistics.median(times) * 1000, 1)
+
+    with Session(engine) as s:
+        t = time.perf_counter()
+        for _ in range(100):
+            cache.load(s, 1).analyze(days=90)
+        cached_us = (time.perf_counter() - t) / 100 * 1e6
+
+    # checks against the per-user functions and numpy.polyfit
+    errors = 0
+    result = data.analyze(days=90, sort="trend", limit=args.patients)
+    by_id = {r["id"]: r for r in result["patients"]}
+    with Session(engine) as s:
+        for p in sample[:100]:
+            r = by_id[p]
+            errors += r["avg_7_days"] != avg_mood_for_user(s, p, 7)
+            errors += r["avg_30_days"] != avg_mood_for_user(s, p, 30)
+            pts = [((x.day - (today - timedelta(days=89))).days, x.sentiment_sum / x.count)
+                   for x in daily_rollups(s, p, today - timedelta(days=89), today)]
+            if len(pts) >= 2:
+                slope = np.polyfit([a for a, _ in pts], [b for _, b in pts], 1)[0]
+                errors += abs(round(slope, 4) - r["trend"]) > 1e-4
+
+    # writes go into the cached matrices; compare with a fresh load
+    import src.crud_mood as crud_mood
+    crud_mood.cohort_cache = cache
+    writes = []
+    with Session(engine) as s:
+        for p in sample[:50]:
+            t = time.perf_counter()
+            create_mood(s, p, "x", sentiment=rng.uniform(-1, 1), risk=rng.choice(["LOW", "MEDIUM", "HIGH"]))
+            cache.load(s, 1).analyze(days=90)
+            writes.append(time.perf_counter() - t)
+    updated = cache.load(Session(engine), 1).analyze(days=90, limit=args.patients)
+    fresh = CohortCache().load(Session(engine), 1).analyze(days=90, limit=args.patients)
+    update_mismatch = updated != fresh
+
+    report = {
+        "patients": args.patients,
+        "days": args.days,
+        "mooddaily_rows": rows,
+        "seed_s": round(seed_s, 1),
+        "per_patient_loop": {"per_patient_ms": round(per_patient * 1000, 2),
+                             "caseload_estimate_s": round(per_patient * args.patients, 2)},
+        "cold_load": cold,
+        "analyze": analyze,
+        "cached_request_us": round(cached_us, 1),
+        "write_then_request_ms": round(statistics.median(writes) * 1000, 1),
+        "check_errors": int(errors),
+        "incremental_vs_fresh_mismatch": update_mismatch,
+        "summary_90_days": fresh["summary"],
+        "cache": cache.stats(),
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if errors or update_mismatch else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# backend/bench/db_concurrency.py
+"""
+Concurrency stress test for the database engine layer.
+
+Against a temporary SQLite file, writer threads insert moods through
+crud_mood.create_mood (write engine) while reader threads run the GET-route
+queries (moods list, chart rollups, high-risk feed) on the read-only engine.
+Counts "database is locked" errors and reports throughput; exits non-zero if
+any lock error occurred.
+
+  python -m bench.db_concurrency --writers 8 --readers 32 --seconds 10
+  python -m bench.db_concurrency --journal-mode DELETE     # compare with the old default
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--journal-mode", default="WAL")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="mh-stress-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'stress.db')}"
+    os.environ["DATABASE_READ_URL"] = ""
+    os.environ["SQLITE_JOURNAL_MODE"] = args.journal_mode
+    os.environ["DB_POOL_SIZE"] = str(args.writers + args.readers)
+
+    # imported after the environment is set so the engines pick it up
+    from datetime import datetime, timedelta
+    from sqlmodel import Session, select # type: ignore
+    from src.database import engine, read_engine, create_db_and_tables
+    from src.models import User, Mood
+    from src.crud_mood import create_mood, list_moods_for_user, daily_rollups
+
+    create_db_and_tables()
+    with Session(engine) as s:
+        for i in range(args.users):
+            s.add(User(name=f"user{i}", email=f"user{i}@example.com", hashed_password="x"))
+        s.commit()
+
+    stop = time.perf_counter() + args.seconds
+    counts = {"writes": 0, "reads": 0, "lock_errors": 0, "other_errors": 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def classify(e):
+        bump("lock_errors" if "locked" in str(e).lower() else "other_errors")
+
+    def writer(n):
+        i = 0
+        while time.perf_counter() < stop:
+            try:
+                with Session(engine) as s:
+                    create_mood(s, user_id=1 + (n + i) % args.users, text="stress entry", sentiment=0.1, risk="LOW")
+                bump("writes")
+            except Exception as e:
+                classify(e)
+            i += 1
+
+    def reader(n):
+        i = 0
+        while time.perf_counter() < stop:
+            uid = 1 + (n + i) % args.users
+            try:
+                with Session(read_engine) as s:
+                    list_moods_for_user(s, uid, limit=100)
+                    today = datetime.utcnow().date()
+                    daily_rollups(s, uid, today - timedelta(days=30), today)
+                    s.exec(select(Mood).where(Mood.risk == "HIGH").order_by(Mood.date.desc()).limit(200)).all()
+                bump("reads")
+            except Exception as e:
+                classify(e)
+            i += 1
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    report = dict(counts)
+    report.update({
+        "journal_mode": args.journal_mode,
+        "writers": args.writers,
+        "readers": args.readers,
+        "seconds": round(elapsed, 2),
+        "writes_per_second": round(counts["writes"] / elapsed, 1),
+        "reads_per_second": round(counts["reads"] / elapsed, 1),
+    })
+    print(json.dumps(report))
+    return 1 if counts["lock_errors"] or counts["other_errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# backend/bench/etag.py
+"""
+Cost of a polled GET answered with 304 Not Modified (If-None-Match matching
+the data-version ETag) vs. the full 200 response, through the ASGI app.
+
+Seeds one patient with --moods moods over the last 90 days and one therapist
+with --bookings bookings and sessions with them into a temporary SQLite
+database, then times each polled route both ways. It also records which
+tables the 304 requests queried, and checks that writes through
+create_mood, the write queue, bookings and sessions invalidate the ETags.
+
+  python -m bench.etag --moods 5000 --bookings 2000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def _ms(samples):
+    ms = sorted(x * 1000 for x in samples)
+    return {"p50_ms": round(statistics.median(ms), 3), "p99_ms": round(ms[int(len(ms) * 0.99) - 1], 3)}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--moods", type=int, default=5000)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per route and mode")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    tmp = tempfile.mkdtemp(prefix="mh-etag-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'etag.db')}"
+    os.environ["DATABASE_READ_URL"] = ""
+    os.environ.setdefault("SENTIMENT_BACKEND", "stub")
+    os.environ.setdefault("PASSWORD_HASH_EXECUTOR", "inline")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, insert # type: ignore
+    from sqlmodel import Session # type: ignore
+    from src import models
+    from src.main import app
+    from src.database import engine, read_engine, get_async_read_engine
+    from src.auth_utils import create_access_token, get_password_hash
+    from src.crud_mood import create_mood
+    from src.write_queue import enqueue_mood, write_queue
+
+    now = datetime.utcnow()
+    with TestClient(app) as client:
+        with Session(engine) as s:
+            pw = get_password_hash("x")
+            s.execute(insert(models.User), [
+                {"name": "patient", "email": "p@example.com", "hashed_password": pw, "role": "patient", "created_at": now},
+                {"name": "therapist", "email": "t@example.com", "hashed_password": pw, "role": "therapist", "created_at": now},
+            ])
+            pid, tid = 1, 2
+            s.execute(insert(models.Mood), [{"user_id": pid, "text": "entry", "date": now - timedelta(minutes=rng.randrange(90 * 24 * 60)),
+                                             "sentiment": round(rng.uniform(-1, 1), 3), "risk": rng.choice(["LOW", "MEDIUM", "HIGH"])}
+                                            for _ in range(args.moods)])
+            s.execute(insert(models.Booking), [{"patient_id": pid, "therapist_id": tid, "datetime": now + timedelta(hours=h),
+                                                "status": "scheduled", "created_at": now} for h in range(args.bookings)])
+            s.execute(insert(models.Session), [{"patient_id": pid, "therapist_id": tid, "session_at": now - timedelta(hours=h)}
+                                               for h in range(args.bookings)])
+            s.commit()
+            from src.crud_mood import rebuild_mood_rollups
+            rebuild_mood_rollups(s)
+
+        patient = {"Authorization": f"Bearer {create_access_token(str(pid))}"}
+        therapist = {"Authorization": f"Bearer {create_access_token(str(tid))}"}
+        routes = [
+            ("/api/mood", patient),
+            ("/api/mood/analytics", patient),
+            ("/api/analytics/chart-data?range=30", patient),
+            ("/api/bookings", therapist),
+            ("/api/sessions", therapist),
+        ]
+
+        touched = set()
+        engines = {engine, read_engine, get_async_read_engine().sync_engine}
+        def record(conn, cursor, statement, params, context, executemany):
+            touched.update(re.findall(r'\bFROM\s+"?(\w+)', statement, re.I))
+
+        report = {"moods": args.moods, "bookings": args.bookings, "routes": {}}
+        for url, headers in routes:
+            first = client.get(url, headers=headers)
+            assert first.status_code == 200, (url, first.status_code, first.text)
+            etag = first.headers["etag"]
+            full, cached = [], []
+            for _ in range(args.requests):
+                t = time.perf_counter()
+                r = client.get(url, headers=headers)
+                full.append(time.perf_counter() - t)
+            for eng in engines:
+                event.listen(eng, "before_cursor_execute", record)
+            for _ in range(args.requests):
+                t = time.perf_counter()
+                r = client.get(url, headers={**headers, "If-None-Match": etag})
+                cached.append(time.perf_counter() - t)
+                assert r.status_code == 304, (url, r.status_code)
+            for eng in engines:
+                event.remove(eng, "before_cursor_execute", record)
+            report["routes"][url] = {
+                "full": {**_ms(full), "bytes": len(first.content)},
+                "not_modified": _ms(cached),
+                "speedup": round(statistics.median(full) / statistics.median(cached), 1),
+            }
+        report["tables_queried_by_304s"] = sorted(touched)
+
+        # every write path must change the ETags it affects
+        def etags():
+            return {url: client.get(url, headers=headers).headers["etag"] for url, headers in routes}
+        stale = []
+        def check(label, expect_changed):
+            nonlocal before
+            after = etags()
+            changed = {url for url in after if after[url] != before[url]}
+            if changed != set(expect_changed):
+                stale.append({"write": label, "changed": sorted(changed)})
+            before = after
+        mood_urls = [u for u, _ in routes[:3]]
+        before = etags()
+        with Session(engine) as s:
+            create_mood(s, pid, "create_mood", sentiment=-0.5, risk="MEDIUM")
+        check("create_mood", mood_urls)
+        enqueue_mood(pid, "queued", sentiment=0.1, risk="LOW").result()
+        write_queue.close()
+        check("write queue", mood_urls)
+        r = client.post("/api/bookings", json={"patient_id": pid, "therapist_id": tid, "datetime": (now - timedelta(days=3)).isoformat()}, headers=therapist)
+        check("create_booking", ["/api/bookings"])
+        client.patch(f"/api/bookings/{r.json()['id']}", json={"notes": "moved"}, headers=therapist)
+        check("update_booking", ["/api/bookings"])
+        client.post(f"/api/bookings/{r.json()['id']}/complete", json={}, headers=therapist)
+        check("complete_booking", ["/api/bookings"])
+        client.post("/api/sessions", json={"patient_id": pid}, headers=therapist)
+        check("create_session", ["/api/sessions"])
+        report["stale_etags_after_writes"] = stale
+        report["conditional_get"] = client.get("/api/metrics", headers=therapist).json()["conditional_get"]
+
+    print(json.dumps(report, indent=2))
+    return 1 if stale or {"mood", "mooddaily", "booking", "session"} & set(report["tables_queried_by_304s"]) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
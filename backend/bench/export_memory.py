@@ -0,0 +1,141 @@
+# backend/bench/export_memory.py
+"""
+Memory profile of the streaming export.
+
+Seeds a temporary SQLite database with --rows moods for a single user, then
+consumes export_stream() in a fresh subprocess per format while sampling the
+process RSS. Reports the RSS at every 10% of the output and the peak above
+the pre-export baseline; a flat profile means memory does not grow with the
+number of rows.
+
+--compare also runs the previous implementation's access pattern
+(session.exec(select(Mood)).all() before the first byte) for contrast.
+
+  python -m bench.export_memory --rows 1000000
+  python -m bench.export_memory --rows 200000 --formats csv,ndjson --compare
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE / 1e6
+
+def seed(path: str, rows: int):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from src import models  # noqa: F401  (registers the tables)
+    from src.database import create_db_and_tables
+    create_db_and_tables()
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO user (id, name, email, hashed_password, role, created_at) VALUES (1, 'bench', 'bench@example.com', 'x', 'patient', '2020-01-01 00:00:00')")
+    start = datetime(2020, 1, 1)
+    batch = 50000
+    for lo in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO mood (user_id, text, date, sentiment, risk) VALUES (1, ?, ?, ?, ?)",
+            (
+                (f"entry {i}: slept badly, felt a bit better after a walk", (start + timedelta(minutes=i)).isoformat(sep=" "), 0.1, "LOW")
+                for i in range(lo, min(rows, lo + batch))
+            ),
+        )
+    conn.commit()
+    conn.close()
+
+def measure(path: str, fmt: str, gzip: bool, buffered: bool) -> dict:
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from sqlmodel import Session, select # type: ignore
+    from src.database import engine
+    from src.export_stream import export_stream
+    from src.models import Mood
+
+    with engine.connect() as conn:
+        total_rows = conn.exec_driver_sql("SELECT count(*) FROM mood").scalar()
+    baseline = rss_mb()
+    peak = [baseline]
+    done = threading.Event()
+
+    def sampler():
+        while not done.is_set():
+            peak[0] = max(peak[0], rss_mb())
+            time.sleep(0.01)
+
+    threading.Thread(target=sampler, daemon=True).start()
+    t = time.perf_counter()
+    out_bytes = 0
+    profile = []
+    if buffered:
+        with Session(engine) as session:
+            moods = session.exec(select(Mood).where(Mood.user_id == 1).order_by(Mood.date.asc())).all()
+            profile.append(round(rss_mb() - baseline, 1))
+            for m in moods:
+                out_bytes += len(f"mood,{m.id},{m.date.isoformat()},{m.risk},{m.text}\r\n")
+    else:
+        from src.export_stream import EXPORT_CHUNK_ROWS
+        expected_chunks = max(1, total_rows // EXPORT_CHUNK_ROWS)
+        n = 0
+        for chunk in export_stream(engine, 1, fmt, compress=gzip):
+            out_bytes += len(chunk)
+            n += 1
+            if n % max(1, expected_chunks // 10) == 0:
+                profile.append(round(rss_mb() - baseline, 1))
+    elapsed = time.perf_counter() - t
+    done.set()
+    peak[0] = max(peak[0], rss_mb())
+    return {
+        "format": "buffered-orm" if buffered else fmt + (".gz" if gzip else ""),
+        "rows": total_rows,
+        "output_mb": round(out_bytes / 1e6, 1),
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(total_rows / elapsed),
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_over_baseline_mb": round(peak[0] - baseline, 1),
+        "rss_over_baseline_at_each_10pct_mb": profile,
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--formats", default="csv,csv.gz,ndjson,parquet,arrow")
+    parser.add_argument("--compare", action="store_true", help="also measure the old load-everything pattern")
+    parser.add_argument("--db", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--measure", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        fmt, _, gz = args.measure.partition(".")
+        print(json.dumps(measure(args.db, fmt, gz == "gz", fmt == "buffered")))
+        return 0
+
+    path = os.path.join(tempfile.mkdtemp(prefix="mh-export-"), "export.db")
+    t = time.perf_counter()
+    seed(path, args.rows)
+    print(f"seeded {args.rows} moods in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+
+    runs = [f for f in args.formats.split(",") if f]
+    if args.compare:
+        runs.append("buffered")
+    results = []
+    for fmt in runs:
+        proc = subprocess.run(
+            [sys.executable, "-m", "bench.export_memory", "--db", path, "--measure", fmt],
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            results.append({"format": fmt, "error": proc.stderr.strip().splitlines()[-1:]})
+        else:
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# backend/bench/import_time.py
+"""
+Cold-import budget check for the API process.
+
+Imports backend.src.main in a fresh interpreter (several times, keeps the best
+run) and exits non-zero if it takes longer than the budget or if the import
+pulled in torch/transformers eagerly.
+
+  python bench/import_time.py                 # budget from IMPORT_TIME_BUDGET_S (default 3.0)
+  python bench/import_time.py --budget 1.5 --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import backend.src.main
+elapsed = time.perf_counter() - t
+heavy = sorted(m for m in ("torch", "transformers", "sklearn", "onnxruntime") if m in sys.modules)
+print(json.dumps({"seconds": elapsed, "heavy_modules": heavy}))
+"""
+
+def measure_once() -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=REPO_ROOT, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise SystemExit(f"import failed:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_S", "3.0")))
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    runs = [measure_once() for _ in range(max(1, args.runs))]
+    best = min(r["seconds"] for r in runs)
+    heavy = runs[0]["heavy_modules"]
+    print(json.dumps({"best_seconds": round(best, 3), "budget_seconds": args.budget, "heavy_modules": heavy}))
+
+    if heavy:
+        print(f"FAIL: cold import loaded {', '.join(heavy)} eagerly", file=sys.stderr)
+        return 1
+    if best > args.budget:
+        print(f"FAIL: cold import took {best:.3f}s (budget {args.budget:.3f}s)", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
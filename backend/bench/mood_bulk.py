@@ -0,0 +1,77 @@
+# backend/bench/mood_bulk.py
+"""
+Throughput of POST /api/mood/bulk vs. looping POST /api/mood.
+
+Runs the real app in-process (TestClient) against a temporary SQLite
+database. Sentiment uses the backend from SENTIMENT_BACKEND; this script
+defaults it to "stub" so the numbers measure the request/DB path, set it to
+pytorch/onnx to include model cost. Distinct texts are used so the score
+cache never answers. The MoodDaily rollups are checked against the raw rows
+afterwards.
+
+  python -m bench.mood_bulk --entries 5000
+  SENTIMENT_BACKEND=onnx SENTIMENT_MODEL_DIR=models/onnx python -m bench.mood_bulk --entries 2000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--single", type=int, default=None, help="entries posted one by one (default: same as --entries)")
+    args = parser.parse_args(argv)
+    single_n = args.single if args.single is not None else args.entries
+
+    tmp = tempfile.mkdtemp(prefix="mh-bulk-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bulk.db')}"
+    os.environ["DATABASE_READ_URL"] = ""
+    os.environ.setdefault("SENTIMENT_BACKEND", "stub")
+    os.environ.setdefault("SENTIMENT_PRELOAD", "eager")
+    os.environ.setdefault("PASSWORD_HASH_EXECUTOR", "inline")
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session # type: ignore
+    from src.main import app
+    from src.database import engine
+    from src.crud_mood import check_mood_rollups
+
+    def texts(prefix, n):
+        return [f"{prefix} {i}: felt anxious in the morning but the walk helped" for i in range(n)]
+
+    with TestClient(app) as c:
+        c.post("/api/auth/register", json={"name": "bench", "email": "bench@example.com", "password": "benchpass"})
+        token = c.post("/api/auth/login", json={"email": "bench@example.com", "password": "benchpass"}).json()["access_token"]
+        h = {"Authorization": f"Bearer {token}"}
+
+        t = time.perf_counter()
+        for text in texts("single", single_n):
+            r = c.post("/api/mood", json={"text": text}, headers=h)
+            assert r.status_code == 200, r.text
+        single_s = time.perf_counter() - t
+
+        t = time.perf_counter()
+        r = c.post("/api/mood/bulk", json={"entries": [{"text": x} for x in texts("bulk", args.entries)]}, headers=h)
+        bulk_s = time.perf_counter() - t
+        body = r.json()
+        assert r.status_code == 200 and body["created"] == args.entries, r.text[:500]
+
+    with Session(engine) as s:
+        checked, mismatches = check_mood_rollups(s)
+
+    report = {
+        "sentiment_backend": os.environ["SENTIMENT_BACKEND"],
+        "single": {"entries": single_n, "seconds": round(single_s, 2), "entries_per_second": round(single_n / single_s, 1)},
+        "bulk": {"entries": args.entries, "seconds": round(bulk_s, 2), "entries_per_second": round(args.entries / bulk_s, 1)},
+        "speedup": round((args.entries / bulk_s) / (single_n / single_s), 1),
+        "rollup_rows_checked": checked,
+        "rollup_mismatches": len(mismatches),
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
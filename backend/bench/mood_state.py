@@ -0,0 +1,194 @@
+# backend/bench/mood_state.py
+"""
+The streaming deterioration detector (MoodState).
+
+Seeds --users users with --moods moods each into a temporary SQLite
+database. Scores are bimodal like the SST-2 compound (+-0.85..0.99): each
+user has a positive share from --mixes (90/10, 80/20, 70/30 by default), and
+risk follows the compound rule of detect_risk. A --sliding share of users
+slide to 15% positive over their last third of entries; the rest stay at
+their mix. Then:
+  - rebuilds every state with rebuild_mood_states (one pass in id order),
+  - times create_mood with and without the state update,
+  - times reading a user's state vs. replaying their history,
+  - writes more moods through create_mood, bulk_create_moods and the write
+    queue and checks every incremental state against a fresh rebuild,
+  - reports how many sliding / stable users end up flagged, per mix, in
+    total and by the CUSUM (stable users also: ever flagged by the CUSUM).
+
+  python -m bench.mood_state --users 2000 --moods 200
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--moods", type=int, default=200, help="moods per user")
+    parser.add_argument("--sliding", type=float, default=0.1, help="share of users whose mood slides")
+    parser.add_argument("--mixes", default="0.9,0.8,0.7", help="positive shares of the users' scores")
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    tmp = tempfile.mkdtemp(prefix="mh-state-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'state.db')}"
+    os.environ["DATABASE_READ_URL"] = ""
+
+    from sqlalchemy import insert # type: ignore
+    from sqlmodel import Session, select # type: ignore
+    from src import models
+    from src import crud_mood
+    from src.database import engine, create_db_and_tables
+    from src.crud_mood import create_mood, bulk_create_moods
+    from src.mood_state import rebuild_mood_states, step
+    from src.write_queue import enqueue_mood, write_queue
+
+    create_db_and_tables()
+    now = datetime.utcnow()
+    sliding = set(rng.sample(range(1, args.users + 1), int(args.users * args.sliding)))
+    mixes = [float(m) for m in args.mixes.split(",")]
+    mix = {uid: mixes[uid % len(mixes)] for uid in range(1, args.users + 1)}
+
+    def sample(uid, i, n):
+        positive = mix[uid]
+        if uid in sliding and i > n * 2 // 3:
+            positive -= (positive - 0.15) * (i - n * 2 // 3) / (n / 3)
+        s = rng.uniform(0.85, 0.99) * (1 if rng.random() < positive else -1)
+        return s, "HIGH" if s <= -0.6 else "MEDIUM" if s <= -0.3 else "LOW"
+
+    with Session(engine) as s:
+        s.execute(insert(models.User), [{"name": f"u{i}", "email": f"u{i}@example.com", "hashed_password": "x", "created_at": now}
+                                        for i in range(args.users)])
+        rows = []
+        cusum_ever = set()
+        replay = {uid: models.MoodState(user_id=uid) for uid in range(1, args.users + 1)}
+        # interleaved across users, as real traffic would be
+        for i in range(args.moods):
+            for uid in range(1, args.users + 1):
+                sent, risk = sample(uid, i, args.moods)
+                rows.append({"user_id": uid, "text": "x", "date": now - timedelta(hours=args.moods - i), "sentiment": round(sent, 3), "risk": risk})
+                st = replay[uid]
+                step(st, round(sent, 3), risk)
+                if "cusum" in (st.reasons or ""):
+                    cusum_ever.add(uid)
+        for i in range(0, len(rows), 10_000):
+            s.execute(insert(models.Mood), rows[i:i + 10_000])
+        s.commit()
+
+    with Session(engine) as s:
+        t = time.perf_counter()
+        n_states = rebuild_mood_states(s)
+        rebuild_s = time.perf_counter() - t
+
+    # per-write cost of the state update
+    def timed_writes(n):
+        out = []
+        with Session(engine) as s:
+            for _ in range(n):
+                # only users the later write-path checks touch anyway, so detection stats stay clean
+                uid = rng.randrange(1, min(args.users, 200) + 1)
+                t = time.perf_counter()
+                create_mood(s, uid, "x", sentiment=rng.uniform(-1, 1), risk=rng.choice(["LOW", "MEDIUM", "HIGH"]))
+                out.append(time.perf_counter() - t)
+        return statistics.median(out) * 1000
+    with_state_ms = timed_writes(args.writes)
+    real = crud_mood.apply_mood_states
+    crud_mood.apply_mood_states = lambda session, moods: None
+    without_state_ms = timed_writes(args.writes)
+    crud_mood.apply_mood_states = real
+    # the writes without a state update left the states stale; start over
+    with Session(engine) as s:
+        rebuild_mood_states(s)
+
+    # reading the state vs. replaying the user's history
+    picks = [rng.randrange(1, args.users + 1) for _ in range(200)]
+    with Session(engine) as s:
+        t = time.perf_counter()
+        for uid in picks:
+            s.get(models.MoodState, uid)
+            s.expunge_all()
+        read_us = (time.perf_counter() - t) / len(picks) * 1e6
+        t = time.perf_counter()
+        for uid in picks:
+            st = models.MoodState(user_id=uid)
+            for sent, risk, mid, when in s.exec(select(models.Mood.sentiment, models.Mood.risk, models.Mood.id, models.Mood.date)
+                                                .where(models.Mood.user_id == uid).order_by(models.Mood.id)).all():
+                step(st, sent, risk, mid, when)
+        replay_us = (time.perf_counter() - t) / len(picks) * 1e6
+
+    # every write path, then incremental vs. rebuilt
+    with Session(engine) as s:
+        for uid in range(1, min(args.users, 100) + 1):
+            create_mood(s, uid, "single", sentiment=-0.9, risk="HIGH")
+        for uid in range(1, min(args.users, 50) + 1):
+            bulk_create_moods(s, uid, [{"text": "bulk", "sentiment": -0.7, "risk": "HIGH"} for _ in range(5)])
+    futs = [enqueue_mood(uid, "queued", sentiment=-0.4, risk="MEDIUM") for uid in range(1, min(args.users, 200) + 1)]
+    for f in futs:
+        f.result()
+    write_queue.close()
+
+    fields = ("entries", "ewma", "baseline", "cusum", "high_bits", "medium_bits", "last_mood_id", "flagged", "flagged_since", "reasons")
+    def snapshot():
+        with Session(engine) as s:
+            return {st.user_id: tuple(round(getattr(st, f), 9) if isinstance(getattr(st, f), float) else getattr(st, f) for f in fields)
+                    for st in s.exec(select(models.MoodState)).all()}
+    incremental = snapshot()
+    with Session(engine) as s:
+        rebuild_mood_states(s)
+    rebuilt = snapshot()
+    mismatches = sum(1 for uid in rebuilt if incremental.get(uid) != rebuilt[uid])
+
+    # detection on the seeded data only (users past the ones written to above)
+    untouched = set(range(201, args.users + 1))
+    flagged = {uid for uid, st in rebuilt.items() if st[7]}
+    by_cusum = {uid for uid, st in rebuilt.items() if "cusum" in (st[9] or "")}
+    slide = sliding & untouched
+    stable = untouched - sliding
+
+    def share(users, of):
+        return round(len(users & of) / len(users), 4) if users else None
+    detection = {}
+    for m in mixes:
+        stable_m = {uid for uid in stable if mix[uid] == m}
+        slide_m = {uid for uid in slide if mix[uid] == m}
+        detection[f"{round(m * 100)}/{round(100 - m * 100)}"] = {
+            "stable_users": len(stable_m),
+            "stable_flagged": share(stable_m, flagged),
+            "stable_flagged_cusum": share(stable_m, by_cusum),
+            "stable_ever_flagged_cusum": share(stable_m, cusum_ever),
+            "sliding_users": len(slide_m),
+            "sliding_flagged": share(slide_m, flagged),
+            "sliding_flagged_cusum": share(slide_m, by_cusum),
+        }
+
+    report = {
+        "users": args.users,
+        "moods": args.users * args.moods,
+        "rebuild": {"states": n_states, "seconds": round(rebuild_s, 2), "moods_per_s": round(args.users * args.moods / rebuild_s)},
+        "create_mood_ms": {"with_state": round(with_state_ms, 3), "without_state": round(without_state_ms, 3)},
+        "read_state_us": round(read_us, 1),
+        "replay_history_us": round(replay_us, 1),
+        "incremental_vs_rebuild_mismatches": mismatches,
+        "flagged": {
+            "sliding_users": len(slide),
+            "sliding_flagged": len(slide & flagged),
+            "stable_users": len(stable),
+            "stable_flagged": len(stable & flagged),
+            "stable_flagged_cusum": len(stable & by_cusum),
+        },
+        "flagged_by_mix": detection,
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
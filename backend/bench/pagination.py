@@ -0,0 +1,97 @@
+# backend/bench/pagination.py
+"""
+Latency of deep pages: keyset cursor vs. OFFSET.
+
+Seeds --rows moods for one user into a temporary SQLite database, then times
+fetching a --limit sized page at several depths, once with
+LIMIT/OFFSET and once with crud_mood.page_moods_for_user following a cursor
+taken from the previous page. Keyset cost should stay flat with depth; OFFSET
+grows linearly because SQLite walks and discards every skipped row.
+
+  python -m bench.pagination --rows 200000 --limit 100
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--depths", default="1,100,1000,1999", help="page numbers to time (1-based)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    depths = [int(d) for d in args.depths.split(",")]
+
+    tmp = tempfile.mkdtemp(prefix="mh-page-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'page.db')}"
+    os.environ["DATABASE_READ_URL"] = ""
+
+    from sqlalchemy import insert # type: ignore
+    from sqlmodel import Session, select # type: ignore
+    from src import models  # noqa: F401
+    from src.database import engine, create_db_and_tables
+    from src.migrations import run_migrations
+    from src.crud_mood import page_moods_for_user
+
+    create_db_and_tables()
+    run_migrations(engine)
+    start = datetime(2020, 1, 1)
+    with Session(engine) as s:
+        s.add(models.User(name="bench", email="bench@example.com", hashed_password="x", created_at=start))
+        s.commit()
+        # two rows per timestamp so the id tie-break is exercised
+        rows = [{"user_id": 1, "text": f"entry {i}", "date": start + timedelta(minutes=i // 2), "sentiment": 0.0, "risk": "LOW"}
+                for i in range(args.rows)]
+        for i in range(0, len(rows), 10_000):
+            s.execute(insert(models.Mood), rows[i:i + 10_000])
+        s.commit()
+
+    def best(fn) -> float:
+        times = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t)
+        return min(times) * 1000
+
+    def offset_page(session, page_no):
+        stmt = (select(models.Mood).where(models.Mood.user_id == 1)
+                .order_by(models.Mood.date.desc(), models.Mood.id.desc())
+                .offset((page_no - 1) * args.limit).limit(args.limit))
+        return session.exec(stmt).all()
+
+    results = []
+    mismatches = 0
+    with Session(engine) as s:
+        # walk forward once, remembering the cursor that leads to each depth
+        cursors = {1: None}
+        cursor, page_no = None, 1
+        while page_no < max(depths):
+            page = page_moods_for_user(s, 1, args.limit, cursor)
+            cursor, page_no = page.next_cursor, page_no + 1
+            cursors[page_no] = cursor
+            if cursor is None:
+                break
+        for d in depths:
+            if d not in cursors:
+                continue
+            keyset_ids = [m.id for m in page_moods_for_user(s, 1, args.limit, cursors[d]).items]
+            offset_ids = [m.id for m in offset_page(s, d)]
+            mismatches += keyset_ids != offset_ids
+            results.append({
+                "page": d,
+                "offset_rows_skipped": (d - 1) * args.limit,
+                "offset_ms": round(best(lambda: offset_page(s, d)), 2),
+                "keyset_ms": round(best(lambda: page_moods_for_user(s, 1, args.limit, cursors[d])), 2),
+            })
+
+    print(json.dumps({"rows": args.rows, "limit": args.limit, "pages": results, "page_mismatches": mismatches}, indent=2))
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+# backend/bench/recommendations.py
+"""
+Cost of a personalised GET /api/recommendations: building the context from
+the database on every request vs. the per-user context cache, and filtering
+RECOMMENDATION_POOL per request vs. the precomputed bucket lists.
+
+Seeds --users users with --moods entries each (spread over the last 40 days)
+into a temporary SQLite database. After timing, it writes more moods through
+create_mood, bulk_create_moods and the write queue and checks every user's
+cached context against a fresh database build.
+
+  python -m bench.recommendations --users 200 --moods 500
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def _us(samples):
+    us = sorted(x * 1e6 for x in samples)
+    return {"p50_us": round(statistics.median(us), 1), "p99_us": round(us[int(len(us) * 0.99) - 1], 1)}
+
+def _filtering_generate(pool):
+    """The per-request list filtering generate_recommendations used to do."""
+    def generate(context):
+        latest_sentiment = context.get("latest_mood_sentiment")
+        latest_risk = (context.get("latest_risk") or "").upper() if context.get("latest_risk") else None
+        avg7 = context.get("avg_7_days")
+        recs = []
+        if latest_risk == "HIGH" or (isinstance(latest_sentiment, (int, float)) and latest_sentiment <= -0.6):
+            recs.extend([r for r in pool if r["id"] in ("breathing", "seek_professional", "grounding", "short_walk")])
+        else:
+            if avg7 is not None and avg7 <= -0.5:
+                recs.extend([r for r in pool if r["id"] in ("daily_routine", "sleep_hygiene", "tiny_task", "connect")])
+            if avg7 is not None and -0.5 < avg7 <= 0:
+                recs.extend([r for r in pool if r["id"] in ("grounding", "breathing", "short_walk", "journaling")])
+        for r in pool:
+            if r not in recs:
+                recs.append(r)
+        return recs[:12]
+    return generate
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--moods", type=int, default=500, help="moods per user")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    tmp = tempfile.mkdtemp(prefix="mh-recs-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'recs.db')}"
+    os.environ["DATABASE_READ_URL"] = ""
+
+    from sqlalchemy import insert # type: ignore
+    from sqlmodel import Session, select # type: ignore
+    from src import models
+    from src.database import engine, create_db_and_tables
+    from src.migrations import run_migrations
+    from src.crud_mood import create_mood, bulk_create_moods, avg_mood_for_user
+    from src.ml.recommendations import RECOMMENDATION_POOL, generate_recommendations
+    from src.user_context import context_cache
+    from src.write_queue import enqueue_mood, write_queue
+
+    create_db_and_tables()
+    now = datetime.utcnow()
+    risks = ["LOW", "LOW", "MEDIUM", "HIGH"]
+    with Session(engine) as s:
+        s.execute(insert(models.User), [{"name": f"u{i}", "email": f"u{i}@example.com", "hashed_password": "x", "created_at": now}
+                                        for i in range(args.users)])
+        user_ids = [u.id for u in s.exec(select(models.User)).all()]
+        rows = [{"user_id": uid, "text": "x", "date": now - timedelta(minutes=rng.randrange(40 * 24 * 60)),
+                 "sentiment": round(rng.uniform(-1, 1), 3), "risk": rng.choice(risks)}
+                for uid in user_ids for _ in range(args.moods)]
+        for i in range(0, len(rows), 10_000):
+            s.execute(insert(models.Mood), rows[i:i + 10_000])
+        s.commit()
+    run_migrations(engine)  # backfills the MoodDaily rollups
+
+    def naive_context(session, uid):
+        latest = session.exec(select(models.Mood).where(models.Mood.user_id == uid)
+                              .order_by(models.Mood.date.desc(), models.Mood.id.desc()).limit(1)).first()
+        return {
+            "latest_mood_sentiment": latest.sentiment if latest else None,
+            "latest_risk": latest.risk if latest else None,
+            "avg_7_days": avg_mood_for_user(session, uid, days=7),
+            "avg_30_days": avg_mood_for_user(session, uid, days=30),
+        }
+
+    old_generate = _filtering_generate(RECOMMENDATION_POOL)
+    picks = [rng.choice(user_ids) for _ in range(args.requests)]
+    naive, cached = [], []
+    with Session(engine) as s:
+        for uid in picks:
+            t = time.perf_counter()
+            old_generate(naive_context(s, uid))
+            naive.append(time.perf_counter() - t)
+        for uid in user_ids:
+            context_cache.load(s, uid)  # warm
+        for uid in picks:
+            t = time.perf_counter()
+            generate_recommendations(context_cache.load(s, uid))
+            cached.append(time.perf_counter() - t)
+
+    contexts = [naive_context(Session(engine), uid) for uid in user_ids[:50]]
+    t = time.perf_counter()
+    for _ in range(20):
+        for c in contexts:
+            old_generate(c)
+    filter_us = (time.perf_counter() - t) / (20 * len(contexts)) * 1e6
+    t = time.perf_counter()
+    for _ in range(20):
+        for c in contexts:
+            generate_recommendations(c)
+    bucket_us = (time.perf_counter() - t) / (20 * len(contexts)) * 1e6
+
+    # writes through every path, then compare the cache with the database
+    with Session(engine) as s:
+        for uid in user_ids[:50]:
+            create_mood(s, uid, "single", sentiment=-0.9, risk="HIGH")
+        for uid in user_ids[50:100]:
+            bulk_create_moods(s, uid, [{"text": "bulk", "date": now - timedelta(days=d), "sentiment": 0.4, "risk": "LOW"} for d in range(5)])
+    futs = [enqueue_mood(uid, "queued", sentiment=-0.2, risk="MEDIUM") for uid in user_ids[100:150]]
+    for f in futs:
+        f.result()
+    write_queue.close()
+    mismatches = 0
+    with Session(engine) as s:
+        for uid in user_ids:
+            if context_cache.get(uid) != naive_context(s, uid):
+                mismatches += 1
+
+    report = {
+        "users": args.users,
+        "moods_per_user": args.moods,
+        "per_request_db_context": _us(naive),
+        "per_request_cached_context": _us(cached),
+        "generate_filtering_us": round(filter_us, 2),
+        "generate_bucketed_us": round(bucket_us, 2),
+        "cache": context_cache.stats(),
+        "context_mismatches_after_writes": mismatches,
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# backend/bench/retrieval.py
+"""
+Latency of the vectorized retrieval engine vs. the original keyword matcher.
+
+Runs a fixed set of chat messages against the real catalog and against the
+catalog replicated --scale times (to show how both grow with catalog size),
+and reports mean / p95 latency per query plus how often both pick the same
+response on the real catalog.
+
+  python -m bench.retrieval
+  python -m bench.retrieval --scale 20 --repeats 200
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from src.ml import retrieval
+from src.ml.retrieval_engine import RetrievalEngine
+
+MESSAGES = [
+    "hello",
+    "I feel so depressed lately and nothing helps",
+    "I have a panic attack coming on",
+    "can't sleep again, awake at night for hours",
+    "my boss keeps piling on work and I'm overwhelmed",
+    "I want to end my life",
+    "I feel really lonely since the breakup",
+    "exams next week and I can't study",
+    "what should i do about my anxiety",
+    "had a good day, feeling grateful",
+    "I don't know what to say",
+    "I'm so angry at my partner right now",
+]
+
+def _keyword_best(catalog, message):
+    msg = retrieval._norm(message)
+    best, best_score = None, 0.0
+    for r in catalog:
+        score = retrieval._score_for_match(msg, r.get("patterns", []))
+        if score > best_score:
+            best, best_score = r, score
+    return best["id"] if best else "fallback_positive"
+
+def _timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        for m in MESSAGES:
+            t = time.perf_counter()
+            fn(m)
+            samples.append((time.perf_counter() - t) * 1e6)
+    samples.sort()
+    return {
+        "mean_us": round(statistics.mean(samples), 2),
+        "p95_us": round(samples[int(0.95 * (len(samples) - 1))], 2),
+    }
+
+def _scaled_catalog(scale):
+    out = []
+    for n in range(scale):
+        for r in retrieval.RESPONSES:
+            out.append({"id": f"{r['id']}#{n}", "patterns": list(r["patterns"]), "text": r["text"]})
+    return out
+
+def run(scale: int, repeats: int) -> dict:
+    catalog = retrieval.RESPONSES
+    t = time.perf_counter()
+    engine = RetrievalEngine(catalog)
+    build_ms = (time.perf_counter() - t) * 1000
+
+    agree = sum(
+        1 for m in MESSAGES
+        if _keyword_best(catalog, m) == retrieval.get_best_response(m)[1]
+    )
+    report = {
+        "catalog_responses": len(catalog),
+        "engine_build_ms": round(build_ms, 2),
+        "keyword": _timed(lambda m: _keyword_best(catalog, m), repeats),
+        "engine": _timed(lambda m: engine.top_k(m, 1), repeats),
+        "same_choice": f"{agree}/{len(MESSAGES)}",
+    }
+
+    if scale > 1:
+        big = _scaled_catalog(scale)
+        big_engine = RetrievalEngine(big)
+        report["scaled"] = {
+            "catalog_responses": len(big),
+            "keyword": _timed(lambda m: _keyword_best(big, m), max(1, repeats // scale)),
+            "engine": _timed(lambda m: big_engine.top_k(m, 1), max(1, repeats // scale)),
+        }
+    return report
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=40, help="replicate the catalog this many times for the scaling run")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.scale, args.repeats), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# backend/bench/scheduler.py
+"""
+Latency of the booking scheduler with many therapists and bookings.
+
+Seeds --therapists therapists and --bookings upcoming bookings into a
+temporary SQLite database, then times:
+  - the initial calendar load (scheduler.load_all),
+  - a conflict check (scheduler.hold + release) at random slots,
+    next to the equivalent indexed SQL overlap query,
+  - scheduler.hold_earliest + release, with --busy of the therapists fully
+    booked for the next few hours so the search has to skip past them.
+
+  python -m bench.scheduler --therapists 2000 --bookings 100000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+def _pct(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+def _summary(samples_s):
+    us = [x * 1e6 for x in samples_s]
+    return {"p50_us": round(statistics.median(us), 1), "p99_us": round(_pct(us, 0.99), 1), "max_us": round(max(us), 1)}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--therapists", type=int, default=2000)
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--busy", type=float, default=0.9, help="fraction of therapists booked solid for the next hours")
+    parser.add_argument("--busy-hours", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    tmp = tempfile.mkdtemp(prefix="mh-sched-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'sched.db')}"
+    os.environ["DATABASE_READ_URL"] = ""
+    os.environ["SCHEDULER_RESYNC_S"] = "0"
+
+    from sqlalchemy import insert, text # type: ignore
+    from sqlmodel import Session # type: ignore
+    from src import models
+    from src.database import engine, create_db_and_tables
+    from src.scheduler import BookingConflict, scheduler, _align
+
+    create_db_and_tables()
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    slot = timedelta(minutes=60)
+    with Session(engine) as s:
+        s.execute(insert(models.User), [{"name": "patient", "email": "p@example.com", "hashed_password": "x", "role": "patient", "created_at": now}])
+        s.execute(insert(models.User), [{"name": f"t{i}", "email": f"t{i}@example.com", "hashed_password": "x", "role": "therapist", "created_at": now}
+                                        for i in range(args.therapists)])
+        therapist_ids = [r[0] for r in s.execute(text("SELECT id FROM user WHERE role = 'therapist'"))]
+        start = scheduler_t0 = now + timedelta(hours=1)
+        busy = therapist_ids[:int(len(therapist_ids) * args.busy)]
+        rows = []
+        # the busy ones are booked back to back from the earliest auto-booking slot onwards
+        for tid in busy:
+            for h in range(args.busy_hours):
+                rows.append({"patient_id": 1, "therapist_id": tid, "datetime": start.replace(minute=0) + timedelta(hours=h), "status": "scheduled", "created_at": now})
+        # the rest are spread over the next 60 days on the hour
+        while len(rows) < args.bookings:
+            tid = rng.choice(therapist_ids)
+            dt = (now + timedelta(hours=args.busy_hours + 2 + rng.randrange(60 * 24))).replace(minute=0)
+            rows.append({"patient_id": 1, "therapist_id": tid, "datetime": dt, "status": "scheduled", "created_at": now})
+        for i in range(0, len(rows), 10_000):
+            s.execute(insert(models.Booking), rows[i:i + 10_000])
+        s.commit()
+
+    t = time.perf_counter()
+    scheduler.load_all()
+    load_s = time.perf_counter() - t
+
+    # conflict checks at random on-the-hour and half-hour slots
+    checks, conflicts = [], 0
+    probes = [(rng.choice(therapist_ids), (now + timedelta(minutes=30 * rng.randrange(2 * 24 * 60))).replace(second=0))
+              for _ in range(args.iterations)]
+    for tid, dt in probes:
+        t = time.perf_counter()
+        try:
+            hold = scheduler.hold(tid, dt)
+        except BookingConflict:
+            conflicts += 1
+            checks.append(time.perf_counter() - t)
+            continue
+        scheduler.release(hold)
+        checks.append(time.perf_counter() - t)
+
+    sql = text("SELECT id FROM booking WHERE therapist_id = :t AND datetime > :lo AND datetime < :hi "
+               "AND status NOT IN ('cancelled', 'canceled') LIMIT 1")
+    sql_checks = []
+    with engine.connect() as conn:
+        for tid, dt in probes[:500]:
+            t = time.perf_counter()
+            conn.execute(sql, {"t": tid, "lo": dt - slot, "hi": dt + slot}).first()
+            sql_checks.append(time.perf_counter() - t)
+
+    earliest, picked = [], {}
+    for _ in range(args.iterations):
+        t = time.perf_counter()
+        hold = scheduler.hold_earliest()
+        earliest.append(time.perf_counter() - t)
+        picked[hold.therapist_id] = picked.get(hold.therapist_id, 0) + 1
+        scheduler.release(hold)
+    # a sequence of real auto-bookings (kept) should spread over the free therapists
+    spread = {}
+    for _ in range(200):
+        hold = scheduler.hold_earliest()
+        spread[hold.therapist_id] = spread.get(hold.therapist_id, 0) + 1
+        scheduler.confirm(hold, -hold.key + 10_000_000)
+
+    report = {
+        "therapists": args.therapists,
+        "bookings": len(rows),
+        "busy_therapists": len(busy),
+        "load_all_ms": round(load_s * 1000, 1),
+        "conflict_check": {**_summary(checks), "conflicts": conflicts, "checks": len(checks)},
+        "conflict_check_sql": _summary(sql_checks),
+        "hold_earliest": _summary(earliest),
+        "auto_bookings_200": {"distinct_therapists": len(spread), "max_per_therapist": max(spread.values())},
+        "stats": scheduler.stats(),
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
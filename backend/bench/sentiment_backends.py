@@ -0,0 +1,168 @@
+# backend/bench/sentiment_backends.py
+"""
+Parity check and latency/memory benchmark for the sentiment inference backends.
+
+Each backend runs in its own interpreter (so resident memory is comparable),
+scores a fixed corpus, and reports load time, single-text and batched latency,
+and peak RSS. Results are compared against the first backend listed: labels
+must agree on at least --min-agreement of the corpus and compound scores must
+be within --tolerance. Exits non-zero when parity fails.
+tests/test_sentiment_parity.py runs the parity part under pytest.
+
+  python -m bench.sentiment_backends --backends pytorch,quantized,onnx --model-dir models/sentiment
+  python -m bench.sentiment_backends --backends stub          # no weights needed
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CORPUS = [
+    "I feel great today, the walk really helped.",
+    "I am so sad and tired of everything.",
+    "ok",
+    "Work was stressful but I managed.",
+    "I can't sleep and my thoughts keep racing.",
+    "Had a lovely dinner with my family.",
+    "I feel hopeless and alone.",
+    "Not bad, a fairly normal day.",
+    "I'm anxious about my exam tomorrow.",
+    "Grateful for my friends checking in on me.",
+    "Everything feels pointless lately.",
+    "I went to the gym and feel much better.",
+    "My boss yelled at me and I cried in the car.",
+    "Calm morning, some meditation, feeling centred.",
+    "I am angry at myself for messing up again.",
+    "Today was fine.",
+]
+
+def _peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        try:
+            import psutil  # type: ignore
+            return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+        except Exception:
+            return None
+
+def _percentile(values, pct):
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+def worker(repeats: int, batch_size: int) -> dict:
+    # configured through SENTIMENT_* env vars set by the parent
+    from src.ml import sentiment_bert
+
+    t = time.perf_counter()
+    pipe = sentiment_bert.load_model()
+    load_s = time.perf_counter() - t
+    if pipe is None:
+        return {"error": sentiment_bert.model_status()["error"]}
+
+    results = [sentiment_bert._to_scores(r) for r in pipe(CORPUS, batch_size=batch_size)]
+
+    single = []
+    for _ in range(repeats):
+        for text in CORPUS:
+            t = time.perf_counter()
+            pipe([text], batch_size=1)
+            single.append((time.perf_counter() - t) * 1000)
+
+    batched = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        pipe(CORPUS, batch_size=batch_size)
+        batched.append((time.perf_counter() - t) * 1000)
+
+    return {
+        "load_seconds": round(load_s, 3),
+        "single_ms_p50": round(statistics.median(single), 3),
+        "single_ms_p95": round(_percentile(single, 95), 3),
+        "batch_ms_mean": round(statistics.mean(batched), 3),
+        "texts_per_second": round(len(CORPUS) / (statistics.mean(batched) / 1000), 1),
+        "peak_rss_mb": _peak_rss_mb(),
+        "results": results,
+    }
+
+def run_backend(backend: str, args) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "SENTIMENT_BACKEND": backend,
+        "SENTIMENT_WARMUP": "1",
+        "SENTIMENT_PRELOAD": "lazy",
+    })
+    if args.model_dir:
+        env["SENTIMENT_MODEL_DIR"] = args.model_dir
+    cmd = [sys.executable, "-m", "bench.sentiment_backends", "--worker",
+           "--repeats", str(args.repeats), "--batch-size", str(args.batch_size)]
+    out = subprocess.run(cmd, cwd=BACKEND_ROOT, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"error": out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "worker failed"}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def compare(reference: dict, other: dict, tolerance: float) -> dict:
+    ref, res = reference["results"], other["results"]
+    agree = sum(1 for a, b in zip(ref, res) if a["label"] == b["label"])
+    diffs = [abs(a["compound"] - b["compound"]) for a, b in zip(ref, res)]
+    return {
+        "label_agreement": round(agree / len(ref), 3),
+        "max_compound_diff": round(max(diffs), 4),
+        "within_tolerance": round(sum(1 for d in diffs if d <= tolerance) / len(diffs), 3),
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="pytorch,quantized,onnx")
+    parser.add_argument("--model-dir", default=os.getenv("SENTIMENT_MODEL_DIR", ""))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--tolerance", type=float, default=0.05, help="max |compound| difference per text")
+    parser.add_argument("--min-agreement", type=float, default=0.9, help="min share of matching labels")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(worker(args.repeats, args.batch_size)))
+        return 0
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    report = {}
+    for b in backends:
+        report[b] = run_backend(b, args)
+
+    ok = True
+    reference = backends[0]
+    for b in backends:
+        r = report[b]
+        if "error" in r:
+            print(f"{b:10s} ERROR {r['error']}")
+            ok = False
+            continue
+        line = (f"{b:10s} load {r['load_seconds']:7.2f}s  single p50 {r['single_ms_p50']:8.2f}ms "
+                f"p95 {r['single_ms_p95']:8.2f}ms  batch {r['texts_per_second']:8.1f} texts/s  rss {r['peak_rss_mb']} MB")
+        if b != reference and "error" not in report[reference]:
+            parity = compare(report[reference], r, args.tolerance)
+            r["parity"] = parity
+            line += f"  agreement {parity['label_agreement']:.2f} max diff {parity['max_compound_diff']:.3f}"
+            if parity["label_agreement"] < args.min_agreement or parity["within_tolerance"] < args.min_agreement:
+                line += "  PARITY FAIL"
+                ok = False
+        print(line)
+
+    for r in report.values():
+        r.pop("results", None)
+    print(json.dumps(report))
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+# backend/bench/suite.py
+"""
+Benchmark suite for the API hot paths, with a machine-readable result file
+and a regression check against a stored baseline.
+
+  micro  detect_risk, get_best_response, generate_recommendations,
+         analyze_text (SENTIMENT_BACKEND, stub unless set) and the chart-data
+         bucketing (chart_buckets, 30 and 365 days)
+  e2e    the FastAPI app in-process (TestClient) against a temporary SQLite
+         database seeded with --patients patients: login, POST /api/mood,
+         POST /api/chat, GET /api/therapist/patients and the CSV export of a
+         patient with --export-moods moods
+
+Each benchmark is calibrated so one sample takes at least --min-sample-ms,
+then timed over --samples samples; the result file records per-call
+p50/p90/mean/min in microseconds plus the commit, Python and platform.
+
+  python -m bench.suite list
+  python -m bench.suite run --out bench-baseline.json
+  python -m bench.suite run --only micro --baseline bench-baseline.json
+  python -m bench.suite compare bench-baseline.json bench-results.json
+
+A benchmark regresses when its p50 grew by more than --threshold and by more
+than --min-delta-us (timer noise on sub-microsecond calls); run --baseline
+and compare exit 1 if any did. Baselines are machine-specific: record one on
+the machine that runs the comparison.
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_SCHEMA = 1
+
+# name -> (group, setup); setup(ctx) returns the zero-argument callable to time
+BENCHMARKS = {}
+
+def benchmark(name: str, group: str):
+    def register(setup):
+        BENCHMARKS[name] = (group, setup)
+        return setup
+    return register
+
+TEXTS = [
+    "I feel great today, the walk really helped.",
+    "I am so sad and tired of everything.",
+    "ok",
+    "Work was stressful but I managed.",
+    "I can't sleep and my thoughts keep racing.",
+    "Had a lovely dinner with my family.",
+    "I feel hopeless and alone, I want to end it all.",
+    "Not bad, a fairly normal day.",
+    "I'm anxious about my exam tomorrow.",
+    "Grateful for my friends checking in on me.",
+    "Everything feels pointless lately.",
+    "My boss yelled at me and I cried in the car, I keep thinking about hurting myself.",
+]
+
+
+# ---- micro ----
+
+@benchmark("micro.detect_risk", "micro")
+def _detect_risk(ctx):
+    from src.ml.risk import detect_risk
+    cases = itertools.cycle([(t, c) for t in TEXTS for c in (-0.8, 0.0, 0.6)])
+    def run():
+        text, compound = next(cases)
+        detect_risk(text, compound)
+    return run
+
+@benchmark("micro.get_best_response", "micro")
+def _get_best_response(ctx):
+    from src.ml import retrieval
+    retrieval.preload()
+    messages = itertools.cycle(TEXTS)
+    return lambda: retrieval.get_best_response(next(messages))
+
+@benchmark("micro.generate_recommendations", "micro")
+def _generate_recommendations(ctx):
+    from src.ml.recommendations import generate_recommendations
+    contexts = itertools.cycle([
+        {"latest_mood_sentiment": -0.9, "latest_risk": "HIGH", "avg_7_days": -0.7, "avg_30_days": -0.5},
+        {"latest_mood_sentiment": -0.2, "latest_risk": "LOW", "avg_7_days": -0.6, "avg_30_days": -0.3},
+        {"latest_mood_sentiment": 0.1, "latest_risk": "MEDIUM", "avg_7_days": -0.2, "avg_30_days": 0.0},
+        {"latest_mood_sentiment": 0.7, "latest_risk": "LOW", "avg_7_days": 0.5, "avg_30_days": 0.4},
+        {"latest_mood_sentiment": None, "latest_risk": None, "avg_7_days": None, "avg_30_days": None},
+    ])
+    return lambda: generate_recommendations(next(contexts))
+
+@benchmark("micro.analyze_text", "micro")
+def _analyze_text(ctx):
+    from src.ml import sentiment_bert
+    if sentiment_bert.load_model() is None:
+        raise RuntimeError(f"sentiment backend {sentiment_bert.BACKEND!r} did not load: {sentiment_bert._load_error}")
+    texts = itertools.cycle(TEXTS)
+    return lambda: sentiment_bert.analyze_text(next(texts))
+
+@benchmark("micro.analyze_text_unbatched", "micro")
+def _analyze_text_unbatched(ctx):
+    # the pipeline call alone: a lone analyze_text also waits up to SENTIMENT_BATCH_MAX_WAIT_MS for company
+    from src.ml import sentiment_bert
+    sentiment_bert.load_model()
+    texts = itertools.cycle(TEXTS)
+    return lambda: sentiment_bert._run_batch([next(texts)])
+
+def _rollups(days: int):
+    from src.models import MoodDaily
+    rng = random.Random(days)
+    today = date.today()
+    rows = []
+    for d in range(days - 1, -1, -1):
+        if rng.random() < 0.8:
+            n = rng.randint(1, 4)
+            high = rng.randint(0, n)
+            medium = rng.randint(0, n - high)
+            rows.append(MoodDaily(user_id=1, day=today - timedelta(days=d), sentiment_sum=round(rng.uniform(-n, n), 3),
+                                  count=n, high=high, medium=medium, low=n - high - medium))
+    return today - timedelta(days=days - 1), rows
+
+@benchmark("micro.chart_buckets_30", "micro")
+def _chart_buckets_30(ctx):
+    from src.crud_mood import chart_buckets
+    start, rows = _rollups(30)
+    return lambda: chart_buckets(rows, start, 30)
+
+@benchmark("micro.chart_buckets_365", "micro")
+def _chart_buckets_365(ctx):
+    from src.crud_mood import chart_buckets
+    start, rows = _rollups(365)
+    return lambda: chart_buckets(rows, start, 365)
+
+
+# ---- e2e ----
+
+class App:
+    """The app under TestClient with a seeded database, built on first use."""
+    PASSWORD = "bench-password"
+
+    def __init__(self, args):
+        from fastapi.testclient import TestClient
+        from sqlalchemy import insert # type: ignore
+        from sqlmodel import Session # type: ignore
+        from src import models
+        from src.main import app
+        from src.database import engine
+        from src.auth_utils import create_access_token, get_password_hash
+        from src.crud_mood import rebuild_mood_rollups
+        from src.mood_state import rebuild_mood_states
+
+        rng = random.Random(args.seed)
+        self.client = TestClient(app)
+        self.client.__enter__()
+        now = datetime.utcnow()
+        pw = get_password_hash(self.PASSWORD)
+        with Session(engine) as s:
+            s.execute(insert(models.User), [
+                {"name": "therapist", "email": "therapist@example.com", "hashed_password": pw, "role": "therapist", "created_at": now},
+                *({"name": f"patient {i}", "email": f"p{i}@example.com", "hashed_password": pw, "role": "patient", "created_at": now}
+                  for i in range(args.patients)),
+            ])
+            self.therapist_id, self.patient_id = 1, 2
+            risks = ["LOW", "LOW", "MEDIUM", "HIGH"]
+            rows = [{"user_id": uid, "text": rng.choice(TEXTS), "date": now - timedelta(minutes=rng.randrange(30 * 24 * 60)),
+                     "sentiment": round(rng.uniform(-1, 1), 3), "risk": rng.choice(risks)}
+                    for uid in range(2, args.patients + 2) for _ in range(args.patient_moods)]
+            rows += [{"user_id": self.patient_id, "text": rng.choice(TEXTS), "date": now - timedelta(minutes=rng.randrange(365 * 24 * 60)),
+                      "sentiment": round(rng.uniform(-1, 1), 3), "risk": rng.choice(risks)}
+                     for _ in range(args.export_moods)]
+            rows.sort(key=lambda r: r["date"])
+            for i in range(0, len(rows), 10_000):
+                s.execute(insert(models.Mood), rows[i:i + 10_000])
+            s.execute(insert(models.Booking), [{"patient_id": uid, "therapist_id": self.therapist_id, "datetime": now + timedelta(hours=uid),
+                                                "status": "scheduled", "created_at": now} for uid in range(2, args.patients + 2)])
+            s.commit()
+            rebuild_mood_rollups(s)
+            rebuild_mood_states(s)
+        self.patient = {"Authorization": f"Bearer {create_access_token(str(self.patient_id))}"}
+        self.therapist = {"Authorization": f"Bearer {create_access_token(str(self.therapist_id))}"}
+
+    def check(self, r):
+        if r.status_code != 200:
+            raise RuntimeError(f"{r.request.method} {r.request.url.path}: {r.status_code} {r.text[:200]}")
+        return r
+
+    def close(self):
+        self.client.__exit__(None, None, None)
+
+@benchmark("e2e.login", "e2e")
+def _login(ctx):
+    app = ctx.app()
+    body = {"email": "p0@example.com", "password": App.PASSWORD}
+    return lambda: app.check(app.client.post("/api/auth/login", json=body))
+
+@benchmark("e2e.post_mood", "e2e")
+def _post_mood(ctx):
+    app = ctx.app()
+    texts = itertools.cycle(TEXTS)
+    return lambda: app.check(app.client.post("/api/mood", json={"text": next(texts)}, headers=app.patient))
+
+@benchmark("e2e.post_chat", "e2e")
+def _post_chat(ctx):
+    app = ctx.app()
+    texts = itertools.cycle(TEXTS)
+    return lambda: app.check(app.client.post("/api/chat", json={"message": next(texts)}, headers=app.patient))
+
+@benchmark("e2e.therapist_patients", "e2e")
+def _therapist_patients(ctx):
+    app = ctx.app()
+    return lambda: app.check(app.client.get("/api/therapist/patients?limit=500&sort=risk", headers=app.therapist))
+
+@benchmark("e2e.export_csv", "e2e")
+def _export_csv(ctx):
+    app = ctx.app()
+    return lambda: app.check(app.client.get("/api/export/csv", headers=app.patient)).content
+
+
+# ---- timing, results, comparison ----
+
+class Context:
+    def __init__(self, args):
+        self.args = args
+        self._app = None
+
+    def app(self) -> App:
+        if self._app is None:
+            self._app = App(self.args)
+        return self._app
+
+    def close(self):
+        if self._app is not None:
+            self._app.close()
+
+def measure(fn, samples: int, min_sample_s: float, disable_gc: bool) -> dict:
+    """Per-call timings: calls per sample doubled until a sample takes min_sample_s (like timeit.autorange)."""
+    fn()  # warm-up (first-call imports, caches, lazy engines)
+    number = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - t >= min_sample_s:
+            break
+        number *= 2
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    if disable_gc:
+        gc.disable()
+    try:
+        per_call = []
+        for _ in range(samples):
+            t = time.perf_counter()
+            for _ in range(number):
+                fn()
+            per_call.append((time.perf_counter() - t) / number * 1e6)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    per_call.sort()
+    p50 = statistics.median(per_call)
+    return {
+        "p50_us": round(p50, 3),
+        "p90_us": round(per_call[min(len(per_call) - 1, int(len(per_call) * 0.9))], 3),
+        "mean_us": round(statistics.fmean(per_call), 3),
+        "min_us": round(per_call[0], 3),
+        "samples": samples,
+        "calls_per_sample": number,
+        "ops_per_s": round(1e6 / p50, 1) if p50 else None,
+    }
+
+def _selected(only):
+    if not only:
+        return list(BENCHMARKS)
+    names = [n for n in BENCHMARKS if any(n == o or BENCHMARKS[n][0] == o or n.startswith(o) for o in only)]
+    if not names:
+        raise SystemExit(f"no benchmark matches {', '.join(only)}; see `python -m bench.suite list`")
+    return names
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run(args) -> dict:
+    tmp = tempfile.mkdtemp(prefix="mh-suite-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'suite.db')}"
+    os.environ["DATABASE_READ_URL"] = ""
+    os.environ.setdefault("SENTIMENT_BACKEND", "stub")
+
+    results = {}
+    ctx = Context(args)
+    try:
+        for name in _selected(args.only):
+            group, setup = BENCHMARKS[name]
+            fn = setup(ctx)
+            results[name] = {"group": group, **measure(fn, args.samples, args.min_sample_ms / 1000, disable_gc=group == "micro")}
+            print(f"{name:32} {results[name]['p50_us']:>12.1f} us", file=sys.stderr)
+    finally:
+        ctx.close()
+    return {
+        "schema": RESULT_SCHEMA,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "sentiment_backend": os.environ["SENTIMENT_BACKEND"],
+        "params": {"samples": args.samples, "min_sample_ms": args.min_sample_ms, "patients": args.patients,
+                   "patient_moods": args.patient_moods, "export_moods": args.export_moods, "seed": args.seed},
+        "benchmarks": results,
+    }
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_us: float) -> dict:
+    """Compare p50s benchmark by benchmark; only benchmarks present in both runs can regress."""
+    if baseline.get("schema") != current.get("schema"):
+        raise SystemExit(f"result schema mismatch: baseline {baseline.get('schema')}, current {current.get('schema')}")
+    rows = {}
+    for name, cur in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            rows[name] = {"status": "new", "current_p50_us": cur["p50_us"]}
+            continue
+        delta = cur["p50_us"] - base["p50_us"]
+        ratio = cur["p50_us"] / base["p50_us"] if base["p50_us"] else float("inf")
+        if ratio > 1 + threshold and delta > min_delta_us:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold) and -delta > min_delta_us:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows[name] = {"status": status, "baseline_p50_us": base["p50_us"], "current_p50_us": cur["p50_us"], "change": round(ratio - 1, 3)}
+    regressions = sorted(n for n, r in rows.items() if r["status"] == "regression")
+    return {
+        "baseline": {"commit": baseline.get("commit"), "created_at": baseline.get("created_at"), "platform": baseline.get("platform")},
+        "threshold": threshold,
+        "min_delta_us": min_delta_us,
+        "benchmarks": rows,
+        "not_run": sorted(set(baseline["benchmarks"]) - set(current["benchmarks"])),
+        "regressions": regressions,
+    }
+
+def _print_comparison(comparison: dict):
+    for name, r in comparison["benchmarks"].items():
+        if r["status"] == "new":
+            print(f"{name:32} {'':>12} {r['current_p50_us']:>12.1f} us  new", file=sys.stderr)
+        else:
+            print(f"{name:32} {r['baseline_p50_us']:>12.1f} {r['current_p50_us']:>12.1f} us  {r['change']:+7.1%}  {r['status']}", file=sys.stderr)
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+def _write(doc: dict, path: str):
+    if path:
+        with open(path, "w") as f:
+            json.dump(doc, f, indent=2)
+            f.write("\n")
+    else:
+        print(json.dumps(doc, indent=2))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="list the benchmarks")
+
+    p_run = sub.add_parser("run", help="run benchmarks and write the results")
+    p_run.add_argument("--only", nargs="*", help="benchmark names, name prefixes or groups (micro, e2e)")
+    p_run.add_argument("--out", default="", help="result file (default: stdout)")
+    p_run.add_argument("--baseline", default="", help="result file to compare against")
+    p_run.add_argument("--samples", type=int, default=25)
+    p_run.add_argument("--min-sample-ms", type=float, default=20.0)
+    p_run.add_argument("--patients", type=int, default=500)
+    p_run.add_argument("--patient-moods", type=int, default=20, help="moods per roster patient")
+    p_run.add_argument("--export-moods", type=int, default=5000, help="extra moods for the exported patient")
+    p_run.add_argument("--seed", type=int, default=17)
+
+    p_cmp = sub.add_parser("compare", help="compare two result files")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    for p in (p_run, p_cmp):
+        p.add_argument("--threshold", type=float, default=0.25, help="relative p50 growth that counts as a regression")
+        p.add_argument("--min-delta-us", type=float, default=1.0, help="ignore p50 changes smaller than this")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name, (group, setup) in BENCHMARKS.items():
+            print(f"{name:32} {group}")
+        return 0
+    if args.command == "compare":
+        comparison = compare(_load(args.baseline), _load(args.current), args.threshold, args.min_delta_us)
+        _print_comparison(comparison)
+        print(json.dumps(comparison, indent=2))
+        return 1 if comparison["regressions"] else 0
+
+    baseline = _load(args.baseline) if args.baseline else None
+    doc = run(args)
+    if baseline is not None:
+        doc["comparison"] = compare(baseline, doc, args.threshold, args.min_delta_us)
+        _print_comparison(doc["comparison"])
+    _write(doc, args.out)
+    return 1 if baseline is not None and doc["comparison"]["regressions"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
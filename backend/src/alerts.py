@@ -0,0 +1,221 @@
+# backend/src/alerts.py
+"""
+Push channel for HIGH-risk mood entries.
+
+Writers call publish_moods() after their commit; every connected therapist
+stream (GET /api/audit/high-risk/stream, Server-Sent Events) gets the entry
+without polling the Mood table.
+
+Each subscriber has a bounded buffer (ALERT_BUFFER_SIZE). A client that falls
+that far behind doesn't hold memory: its buffer is dropped and the stream
+catches up from the database instead, with the same incremental query that
+serves resume after a reconnect (risk == HIGH AND id > last event id, on the
+(risk, id) index). Event ids are mood ids, so the browser's Last-Event-ID
+header is the resume point.
+
+The bus is per process: with several workers a stream only hears about
+writes made in its own worker until its next catch-up query.
+"""
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func # type: ignore
+from sqlmodel import select # type: ignore
+
+from .models import Mood
+
+ALERT_BUFFER_SIZE = int(os.getenv("ALERT_BUFFER_SIZE", "256"))
+ALERT_MAX_SUBSCRIBERS = int(os.getenv("ALERT_MAX_SUBSCRIBERS", "500"))
+# at most this many missed alerts are replayed on resume (the newest ones)
+ALERT_REPLAY_MAX = int(os.getenv("ALERT_REPLAY_MAX", "500"))
+ALERT_HEARTBEAT_S = float(os.getenv("ALERT_HEARTBEAT_S", "15"))
+# reconnect delay suggested to EventSource clients
+ALERT_RETRY_MS = int(os.getenv("ALERT_RETRY_MS", "3000"))
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+def alert_payload(m) -> dict:
+    """The GET /api/audit/high-risk row shape, for a Mood or a mood row dict."""
+    get = m.get if isinstance(m, dict) else lambda k: getattr(m, k)
+    date = get("date")
+    return {"id": get("id"), "user_id": get("user_id"), "date": date.isoformat() if date else None,
+            "text": get("text"), "sentiment": get("sentiment"), "risk": get("risk")}
+
+
+class Subscription:
+    """One stream's view of the bus. Created and read on the event loop; fed from any thread."""
+
+    def __init__(self, bus: "AlertBus", maxlen: int):
+        self.bus = bus
+        self.maxlen = maxlen
+        self.buffer: deque = deque()
+        self.lagged = False
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+
+    def _push(self, alert: dict) -> bool:
+        """Called with the bus lock held. Returns False if the buffer overflowed."""
+        ok = not self.lagged and len(self.buffer) < self.maxlen
+        if ok:
+            self.buffer.append(alert)
+        elif not self.lagged:
+            # drop what's buffered; the reader catches up from the database
+            self.buffer.clear()
+            self.lagged = True
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # loop already closed
+        return ok
+
+    async def get(self, timeout: float) -> Tuple[List[dict], bool]:
+        """Wait up to `timeout` for alerts. Returns (alerts, lagged)."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return [], False
+        with self.bus._lock:
+            self._ready.clear()
+            alerts, self.buffer = list(self.buffer), deque()
+            lagged, self.lagged = self.lagged, False
+        return alerts, lagged
+
+
+class AlertBus:
+    def __init__(self, buffer_size: int = ALERT_BUFFER_SIZE, max_subscribers: int = ALERT_MAX_SUBSCRIBERS):
+        self.buffer_size = max(1, buffer_size)
+        self.max_subscribers = max_subscribers
+        self._subs: set = set()
+        self._lock = threading.Lock()
+        self._published = 0
+        self._delivered = 0
+        self._overflows = 0
+        self._rejected = 0
+        self._replays = 0
+        self._replayed_rows = 0
+
+    def full(self) -> bool:
+        with self._lock:
+            return len(self._subs) >= self.max_subscribers
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self, self.buffer_size)
+        with self._lock:
+            if len(self._subs) >= self.max_subscribers:
+                self._rejected += 1
+                raise TooManySubscribers(f"At most {self.max_subscribers} alert streams")
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def publish(self, alert: dict):
+        """Fan an alert out to every subscriber. Safe to call from any thread."""
+        with self._lock:
+            self._published += 1
+            for sub in self._subs:
+                if sub._push(alert):
+                    self._delivered += 1
+                else:
+                    self._overflows += 1
+
+    def record_replay(self, rows: int):
+        with self._lock:
+            self._replays += 1
+            self._replayed_rows += rows
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subs),
+                "max_subscribers": self.max_subscribers,
+                "buffer_size": self.buffer_size,
+                "published": self._published,
+                "delivered": self._delivered,
+                # alerts a slow subscriber missed live (it caught up from the database)
+                "overflows": self._overflows,
+                "rejected_subscribers": self._rejected,
+                "replays": self._replays,
+                "replayed_rows": self._replayed_rows,
+            }
+
+alert_bus = AlertBus()
+
+def publish_moods(moods: Iterable):
+    """Publish the HIGH-risk ones among committed moods (Mood objects or row dicts with an id)."""
+    for m in moods:
+        risk = m.get("risk") if isinstance(m, dict) else m.risk
+        if risk == "HIGH":
+            alert_bus.publish(alert_payload(m))
+
+
+def high_risk_after_stmt(after_id: int, limit: int = ALERT_REPLAY_MAX):
+    """The newest `limit` HIGH-risk moods with id > after_id, newest first."""
+    return (select(Mood).where(Mood.risk == "HIGH").where(Mood.id > after_id)
+            .order_by(Mood.id.desc()).limit(limit))
+
+def latest_high_risk_id_stmt():
+    return select(func.max(Mood.id)).where(Mood.risk == "HIGH")
+
+def _sse(alert: dict) -> str:
+    return f"id: {alert['id']}\nevent: high-risk\ndata: {json.dumps(alert, separators=(',', ':'))}\n\n"
+
+async def stream_alerts(last_event_id: Optional[int] = None, heartbeat: float = ALERT_HEARTBEAT_S):
+    """
+    SSE stream of HIGH-risk alerts. Without last_event_id only alerts
+    committed after the connection are sent; with it, missed ones (up to
+    ALERT_REPLAY_MAX, the newest) are replayed first. Routes should check
+    alert_bus.full() first; a stream that still finds the bus full just ends
+    and the client retries.
+    """
+    from sqlmodel.ext.asyncio.session import AsyncSession # type: ignore
+    from .database import get_async_read_engine
+
+    async def replay(after_id: int) -> Tuple[List[dict], int]:
+        async with AsyncSession(get_async_read_engine()) as session:
+            rows = (await session.exec(high_risk_after_stmt(after_id))).all()
+        alert_bus.record_replay(len(rows))
+        alerts = [alert_payload(m) for m in reversed(rows)]
+        return alerts, (alerts[-1]["id"] if alerts else after_id)
+
+    yield f"retry: {ALERT_RETRY_MS}\n\n"
+    try:
+        # subscribe before reading the high-water mark so nothing committed in between is lost
+        sub = alert_bus.subscribe()
+    except TooManySubscribers:
+        return
+    try:
+        if last_event_id is None:
+            async with AsyncSession(get_async_read_engine()) as session:
+                last = (await session.exec(latest_high_risk_id_stmt())).one() or 0
+        else:
+            alerts, last = await replay(last_event_id)
+            for a in alerts:
+                yield _sse(a)
+        while True:
+            alerts, lagged = await sub.get(heartbeat)
+            if lagged:
+                alerts, last = await replay(last)
+                for a in alerts:
+                    yield _sse(a)
+                continue
+            if not alerts:
+                yield ": keep-alive\n\n"
+                continue
+            for a in alerts:
+                # already sent by a replay (ids follow commit order with a single writer)
+                if a["id"] <= last:
+                    continue
+                last = a["id"]
+                yield _sse(a)
+    finally:
+        alert_bus.unsubscribe(sub)
@@ -1,4 +1,5 @@
 import os
+import time
 from passlib.context import CryptContext # type: ignore
 import jwt # type: ignore
 from datetime import datetime, timedelta
@@ -10,8 +11,20 @@ SECRET_KEY = os.getenv("SECRET_KEY", "change-me")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "10080"))
 
+# Work factor for new hashes; stored hashes with fewer rounds are upgraded on login
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+# Hashing pool: "process" (default), "thread" or "inline"
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
 # Use pbkdf2_sha256 to avoid bcrypt native dependency and the 72-byte limit.
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=PASSWORD_HASH_ROUNDS,
+)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
@@ -19,9 +32,53 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
-def create_access_token(subject: str, expires_delta: int = None) -> str:
-    expire = datetime.utcnow() + timedelta(minutes=(expires_delta if expires_delta is not None else ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode = {"exp": expire, "sub": str(subject)}
+def verify_and_update(plain_password: str, hashed_password: str):
+    """(valid, new_hash); new_hash is set when the stored hash is outdated."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# Pool workers: module-level so they can be pickled; each returns (result, seconds hashing)
+def _hash_job(password: str):
+    t = time.perf_counter()
+    return get_password_hash(password), time.perf_counter() - t
+
+def _verify_job(password: str, hashed: str):
+    t = time.perf_counter()
+    return verify_and_update(password, hashed), time.perf_counter() - t
+
+_pool = None
+
+def hashing_pool():
+    global _pool
+    if _pool is None:
+        from .hashing import HashingPool
+        _pool = HashingPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE, PASSWORD_HASH_EXECUTOR, name="password-hashing")
+    return _pool
+
+def get_password_hash_pooled(password: str) -> str:
+    """get_password_hash() on the hashing pool, waited for in the calling thread; raises HashingBusy when saturated."""
+    return hashing_pool().call(_hash_job, password)
+
+def verify_and_update_pooled(plain_password: str, hashed_password: str):
+    """verify_and_update() on the hashing pool, waited for in the calling thread; raises HashingBusy when saturated."""
+    return hashing_pool().call(_verify_job, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash() on the hashing pool; raises HashingBusy when saturated."""
+    return await hashing_pool().run(_hash_job, password)
+
+async def verify_and_update_async(plain_password: str, hashed_password: str):
+    """verify_and_update() on the hashing pool; raises HashingBusy when saturated."""
+    return await hashing_pool().run(_verify_job, plain_password, hashed_password)
+
+def create_access_token(subject: str, expires_delta: int = None, claims: dict = None) -> str:
+    """
+    `claims` (e.g. role/name/email) are added to the payload; reserved
+    claims (sub/exp/iat) can't be overridden.
+    """
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=(expires_delta if expires_delta is not None else ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode = dict(claims or {})
+    to_encode.update({"exp": expire, "iat": now, "sub": str(subject)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
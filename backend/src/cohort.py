@@ -0,0 +1,431 @@
+# backend/src/cohort.py
+"""
+Cohort analytics over a therapist's caseload (every patient with a booking
+or session with them).
+
+A therapist's data is loaded with one query over the MoodDaily rollup
+(restricted to the caseload and to the window: COHORT_LOAD_DAYS, or longer
+if a request asks for more, plus 29 days for the rolling means) into dense
+patients x days NumPy matrices (sentiment sum, entries, HIGH and MEDIUM counts). Every statistic
+is a vectorized reduction over those matrices, for all patients at once:
+  - per patient: 7/30-day averages (same day cutoff as
+    crud_mood.avg_mood_for_user), trend (least-squares slope of the daily
+    mean sentiment, per day), volatility (std of the daily means), and the
+    share of HIGH/MEDIUM entries over the window;
+  - for the cohort: daily mean sentiment with trailing 7- and 30-day
+    rolling means, and the same summary figures.
+
+Loading is bound by the database (millions of rollup rows for a large
+caseload), so matrices are cached per therapist (COHORT_CACHE_TTL_S, at most
+COHORT_CACHE_MAX_ENTRIES therapists) and shifted by a column when the UTC
+day changes rather than reloaded. New moods are added to the cached cells in place (record_moods, called by
+crud_mood after each commit), so a write only re-runs the reductions. A new
+patient in the caseload drops the therapist's entry.
+
+Moods committed while a load is running are buffered and replayed into the
+loaded matrices if their id is above the highest mood id the load could see.
+
+NumPy is imported on first use.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Integer, cast, func, union # type: ignore
+from sqlmodel import select # type: ignore
+
+from .models import Booking, Mood, MoodDaily, Session as SessionModel
+
+COHORT_MAX_DAYS = int(os.getenv("COHORT_MAX_DAYS", "365"))
+# window loaded on a therapist's first request; a longer ?days= reloads it wider
+COHORT_LOAD_DAYS = int(os.getenv("COHORT_LOAD_DAYS", "90"))
+COHORT_CACHE_TTL_S = float(os.getenv("COHORT_CACHE_TTL_S", "3600"))
+COHORT_CACHE_MAX_ENTRIES = int(os.getenv("COHORT_CACHE_MAX_ENTRIES", "16"))
+# a slope beyond +-this (sentiment per day) counts as improving / declining
+COHORT_TREND_EPS = float(os.getenv("COHORT_TREND_EPS", "0.005"))
+ROLLING_DAYS = (7, 30)
+COHORT_SORTS = ("trend", "volatility", "high_share", "avg_7_days")
+# the 30-day rolling mean of the window's first day needs 29 earlier days
+_LEAD = ROLLING_DAYS[-1] - 1
+_FETCH_CHUNK = 100_000
+
+
+def _caseload_stmt(therapist_id: int):
+    return union(
+        select(Booking.patient_id).where(Booking.therapist_id == therapist_id),
+        select(SessionModel.patient_id).where(SessionModel.therapist_id == therapist_id),
+    )
+
+def _day_offset(dialect_name: str, first_day: date):
+    if dialect_name == "sqlite":
+        return cast(func.julianday(MoodDaily.day) - func.julianday(first_day.isoformat()), Integer)
+    # PostgreSQL: date - date is a number of days
+    return MoodDaily.day - first_day
+
+def _rows_stmt(therapist_id: int, first_day: date, dialect_name: str):
+    # all numeric, so the rows can go straight from the cursor into one array
+    return (select(MoodDaily.user_id, _day_offset(dialect_name, first_day), MoodDaily.sentiment_sum,
+                   MoodDaily.count, MoodDaily.high, MoodDaily.medium)
+            .where(MoodDaily.user_id.in_(_caseload_stmt(therapist_id).scalar_subquery()))
+            .where(MoodDaily.day >= first_day))
+
+def _high_water_stmt():
+    return select(func.max(Mood.id))
+
+def fetch_rollups(session, therapist_id: int, first_day: date):
+    """
+    The caseload's MoodDaily rows from `first_day` on as one float array
+    (user_id, day offset, sentiment_sum, count, high, medium). Rows are read
+    from the DBAPI cursor in chunks; building a Row object per rollup row
+    costs more than the query at 10k patients x 1 year.
+    """
+    import numpy as np
+
+    conn = session.connection()
+    result = conn.execute(_rows_stmt(therapist_id, first_day, conn.dialect.name))
+    parts = []
+    try:
+        while True:
+            chunk = result.cursor.fetchmany(_FETCH_CHUNK)
+            if not chunk:
+                break
+            parts.append(np.array(chunk, dtype=np.float64))
+    finally:
+        result.close()
+    return np.concatenate(parts) if parts else np.zeros((0, 6))
+
+
+class CohortData:
+    """One therapist's caseload as patients x days matrices; the last column is `today`."""
+
+    def __init__(self, patient_ids: List[int], rows, today: date, days: int, high_water: int, expires: float):
+        import numpy as np
+
+        self.np = np
+        self.days = days
+        self.columns = days + _LEAD
+        self.today = today
+        self.first_day = today - timedelta(days=self.columns - 1)
+        self.high_water = high_water
+        self.expires = expires
+        self.patient_ids = np.asarray(sorted(set(patient_ids)), dtype=np.int64)
+        self.index = {int(p): i for i, p in enumerate(self.patient_ids)}
+        shape = (len(self.patient_ids), self.columns)
+        self.sums = np.zeros(shape, dtype=np.float64)
+        self.counts = np.zeros(shape, dtype=np.int32)
+        self.high = np.zeros(shape, dtype=np.int32)
+        self.medium = np.zeros(shape, dtype=np.int32)
+        # memoized analyze() results; `version` counts the moods added since the load
+        self.results: Dict[tuple, dict] = {}
+        self.version = 0
+        c = rows[:, 1].astype(np.int64)
+        # entries dated after today (clients may set the date) would be missing once the window moves
+        self.has_future = bool((c >= self.columns).any())
+        rows = rows[(c >= 0) & (c < self.columns)]
+        r = np.searchsorted(self.patient_ids, rows[:, 0].astype(np.int64))
+        c = rows[:, 1].astype(np.int64)
+        # (user_id, day) is MoodDaily's primary key, so each cell is set once
+        self.sums[r, c] = rows[:, 2]
+        self.counts[r, c] = rows[:, 3]
+        self.high[r, c] = rows[:, 4]
+        self.medium[r, c] = rows[:, 5]
+
+    def advance(self, today: date) -> bool:
+        """Move the window to end on `today`; False if it has to be reloaded instead."""
+        shift = (today - self.today).days
+        if shift <= 0:
+            return shift == 0
+        if self.has_future:
+            return False
+        for m in (self.sums, self.counts, self.high, self.medium):
+            if shift < self.columns:
+                m[:, :-shift] = m[:, shift:]
+                m[:, -shift:] = 0
+            else:
+                m[:] = 0
+        self.today = today
+        self.first_day = today - timedelta(days=self.columns - 1)
+        self.version += 1
+        self.results.clear()
+        return True
+
+    def record(self, mood_id: int, user_id: int, when: datetime, sentiment: Optional[float], risk: Optional[str]) -> bool:
+        if mood_id is not None and mood_id <= self.high_water:
+            return False
+        row = self.index.get(user_id)
+        col = (when.date() - self.first_day).days
+        if row is None or not 0 <= col < self.columns:
+            return False
+        # same accounting as the MoodDaily rollup
+        self.sums[row, col] += float(sentiment or 0.0)
+        self.counts[row, col] += 1
+        if risk == "HIGH":
+            self.high[row, col] += 1
+        elif risk == "MEDIUM":
+            self.medium[row, col] += 1
+        self.version += 1
+        self.results.clear()
+        return True
+
+    def analyze(self, days: int = 90, sort: str = "trend", limit: int = 50) -> dict:
+        """Cohort figures over the last `days` days and the `limit` first patients by `sort`."""
+        key = (days, sort, limit)
+        if key in self.results:
+            return self.results[key]
+        version = self.version
+        np = self.np
+        w = min(days, self.days)
+        sums, counts = self.sums[:, -w:], self.counts[:, -w:]
+        high, medium = self.high[:, -w:], self.medium[:, -w:]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            entries = counts.sum(axis=1)
+            avg = {}
+            for n in ROLLING_DAYS:
+                # the last n calendar days including today, as avg_mood_for_user
+                s = self.sums[:, -n:].sum(axis=1)
+                c = self.counts[:, -n:].sum(axis=1)
+                avg[n] = np.where(c > 0, s / c, np.nan)
+
+            # least squares of the daily mean over the days with entries
+            has = counts > 0
+            y = np.where(has, sums / np.maximum(counts, 1), 0.0)
+            x = np.arange(w, dtype=np.float64)
+            k = has.sum(axis=1).astype(np.float64)
+            sx, sxx = has @ x, has @ (x * x)
+            sy, sxy, syy = y.sum(axis=1), y @ x, (y * y).sum(axis=1)
+            den = k * sxx - sx * sx
+            trend = np.where((k >= 2) & (den > 0), (k * sxy - sx * sy) / den, np.nan)
+            mean = sy / k
+            volatility = np.where(k >= 2, np.sqrt(np.maximum(syy / k - mean * mean, 0.0)), np.nan)
+            high_share = np.where(entries > 0, high.sum(axis=1) / entries, np.nan)
+            medium_share = np.where(entries > 0, medium.sum(axis=1) / entries, np.nan)
+            last = np.where(k > 0, w - 1 - np.argmax(has[:, ::-1], axis=1), -1)
+
+            # cohort series with a lead-in so the first day's rolling means are complete
+            lead = _LEAD
+            day_sums = self.sums[:, -(w + lead):].sum(axis=0)
+            day_counts = self.counts[:, -(w + lead):].sum(axis=0)
+            cs = np.concatenate(([0.0], np.cumsum(day_sums)))
+            cc = np.concatenate(([0], np.cumsum(day_counts)))
+            rolling = {}
+            for n in ROLLING_DAYS:
+                hi = np.arange(lead + 1, lead + w + 1)
+                tot_c = cc[hi] - cc[hi - n]
+                rolling[n] = np.where(tot_c > 0, (cs[hi] - cs[hi - n]) / tot_c, np.nan)
+            daily_mean = np.where(day_counts[lead:] > 0, day_sums[lead:] / day_counts[lead:], np.nan)
+
+            total_entries = int(entries.sum())
+            summary = {
+                "avg_7_days": _num(self.sums[:, -7:].sum() / self.counts[:, -7:].sum() if self.counts[:, -7:].any() else np.nan),
+                "avg_30_days": _num(self.sums[:, -30:].sum() / self.counts[:, -30:].sum() if self.counts[:, -30:].any() else np.nan),
+                "high_share": _num(high.sum() / total_entries if total_entries else np.nan, 4),
+                "medium_share": _num(medium.sum() / total_entries if total_entries else np.nan, 4),
+                "improving": int((trend > COHORT_TREND_EPS).sum()),
+                "declining": int((trend < -COHORT_TREND_EPS).sum()),
+                "median_volatility": _num(np.nanmedian(volatility) if (k >= 2).any() else np.nan, 4),
+            }
+
+        order_by = {"trend": trend, "volatility": -volatility, "high_share": -high_share, "avg_7_days": avg[7]}[sort]
+        # NaN (too little data) last, ties by patient id
+        order = np.lexsort((self.patient_ids, order_by, np.isnan(order_by)))[:limit]
+
+        start = self.today - timedelta(days=w - 1)
+        result = {
+            "as_of": self.today.isoformat(),
+            "days": w,
+            "caseload": len(self.patient_ids),
+            "active_patients": int((entries > 0).sum()),
+            "entries": total_entries,
+            "summary": summary,
+            "daily": [
+                {"date": (start + timedelta(days=i)).isoformat(), "count": int(day_counts[lead + i]),
+                 "avg_sentiment": _num(daily_mean[i]), "rolling_7": _num(rolling[7][i]), "rolling_30": _num(rolling[30][i])}
+                for i in range(w)
+            ],
+            "patients": [
+                {
+                    "id": int(self.patient_ids[i]),
+                    "entries": int(entries[i]),
+                    "last_entry_day": (start + timedelta(days=int(last[i]))).isoformat() if last[i] >= 0 else None,
+                    "avg_7_days": _num(avg[7][i]),
+                    "avg_30_days": _num(avg[30][i]),
+                    "trend": _num(trend[i], 4),
+                    "volatility": _num(volatility[i], 4),
+                    "high_share": _num(high_share[i], 4),
+                    "medium_share": _num(medium_share[i], 4),
+                }
+                for i in order
+            ],
+        }
+        if self.version == version:
+            # a mood added meanwhile may be half counted; don't keep that
+            self.results[key] = result
+        return result
+
+
+def _num(v, digits: int = 2):
+    v = float(v)
+    return None if v != v else round(v, digits)
+
+
+class CohortCache:
+    def __init__(self, ttl_s: float = COHORT_CACHE_TTL_S, max_entries: int = COHORT_CACHE_MAX_ENTRIES):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, CohortData]" = OrderedDict()
+        # patient_id -> therapists whose cached caseload includes them
+        self._members: Dict[int, set] = {}
+        # loads in flight -> moods committed since they started
+        self._pending: Dict[int, list] = {}
+        self._next_load = 0
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_s = 0.0
+        self.updates = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, therapist_id: int, days: int = COHORT_LOAD_DAYS) -> Optional[CohortData]:
+        """The cached matrices if they cover the last `days` days."""
+        now = time.monotonic()
+        today = datetime.utcnow().date()
+        with self._lock:
+            entry = self._entries.get(therapist_id)
+            if entry is None or entry.days < days:
+                self.misses += 1
+                return None
+            if entry.expires <= now or not entry.advance(today):
+                self._drop(therapist_id)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(therapist_id)
+            self.hits += 1
+            return entry
+
+    def _drop(self, therapist_id: int):
+        entry = self._entries.pop(therapist_id, None)
+        if entry is None:
+            return
+        for p in entry.index:
+            owners = self._members.get(p)
+            if owners is not None:
+                owners.discard(therapist_id)
+                if not owners:
+                    del self._members[p]
+
+    def load(self, session, therapist_id: int, days: int = COHORT_LOAD_DAYS) -> CohortData:
+        """Cached matrices, or load them (one caseload query, one rollup query) and cache them."""
+        entry = self.get(therapist_id, days)
+        if entry is not None:
+            return entry
+        days = min(max(days, COHORT_LOAD_DAYS), COHORT_MAX_DAYS)
+        with self._lock:
+            token = self._next_load
+            self._next_load += 1
+            self._pending[token] = []
+        started = time.perf_counter()
+        try:
+            today = datetime.utcnow().date()
+            first_day = today - timedelta(days=days + _LEAD - 1)
+            # one read transaction, so the high-water id matches the rollups
+            high_water = session.exec(_high_water_stmt()).one() or 0
+            patients = session.execute(_caseload_stmt(therapist_id)).scalars().all()
+            rows = fetch_rollups(session, therapist_id, first_day)
+            entry = CohortData(patients, rows, today, days, high_water, time.monotonic() + self.ttl_s)
+        finally:
+            with self._lock:
+                pending = self._pending.pop(token)
+        with self._lock:
+            self.loads += 1
+            self.load_s += time.perf_counter() - started
+            self._drop(therapist_id)
+            # fold in what was committed while the queries ran
+            if all(self._fold(entry, item) is not None for item in pending):
+                self._entries[therapist_id] = entry
+                for p in entry.index:
+                    self._members.setdefault(p, set()).add(therapist_id)
+                while len(self._entries) > self.max_entries:
+                    self._drop(next(iter(self._entries)))
+                    self.evictions += 1
+        return entry
+
+    def _fold(self, entry: CohortData, item: tuple) -> Optional[bool]:
+        """Add one mood to `entry`; None if the entry can't take it and has to be reloaded."""
+        day = item[2].date()
+        if day > entry.today:
+            # the day rolled over since the last request; a future date can't be placed yet
+            if day > datetime.utcnow().date() or not entry.advance(day):
+                return None
+        return entry.record(*item)
+
+    def record_moods(self, moods: Iterable):
+        """Add committed moods (Mood objects or row dicts with an id) to the cached matrices."""
+        with self._lock:
+            if not self._entries and not self._pending:
+                return
+            for m in moods:
+                get = m.get if isinstance(m, dict) else lambda k, m=m: getattr(m, k)
+                item = (get("id"), get("user_id"), get("date"), get("sentiment"), get("risk"))
+                for pending in self._pending.values():
+                    pending.append(item)
+                for tid in list(self._members.get(item[1], ())):
+                    folded = self._fold(self._entries[tid], item)
+                    if folded is None:
+                        self._drop(tid)
+                        self.invalidations += 1
+                    elif folded:
+                        self.updates += 1
+
+    def caseload_changed(self, therapist_id: int, patient_id: int):
+        """A booking or session links `patient_id` to `therapist_id`."""
+        with self._lock:
+            entry = self._entries.get(therapist_id)
+            if entry is not None and patient_id not in entry.index:
+                self._drop(therapist_id)
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id: int):
+        """Drop every entry for or containing `user_id` (e.g. a deleted account)."""
+        with self._lock:
+            for tid in {user_id} | self._members.get(user_id, set()):
+                if tid in self._entries:
+                    self._drop(tid)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._members.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "patients_cached": sum(len(e.index) for e in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "loads": self.loads,
+                "avg_load_ms": round(self.load_s / self.loads * 1000, 1) if self.loads else 0.0,
+                "incremental_updates": self.updates,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+cohort_cache = CohortCache()
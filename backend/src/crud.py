@@ -1,18 +1,48 @@
 from sqlmodel import select # type: ignore
 from .models import User
 from .database import engine, get_session
+from .principals import invalidate_principal
+from .scheduler import scheduler
 
 def get_user_by_email(session, email: str):
     statement = select(User).where(User.email == email)
     return session.exec(statement).first()
 
+async def get_user_by_email_async(session, email: str):
+    statement = select(User).where(User.email == email)
+    return (await session.exec(statement)).first()
+
 def get_user_by_id(session, user_id: int):
     statement = select(User).where(User.id == user_id)
     return session.exec(statement).first()
 
+async def get_user_by_id_async(session, user_id: int):
+    statement = select(User).where(User.id == user_id)
+    return (await session.exec(statement)).first()
+
 def create_user(session, name: str, email: str, hashed_password: str, role: str = "patient"):
     user = User(name=name, email=email, hashed_password=hashed_password, role=role)
     session.add(user)
     session.commit()
     session.refresh(user)
     return user
+
+async def create_user_async(session, name: str, email: str, hashed_password: str, role: str = "patient"):
+    user = User(name=name, email=email, hashed_password=hashed_password, role=role)
+    session.add(user)
+    await session.commit()
+    await session.refresh(user)
+    return user
+
+def set_user_role(session, user_id: int, role: str):
+    """Change a user's role and drop their cached principal (and scheduler calendar) so it takes effect immediately."""
+    user = get_user_by_id(session, user_id)
+    if not user:
+        return None
+    user.role = role
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    invalidate_principal(user_id)
+    scheduler.forget(user_id)
+    return user
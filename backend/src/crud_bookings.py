@@ -1,16 +1,93 @@
 # backend/src/crud_bookings.py
+import asyncio
 from sqlmodel import select # type: ignore
-from .models import Booking
-from datetime import datetime
+from sqlalchemy import or_ # type: ignore
+from .models import Booking, User
+from .pagination import Page, keyset_query
+from .scheduler import BOOKING_SLOT_MINUTES, FREE_STATUSES, BookingConflict, Hold, scheduler, is_active
+from .data_versions import bump, bump_async
+from .cohort import cohort_cache
+from datetime import datetime, timedelta
 
-def create_booking(session, patient_id: int, therapist_id: int, dt: datetime, notes: str = None):
+# Writes that occupy a slot take a scheduler hold first (raising
+# scheduler.BookingConflict if it is taken), then confirm or release it once
+# the commit has succeeded or failed. The hold only sees this process's
+# bookings, so the write transaction also re-checks the slot in SQL after
+# its flush (_check_slot); that is what keeps several workers from
+# double-booking. Every write bumps the "bookings" data version of the
+# patient and the therapist in the same transaction.
+
+async def _ensure_loaded(therapist_id: int):
+    # the first check for a therapist reads their calendar; keep that query off the event loop
+    if scheduler.needs_load(therapist_id):
+        await asyncio.to_thread(scheduler.load, therapist_id)
+
+def _therapist_lock_stmt(therapist_id: int):
+    # PostgreSQL: writers for one therapist queue on the row lock. SQLite ignores
+    # FOR UPDATE; there the flush already holds the database write lock.
+    return select(User.id).where(User.id == therapist_id).with_for_update()
+
+def _overlap_stmt(therapist_id: int, dt: datetime, exclude: int):
+    """Another active booking of the therapist overlapping [dt, dt + slot) (uses ix_booking_therapist_id_datetime)."""
+    slot = timedelta(minutes=BOOKING_SLOT_MINUTES)
+    return (select(Booking.id)
+            .where(Booking.therapist_id == therapist_id)
+            .where(Booking.datetime > dt - slot)
+            .where(Booking.datetime < dt + slot)
+            .where(or_(Booking.status.is_(None), Booking.status.not_in(FREE_STATUSES)))
+            .where(Booking.id != exclude)
+            .limit(1))
+
+def _check_slot(session, therapist_id: int, dt: datetime, booking_id: int):
+    """Inside the write transaction, after the flush: BookingConflict if the slot is taken in the database."""
+    session.exec(_therapist_lock_stmt(therapist_id)).first()
+    other = session.exec(_overlap_stmt(therapist_id, dt, booking_id)).first()
+    if other is not None:
+        raise BookingConflict(therapist_id, other)
+
+async def _check_slot_async(session, therapist_id: int, dt: datetime, booking_id: int):
+    (await session.exec(_therapist_lock_stmt(therapist_id))).first()
+    other = (await session.exec(_overlap_stmt(therapist_id, dt, booking_id))).first()
+    if other is not None:
+        raise BookingConflict(therapist_id, other)
+
+def create_booking(session, patient_id: int, therapist_id: int, dt: datetime, notes: str = None, hold: Hold = None):
+    """Create a booking; `hold` is an already reserved slot (from scheduler.hold_earliest)."""
+    hold = hold or scheduler.hold(therapist_id, dt)
     b = Booking(patient_id=patient_id, therapist_id=therapist_id, datetime=dt, notes=notes)
-    session.add(b)
-    session.commit()
-    session.refresh(b)
+    try:
+        session.add(b)
+        session.flush()
+        _check_slot(session, therapist_id, dt, b.id)
+        bump(session, [patient_id, therapist_id], "bookings")
+        session.commit()
+        session.refresh(b)
+    except Exception:
+        scheduler.release(hold)
+        raise
+    scheduler.confirm(hold, b.id)
+    cohort_cache.caseload_changed(therapist_id, patient_id)
     return b
 
-def list_bookings(session, therapist_id: int = None, patient_id: int = None, status: str = None, limit: int = 200):
+async def create_booking_async(session, patient_id: int, therapist_id: int, dt: datetime, notes: str = None):
+    await _ensure_loaded(therapist_id)
+    hold = scheduler.hold(therapist_id, dt)
+    b = Booking(patient_id=patient_id, therapist_id=therapist_id, datetime=dt, notes=notes)
+    try:
+        session.add(b)
+        await session.flush()
+        await _check_slot_async(session, therapist_id, dt, b.id)
+        await bump_async(session, [patient_id, therapist_id], "bookings")
+        await session.commit()
+        await session.refresh(b)
+    except Exception:
+        scheduler.release(hold)
+        raise
+    scheduler.confirm(hold, b.id)
+    cohort_cache.caseload_changed(therapist_id, patient_id)
+    return b
+
+def _filtered_bookings(therapist_id: int = None, patient_id: int = None, status: str = None):
     stmt = select(Booking)
     if therapist_id:
         stmt = stmt.where(Booking.therapist_id == therapist_id)
@@ -18,23 +95,120 @@ def list_bookings(session, therapist_id: int = None, patient_id: int = None, sta
         stmt = stmt.where(Booking.patient_id == patient_id)
     if status:
         stmt = stmt.where(Booking.status == status)
-    stmt = stmt.order_by(Booking.datetime.asc()).limit(limit)
-    return session.exec(stmt).all()
+    return stmt
+
+def _list_bookings_stmt(therapist_id: int = None, patient_id: int = None, status: str = None, limit: int = 200):
+    return _filtered_bookings(therapist_id, patient_id, status).order_by(Booking.datetime.asc()).limit(limit)
+
+def list_bookings(session, therapist_id: int = None, patient_id: int = None, status: str = None, limit: int = 200):
+    return session.exec(_list_bookings_stmt(therapist_id, patient_id, status, limit)).all()
+
+async def list_bookings_async(session, therapist_id: int = None, patient_id: int = None, status: str = None, limit: int = 200):
+    return (await session.exec(_list_bookings_stmt(therapist_id, patient_id, status, limit))).all()
+
+def _bookings_page_query(therapist_id, patient_id, status, limit, cursor):
+    stmt = _filtered_bookings(therapist_id, patient_id, status)
+    return keyset_query(stmt, "booking", Booking.datetime, Booking.id, limit, cursor, descending=False)
+
+def page_bookings(session, therapist_id: int = None, patient_id: int = None, status: str = None, limit: int = 200, cursor: str = None) -> Page:
+    """One page of bookings in appointment order (earliest first)."""
+    stmt, finish = _bookings_page_query(therapist_id, patient_id, status, limit, cursor)
+    return finish(session.exec(stmt).all())
+
+async def page_bookings_async(session, therapist_id: int = None, patient_id: int = None, status: str = None, limit: int = 200, cursor: str = None) -> Page:
+    stmt, finish = _bookings_page_query(therapist_id, patient_id, status, limit, cursor)
+    return finish((await session.exec(stmt)).all())
 
 def get_booking(session, booking_id: int):
     stmt = select(Booking).where(Booking.id == booking_id)
     return session.exec(stmt).first()
 
+async def get_booking_async(session, booking_id: int):
+    stmt = select(Booking).where(Booking.id == booking_id)
+    return (await session.exec(stmt)).first()
+
+def _apply_patch(b, patch):
+    for k, v in patch.items():
+        if hasattr(b, k):
+            setattr(b, k, v)
+
+def _parties(b, patch=None) -> set:
+    """Users whose booking lists a write to `b` changes (before and after `patch`)."""
+    parties = {b.patient_id, b.therapist_id}
+    for k in ("patient_id", "therapist_id"):
+        if patch and k in patch:
+            parties.add(patch[k])
+    return parties
+
+def _slots(b, patch):
+    """(old, new) (therapist_id, datetime) slots of a booking under `patch`; None when it holds no slot."""
+    old = (b.therapist_id, b.datetime) if is_active(b.status) else None
+    new = (patch.get("therapist_id", b.therapist_id), patch.get("datetime", b.datetime)) if is_active(patch.get("status", b.status)) else None
+    return old, new
+
+def _hold_new_slot(b, old, new):
+    if new is None or new == old:
+        return None
+    return scheduler.hold(new[0], new[1], exclude=b.id)
+
+def _settle(b_id, old, new, hold):
+    """After the commit: move the booking's calendar entry."""
+    if old is not None and old != new:
+        scheduler.discard(old[0], old[1], b_id)
+    if hold is not None:
+        scheduler.confirm(hold, b_id)
+
+def _mark_completed(b, session_notes, session_outcome):
+    b.status = "completed"
+    b.session_notes = session_notes
+    b.session_outcome = session_outcome
+    b.completed_at = datetime.utcnow()
+
 def update_booking(session, booking_id: int, **patch):
+    """Apply `patch`; moving the booking (or reactivating it) raises BookingConflict if the new slot is taken."""
     b = get_booking(session, booking_id)
     if not b:
         return None
-    for k, v in patch.items():
-        if hasattr(b, k):
-            setattr(b, k, v)
-    session.add(b)
-    session.commit()
-    session.refresh(b)
+    old, new = _slots(b, patch)
+    hold = _hold_new_slot(b, old, new)
+    try:
+        bump(session, _parties(b, patch), "bookings")
+        _apply_patch(b, patch)
+        session.add(b)
+        if hold is not None:
+            session.flush()
+            _check_slot(session, new[0], new[1], b.id)
+        session.commit()
+        session.refresh(b)
+    except Exception:
+        if hold is not None:
+            scheduler.release(hold)
+        raise
+    _settle(b.id, old, new, hold)
+    return b
+
+async def update_booking_async(session, booking_id: int, **patch):
+    b = await get_booking_async(session, booking_id)
+    if not b:
+        return None
+    old, new = _slots(b, patch)
+    if new is not None:
+        await _ensure_loaded(new[0])
+    hold = _hold_new_slot(b, old, new)
+    try:
+        await bump_async(session, _parties(b, patch), "bookings")
+        _apply_patch(b, patch)
+        session.add(b)
+        if hold is not None:
+            await session.flush()
+            await _check_slot_async(session, new[0], new[1], b.id)
+        await session.commit()
+        await session.refresh(b)
+    except Exception:
+        if hold is not None:
+            scheduler.release(hold)
+        raise
+    _settle(b.id, old, new, hold)
     return b
 
 def complete_booking(session, booking_id: int, session_notes: str = None, session_outcome: str = None):
@@ -44,11 +218,20 @@ def complete_booking(session, booking_id: int, session_notes: str = None, sessio
     b = get_booking(session, booking_id)
     if not b:
         return None
-    b.status = "completed"
-    b.session_notes = session_notes
-    b.session_outcome = session_outcome
-    b.completed_at = datetime.utcnow()
+    _mark_completed(b, session_notes, session_outcome)
     session.add(b)
+    bump(session, _parties(b), "bookings")
     session.commit()
     session.refresh(b)
     return b
+
+async def complete_booking_async(session, booking_id: int, session_notes: str = None, session_outcome: str = None):
+    b = await get_booking_async(session, booking_id)
+    if not b:
+        return None
+    _mark_completed(b, session_notes, session_outcome)
+    session.add(b)
+    await bump_async(session, _parties(b), "bookings")
+    await session.commit()
+    await session.refresh(b)
+    return b
@@ -1,6 +1,7 @@
 # backend/src/crud_chat.py
 from sqlmodel import select  # type: ignore
 from .models import ChatMessage
+from .pagination import Page, keyset_query
 from datetime import datetime
 
 def save_message(session, user_id: int | None, sender: str, text: str):
@@ -29,9 +30,41 @@ def create_chat_message(session, user_id: int | None, role: str, text: str):
     sender = role if role in ("user", "bot") else role
     return save_message(session, user_id=user_id, sender=sender, text=text)
 
+async def save_message_async(session, user_id: int | None, sender: str, text: str):
+    """save_message() for an AsyncSession."""
+    msg = ChatMessage(user_id=user_id, sender=sender, text=text)
+    session.add(msg)
+    await session.commit()
+    await session.refresh(msg)
+    return msg
+
+async def create_chat_message_async(session, user_id: int | None, role: str, text: str):
+    return await save_message_async(session, user_id=user_id, sender=role, text=text)
+
+def _history_stmt(user_id: int, limit: int):
+    return select(ChatMessage).where(ChatMessage.user_id == user_id).order_by(ChatMessage.created_at.asc()).limit(limit)
+
 def get_history(session, user_id: int, limit: int = 200):
     """
     Return chat messages for a given user_id (ordered asc).
     """
-    stmt = select(ChatMessage).where(ChatMessage.user_id == user_id).order_by(ChatMessage.created_at.asc()).limit(limit)
-    return session.exec(stmt).all()
+    return session.exec(_history_stmt(user_id, limit)).all()
+
+async def get_history_async(session, user_id: int, limit: int = 200):
+    return (await session.exec(_history_stmt(user_id, limit))).all()
+
+def _history_page_query(user_id: int, limit: int, cursor: str = None):
+    stmt = select(ChatMessage).where(ChatMessage.user_id == user_id)
+    return keyset_query(stmt, "chat", ChatMessage.created_at, ChatMessage.id, limit, cursor)
+
+def page_history(session, user_id: int, limit: int = 50, cursor: str = None) -> Page:
+    """
+    One page of a user's chat, newest first: the first page holds the latest
+    messages and next_cursor walks back in time.
+    """
+    stmt, finish = _history_page_query(user_id, limit, cursor)
+    return finish(session.exec(stmt).all())
+
+async def page_history_async(session, user_id: int, limit: int = 50, cursor: str = None) -> Page:
+    stmt, finish = _history_page_query(user_id, limit, cursor)
+    return finish((await session.exec(stmt)).all())
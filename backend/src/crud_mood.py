@@ -1,30 +1,471 @@
 from sqlmodel import select # type: ignore
-from .models import Mood
-from .database import get_session
+from sqlalchemy import func, case, insert # type: ignore
+from sqlalchemy.orm import aliased # type: ignore
+from .models import Mood, MoodDaily, MoodState, User
+from .pagination import Page, keyset_query
+from .alerts import publish_moods
+from .data_versions import bump, bump_async
+from .user_context import context_cache
+from .cohort import cohort_cache
+from .mood_state import apply_mood_states, apply_mood_states_async
 from datetime import datetime, timedelta
-from typing import List
-from fastapi import HTTPException, status
+from typing import List, Optional
+
+ROLLUP_COUNTERS = ("sentiment_sum", "count", "high", "medium", "low")
+
+def moods_committed(moods):
+    """
+    Post-commit hooks for new moods (Mood objects or row dicts with an id):
+    HIGH-risk alerts, the recommendation context cache and the cohort cache.
+    """
+    moods = list(moods)
+    publish_moods(moods)
+    context_cache.record_moods(moods)
+    cohort_cache.record_moods(moods)
+
+def rollup_delta(user_id: int, when: datetime, sentiment: float = None, risk: str = None) -> dict:
+    """The MoodDaily increment contributed by one mood entry."""
+    return {
+        "user_id": user_id,
+        "day": when.date(),
+        "sentiment_sum": float(sentiment or 0.0),
+        "count": 1,
+        "high": 1 if risk == "HIGH" else 0,
+        "medium": 1 if risk == "MEDIUM" else 0,
+        "low": 1 if risk not in ("HIGH", "MEDIUM") else 0,
+    }
+
+def merge_rollup_deltas(deltas) -> List[dict]:
+    """Combine deltas that hit the same (user_id, day) so each row is upserted once."""
+    merged = {}
+    for d in deltas:
+        key = (d["user_id"], d["day"])
+        cur = merged.get(key)
+        if cur is None:
+            merged[key] = dict(d)
+        else:
+            for c in ROLLUP_COUNTERS:
+                cur[c] += d[c]
+    return list(merged.values())
+
+def rollup_upsert_statements(dialect_name: str, rows: List[dict], chunk: int = 100):
+    """
+    INSERT ... ON CONFLICT (user_id, day) DO UPDATE SET col = col + excluded.col
+    statements for SQLite/PostgreSQL. Returns None for other dialects.
+    """
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert # type: ignore
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert # type: ignore
+    else:
+        return None
+    table = MoodDaily.__table__
+    stmts = []
+    for start in range(0, len(rows), chunk):
+        stmt = dialect_insert(table).values(rows[start:start + chunk])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.day],
+            set_={c: table.c[c] + stmt.excluded[c] for c in ROLLUP_COUNTERS},
+        )
+        stmts.append(stmt)
+    return stmts
+
+def apply_rollups(session, deltas):
+    """Add mood deltas to MoodDaily inside the caller's transaction (no commit)."""
+    rows = merge_rollup_deltas(deltas)
+    if not rows:
+        return
+    stmts = rollup_upsert_statements(session.get_bind().dialect.name, rows)
+    if stmts is not None:
+        for stmt in stmts:
+            session.execute(stmt)
+        return
+    # portable fallback: read-modify-write
+    for r in rows:
+        cur = session.get(MoodDaily, (r["user_id"], r["day"]))
+        if cur is None:
+            session.add(MoodDaily(**r))
+        else:
+            for c in ROLLUP_COUNTERS:
+                setattr(cur, c, getattr(cur, c) + r[c])
+            session.add(cur)
+
+async def apply_rollups_async(session, deltas):
+    """apply_rollups() for an AsyncSession."""
+    rows = merge_rollup_deltas(deltas)
+    if not rows:
+        return
+    stmts = rollup_upsert_statements(session.bind.dialect.name, rows)
+    if stmts is not None:
+        for stmt in stmts:
+            await session.execute(stmt)
+        return
+    for r in rows:
+        cur = await session.get(MoodDaily, (r["user_id"], r["day"]))
+        if cur is None:
+            session.add(MoodDaily(**r))
+        else:
+            for c in ROLLUP_COUNTERS:
+                setattr(cur, c, getattr(cur, c) + r[c])
+            session.add(cur)
 
 def create_mood(session, user_id: int, text: str, date: datetime = None, sentiment: float = None, risk: str = None):
     """
     Create a mood entry. Multiple entries per day are allowed.
+    The MoodDaily rollup, the user's MoodState and "mood" data version are
+    updated in the same transaction; see
+    moods_committed() for what runs after the commit.
     """
-        
     m = Mood(user_id=user_id, text=text, date=(date or datetime.utcnow()), sentiment=sentiment, risk=risk)
     session.add(m)
+    apply_rollups(session, [rollup_delta(user_id, m.date, sentiment, risk)])
+    apply_mood_states(session, [m])
+    bump(session, [user_id], "mood")
     session.commit()
     session.refresh(m)
+    moods_committed([m])
     return m
 
+async def create_mood_async(session, user_id: int, text: str, date: datetime = None, sentiment: float = None, risk: str = None):
+    """create_mood() for an AsyncSession."""
+    m = Mood(user_id=user_id, text=text, date=(date or datetime.utcnow()), sentiment=sentiment, risk=risk)
+    session.add(m)
+    await apply_rollups_async(session, [rollup_delta(user_id, m.date, sentiment, risk)])
+    await apply_mood_states_async(session, [m])
+    await bump_async(session, [user_id], "mood")
+    await session.commit()
+    await session.refresh(m)
+    moods_committed([m])
+    return m
+
+BULK_INSERT_CHUNK = 500
+
+def _bulk_rows(user_id: int, entries: List[dict]) -> List[dict]:
+    now = datetime.utcnow()
+    return [
+        {"user_id": user_id, "text": e.get("text"), "date": e.get("date") or now,
+         "sentiment": e.get("sentiment"), "risk": e.get("risk")}
+        for e in entries
+    ]
+
+def _bulk_insert_stmt():
+    return insert(Mood).returning(Mood.id, sort_by_parameter_order=True)
+
+def _insert_chunks(rows: List[dict], chunk: int):
+    """Parameter lists for _bulk_insert_stmt(), one multi-row INSERT per `chunk` rows."""
+    return [rows[start:start + chunk] for start in range(0, len(rows), chunk)]
+
+def _derived_updates(rows: List[dict], ids: List[int]) -> tuple:
+    """(rollup deltas, mood items for the MoodStates, users to bump) for inserted rows."""
+    deltas = [rollup_delta(r["user_id"], r["date"], r["sentiment"], r["risk"]) for r in rows]
+    return deltas, [dict(r, id=i) for r, i in zip(rows, ids)], {r["user_id"] for r in rows}
+
+def insert_mood_rows(session, rows: List[dict], chunk: int = BULK_INSERT_CHUNK) -> List[int]:
+    """
+    Insert complete mood rows (user_id, text, date, sentiment, risk) with one
+    multi-row INSERT ... RETURNING per `chunk` rows, add them to the
+    MoodDaily rollups and MoodStates and bump each user's "mood" data
+    version, inside the caller's transaction (no commit).
+    Returns the new ids in input order.
+    """
+    ids = []
+    for params in _insert_chunks(rows, chunk):
+        ids.extend(session.execute(_bulk_insert_stmt(), params).scalars().all())
+    deltas, moods, user_ids = _derived_updates(rows, ids)
+    apply_rollups(session, deltas)
+    apply_mood_states(session, moods)
+    bump(session, user_ids, "mood")
+    return ids
+
+async def insert_mood_rows_async(session, rows: List[dict], chunk: int = BULK_INSERT_CHUNK) -> List[int]:
+    """insert_mood_rows() for an AsyncSession."""
+    ids = []
+    for params in _insert_chunks(rows, chunk):
+        ids.extend((await session.execute(_bulk_insert_stmt(), params)).scalars().all())
+    deltas, moods, user_ids = _derived_updates(rows, ids)
+    await apply_rollups_async(session, deltas)
+    await apply_mood_states_async(session, moods)
+    await bump_async(session, user_ids, "mood")
+    return ids
+
+def bulk_create_moods(session, user_id: int, entries: List[dict], chunk: int = BULK_INSERT_CHUNK) -> List[int]:
+    """
+    Insert many mood entries for one user in a single transaction.
+    entries are dicts with text, date, sentiment, risk. Returns the new ids in input order.
+    """
+    rows = _bulk_rows(user_id, entries)
+    ids = insert_mood_rows(session, rows, chunk)
+    session.commit()
+    moods_committed(dict(r, id=i) for r, i in zip(rows, ids))
+    return ids
+
+async def bulk_create_moods_async(session, user_id: int, entries: List[dict], chunk: int = BULK_INSERT_CHUNK) -> List[int]:
+    """bulk_create_moods() for an AsyncSession."""
+    rows = _bulk_rows(user_id, entries)
+    ids = await insert_mood_rows_async(session, rows, chunk)
+    await session.commit()
+    moods_committed(dict(r, id=i) for r, i in zip(rows, ids))
+    return ids
+
+def _moods_for_user_stmt(user_id: int, limit: int):
+    return select(Mood).where(Mood.user_id == user_id).order_by(Mood.date.desc()).limit(limit)
+
 def list_moods_for_user(session, user_id: int, limit: int = 100):
-    statement = select(Mood).where(Mood.user_id == user_id).order_by(Mood.date.desc()).limit(limit)
-    return session.exec(statement).all()
+    return session.exec(_moods_for_user_stmt(user_id, limit)).all()
 
-def avg_mood_for_user(session, user_id:int, days:int = 7):
-    cutoff = datetime.utcnow() - timedelta(days=days)
-    statement = select(Mood).where(Mood.user_id == user_id).where(Mood.date >= cutoff)
-    rows = session.exec(statement).all()
-    if not rows:
+async def list_moods_for_user_async(session, user_id: int, limit: int = 100):
+    return (await session.exec(_moods_for_user_stmt(user_id, limit))).all()
+
+def _mood_page_query(user_id: int, limit: int, cursor: str = None):
+    return keyset_query(select(Mood).where(Mood.user_id == user_id), "mood", Mood.date, Mood.id, limit, cursor)
+
+def page_moods_for_user(session, user_id: int, limit: int = 100, cursor: str = None) -> Page:
+    """One page of a user's moods, newest first (see pagination.keyset_query)."""
+    stmt, finish = _mood_page_query(user_id, limit, cursor)
+    return finish(session.exec(stmt).all())
+
+async def page_moods_for_user_async(session, user_id: int, limit: int = 100, cursor: str = None) -> Page:
+    stmt, finish = _mood_page_query(user_id, limit, cursor)
+    return finish((await session.exec(stmt)).all())
+
+def _avg_mood_stmt(user_id: int, days: int):
+    # `days` calendar days including today
+    cutoff = datetime.utcnow().date() - timedelta(days=days - 1)
+    return (
+        select(func.sum(MoodDaily.sentiment_sum), func.sum(MoodDaily.count))
+        .where(MoodDaily.user_id == user_id)
+        .where(MoodDaily.day >= cutoff)
+    )
+
+def _avg_from(total, count):
+    if not count:
         return None
-    avg = sum(r.sentiment or 0.0 for r in rows)/len(rows)
-    return round(avg, 2)
+    return round(total / count, 2)
+
+def avg_mood_for_user(session, user_id:int, days:int = 7):
+    """
+    Average sentiment over the last `days` calendar days (including today),
+    read from the MoodDaily rollup.
+    """
+    return _avg_from(*session.exec(_avg_mood_stmt(user_id, days)).one())
+
+async def avg_mood_for_user_async(session, user_id: int, days: int = 7):
+    return _avg_from(*(await session.exec(_avg_mood_stmt(user_id, days))).one())
+
+def _daily_rollups_stmt(user_id: int, start_day, end_day):
+    return (
+        select(MoodDaily)
+        .where(MoodDaily.user_id == user_id)
+        .where(MoodDaily.day >= start_day)
+        .where(MoodDaily.day <= end_day)
+        .order_by(MoodDaily.day.asc())
+    )
+
+def daily_rollups(session, user_id: int, start_day, end_day):
+    """MoodDaily rows for one user between two dates (inclusive), oldest first."""
+    return session.exec(_daily_rollups_stmt(user_id, start_day, end_day)).all()
+
+async def daily_rollups_async(session, user_id: int, start_day, end_day):
+    return (await session.exec(_daily_rollups_stmt(user_id, start_day, end_day))).all()
+
+def chart_buckets(rollups, start_day, days: int) -> list:
+    """
+    Chart-data buckets for `days` days from `start_day`, oldest first: the
+    MoodDaily rows where there are any, zeroed days elsewhere.
+    """
+    # initialize buckets (sentiment default 0.0)
+    day_map = {}
+    for i in range(days):
+        d = (start_day + timedelta(days=i)).isoformat()
+        day_map[d] = {"date": d, "sum": 0.0, "count": 0, "avg_sentiment": 0.0, "high": 0, "medium": 0, "low": 0}
+
+    for r in rollups:
+        rec = day_map.get(r.day.isoformat())
+        if rec is None:
+            # ignore out-of-range entries
+            continue
+        rec["sum"] = float(r.sentiment_sum)
+        rec["count"] = r.count
+        rec["high"] = r.high
+        rec["medium"] = r.medium
+        rec["low"] = r.low
+
+    out = []
+    for key in sorted(day_map.keys()):
+        rec = day_map[key]
+        rec["avg_sentiment"] = round(rec["sum"]/rec["count"], 2) if rec["count"] > 0 else 0.0
+        out.append(rec)
+    return out
+
+ROSTER_SORTS = ("id", "name", "risk", "sentiment", "deterioration")
+
+def patient_roster(session, limit: Optional[int] = None, offset: int = 0, sort: str = "id"):
+    """
+    One query for the therapist roster: every patient with their latest mood
+    (sentiment, risk), 7/30-day average sentiment and deterioration flag
+    (from MoodState).
+
+    The latest mood comes from a correlated subquery (newest date, then id), and
+    both averages from one conditional aggregation over the last 30 days of
+    the MoodDaily rollup.
+    sort: "id" (default), "name", "risk" (HIGH first, then most negative
+    latest sentiment), "sentiment" (most negative first; no moods last) or
+    "deterioration" (flagged first, then by CUSUM, highest first).
+    limit=None returns every patient (from `offset`).
+    Returns (rows, total_patients); rows are dicts in the roster response shape.
+    """
+    # same windows as avg_mood_for_user: 7 / 30 calendar days including today
+    today = datetime.utcnow().date()
+    cutoff7 = today - timedelta(days=7 - 1)
+    cutoff30 = today - timedelta(days=30 - 1)
+
+    latest_id = (
+        select(Mood.id)
+        .where(Mood.user_id == User.id)
+        .order_by(Mood.date.desc(), Mood.id.desc())
+        .limit(1)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    latest = aliased(Mood)
+
+    in7 = MoodDaily.day >= cutoff7
+    avgs = (
+        select(
+            MoodDaily.user_id.label("user_id"),
+            (func.sum(case((in7, MoodDaily.sentiment_sum), else_=0.0)) / func.nullif(func.sum(case((in7, MoodDaily.count), else_=0)), 0)).label("avg7"),
+            (func.sum(MoodDaily.sentiment_sum) / func.nullif(func.sum(MoodDaily.count), 0)).label("avg30"),
+        )
+        .where(MoodDaily.day >= cutoff30)
+        .group_by(MoodDaily.user_id)
+        .subquery()
+    )
+
+    stmt = (
+        select(User.id, User.name, User.email, latest.sentiment, latest.risk, avgs.c.avg7, avgs.c.avg30,
+               MoodState.flagged, MoodState.reasons, MoodState.ewma)
+        .select_from(User)
+        .outerjoin(latest, latest.id == latest_id)
+        .outerjoin(avgs, avgs.c.user_id == User.id)
+        .outerjoin(MoodState, MoodState.user_id == User.id)
+        .where(User.role == "patient")
+    )
+
+    no_sentiment_last = case((latest.sentiment.is_(None), 1), else_=0)
+    if sort == "risk":
+        risk_rank = case((latest.risk == "HIGH", 0), (latest.risk == "MEDIUM", 1), (latest.risk == "LOW", 2), else_=3)
+        stmt = stmt.order_by(risk_rank, no_sentiment_last, latest.sentiment.asc(), User.id)
+    elif sort == "sentiment":
+        stmt = stmt.order_by(no_sentiment_last, latest.sentiment.asc(), User.id)
+    elif sort == "deterioration":
+        stmt = stmt.order_by(case((MoodState.flagged, 0), else_=1), func.coalesce(MoodState.cusum, 0.0).desc(), User.id)
+    elif sort == "name":
+        stmt = stmt.order_by(User.name, User.id)
+    else:
+        stmt = stmt.order_by(User.id)
+    if offset:
+        stmt = stmt.offset(offset)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    total = session.exec(select(func.count()).select_from(User).where(User.role == "patient")).one()
+    rows = []
+    for pid, name, email, latest_sentiment, latest_risk, avg7, avg30, flagged, reasons, ewma in session.exec(stmt).all():
+        rows.append({
+            "id": pid,
+            "name": name,
+            "email": email,
+            "latest_mood_sentiment": latest_sentiment,
+            "latest_mood_risk": latest_risk,
+            "avg_7_days": round(avg7, 2) if avg7 is not None else None,
+            "avg_30_days": round(avg30, 2) if avg30 is not None else None,
+            "deteriorating": bool(flagged),
+            "deterioration_reasons": reasons.split(",") if reasons else [],
+            "sentiment_ewma": round(ewma, 3) if ewma is not None else None,
+        })
+    return rows, total
+
+def rebuild_mood_rollups(session, user_id: int = None, commit: bool = True) -> int:
+    """
+    Recompute MoodDaily from the raw Mood table with one INSERT ... SELECT
+    (optionally for a single user). Returns the number of rollup rows.
+    """
+    table = MoodDaily.__table__
+    day = func.date(Mood.date)
+    source = (
+        select(
+            Mood.user_id,
+            day,
+            func.sum(func.coalesce(Mood.sentiment, 0.0)),
+            func.count(),
+            func.sum(case((Mood.risk == "HIGH", 1), else_=0)),
+            func.sum(case((Mood.risk == "MEDIUM", 1), else_=0)),
+            func.sum(case((Mood.risk == "HIGH", 0), (Mood.risk == "MEDIUM", 0), else_=1)),
+        )
+        .group_by(Mood.user_id, day)
+    )
+    clear = table.delete()
+    if user_id is not None:
+        source = source.where(Mood.user_id == user_id)
+        clear = clear.where(table.c.user_id == user_id)
+    session.execute(clear)
+    session.execute(table.insert().from_select(["user_id", "day", *ROLLUP_COUNTERS], source))
+    if commit:
+        session.commit()
+    count = select(func.count()).select_from(table)
+    if user_id is not None:
+        count = count.where(table.c.user_id == user_id)
+    return session.execute(count).scalar_one()
+
+def check_mood_rollups(session, tolerance: float = 1e-6, max_report: int = 50):
+    """
+    Compare MoodDaily against aggregates of the raw Mood table with a streaming
+    merge over both (ordered by user_id, day), so memory stays constant.
+    Returns (rows_checked, mismatches) where mismatches is a list of dicts.
+    """
+    day = func.date(Mood.date)
+    raw = (
+        select(
+            Mood.user_id,
+            day.label("day"),
+            func.sum(func.coalesce(Mood.sentiment, 0.0)),
+            func.count(),
+            func.sum(case((Mood.risk == "HIGH", 1), else_=0)),
+            func.sum(case((Mood.risk == "MEDIUM", 1), else_=0)),
+            func.sum(case((Mood.risk == "HIGH", 0), (Mood.risk == "MEDIUM", 0), else_=1)),
+        )
+        .group_by(Mood.user_id, day)
+        .order_by(Mood.user_id, day)
+    )
+    rolled = select(
+        MoodDaily.user_id, MoodDaily.day, MoodDaily.sentiment_sum, MoodDaily.count,
+        MoodDaily.high, MoodDaily.medium, MoodDaily.low,
+    ).order_by(MoodDaily.user_id, MoodDaily.day)
+
+    def keyed(rows):
+        for r in rows:
+            yield (r[0], str(r[1])[:10]), tuple(r[2:])
+
+    a_iter = keyed(session.execute(raw.execution_options(yield_per=5000)))
+    b_iter = keyed(session.execute(rolled.execution_options(yield_per=5000)))
+    a, b = next(a_iter, None), next(b_iter, None)
+    checked, mismatches = 0, []
+
+    def report(key, expected, actual):
+        if len(mismatches) < max_report:
+            mismatches.append({"user_id": key[0], "day": key[1], "expected": expected, "actual": actual})
+
+    while a is not None or b is not None:
+        checked += 1
+        if b is None or (a is not None and a[0] < b[0]):
+            report(a[0], a[1], None)
+            a = next(a_iter, None)
+        elif a is None or b[0] < a[0]:
+            report(b[0], None, b[1])
+            b = next(b_iter, None)
+        else:
+            ea, eb = a[1], b[1]
+            if abs(float(ea[0]) - float(eb[0])) > tolerance or tuple(ea[1:]) != tuple(eb[1:]):
+                report(a[0], ea, eb)
+            a, b = next(a_iter, None), next(b_iter, None)
+    return checked, mismatches
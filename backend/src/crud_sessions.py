@@ -1,19 +1,33 @@
 # backend/src/crud_sessions.py
 from sqlmodel import select # type: ignore
 from .models import Session as SessionModel
+from .pagination import Page, keyset_query
+from .data_versions import bump
+from .cohort import cohort_cache
 
 def create_session(session, booking_id: int, patient_id: int, therapist_id: int, notes: str = None, outcome: str = None, session_at=None):
     s = SessionModel(booking_id=booking_id, patient_id=patient_id, therapist_id=therapist_id, notes=notes, outcome=outcome, session_at=(session_at))
     session.add(s)
+    bump(session, [patient_id, therapist_id], "sessions")
     session.commit()
     session.refresh(s)
+    cohort_cache.caseload_changed(therapist_id, patient_id)
     return s
 
-def list_sessions(session, patient_id: int = None, therapist_id: int = None, limit: int = 200):
+def _filtered_sessions(patient_id: int = None, therapist_id: int = None):
     stmt = select(SessionModel)
     if patient_id:
         stmt = stmt.where(SessionModel.patient_id == patient_id)
     if therapist_id:
         stmt = stmt.where(SessionModel.therapist_id == therapist_id)
-    stmt = stmt.order_by(SessionModel.session_at.desc()).limit(limit)
+    return stmt
+
+def list_sessions(session, patient_id: int = None, therapist_id: int = None, limit: int = 200):
+    stmt = _filtered_sessions(patient_id, therapist_id).order_by(SessionModel.session_at.desc()).limit(limit)
     return session.exec(stmt).all()
+
+def page_sessions(session, patient_id: int = None, therapist_id: int = None, limit: int = 200, cursor: str = None) -> Page:
+    """One page of sessions, most recent first."""
+    stmt, finish = keyset_query(_filtered_sessions(patient_id, therapist_id), "session",
+                                SessionModel.session_at, SessionModel.id, limit, cursor)
+    return finish(session.exec(stmt).all())
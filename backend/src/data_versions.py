@@ -0,0 +1,159 @@
+# backend/src/data_versions.py
+"""
+Per-user data versions and the ETags built from them.
+
+Every write path bumps a counter in the DataVersion table for each user
+whose data it changes, inside the write's own transaction: "mood" for the
+mood owner, "bookings" and "sessions" for both the patient and the therapist.
+The polled GET routes read that one row, derive a weak ETag from it (plus the
+viewer, path and query string, and the day for date-relative views), and
+answer a matching If-None-Match with 304 before running any list or rollup
+query.
+
+Counters live in the database, so several workers agree on them. They are
+never deleted (deleting an account bumps them instead), so a reused user id
+cannot repeat an old ETag.
+"""
+import hashlib
+import threading
+from datetime import datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+from sqlmodel import select # type: ignore
+
+from .models import DataVersion
+
+SCOPES = ("mood", "bookings", "sessions")
+
+
+def _keys(user_ids: Iterable[int], scope: str) -> list:
+    if scope not in SCOPES:
+        raise ValueError(f"unknown data version scope: {scope}")
+    return [{"user_id": uid, "scope": scope, "version": 1} for uid in sorted({u for u in user_ids if u is not None})]
+
+def _upsert_stmt(dialect_name: str, rows: list):
+    """INSERT ... ON CONFLICT DO UPDATE SET version = version + 1, or None for other dialects."""
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert # type: ignore
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert # type: ignore
+    else:
+        return None
+    table = DataVersion.__table__
+    stmt = dialect_insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.scope],
+        set_={"version": table.c.version + 1},
+    )
+
+def bump(session, user_ids: Iterable[int], scope: str):
+    """Bump `scope` for each user inside the caller's transaction (no commit)."""
+    rows = _keys(user_ids, scope)
+    if not rows:
+        return
+    stmt = _upsert_stmt(session.get_bind().dialect.name, rows)
+    if stmt is not None:
+        session.execute(stmt)
+        return
+    for r in rows:
+        cur = session.get(DataVersion, (r["user_id"], scope))
+        if cur is None:
+            session.add(DataVersion(**r))
+        else:
+            cur.version += 1
+            session.add(cur)
+
+async def bump_async(session, user_ids: Iterable[int], scope: str):
+    """bump() for an AsyncSession."""
+    rows = _keys(user_ids, scope)
+    if not rows:
+        return
+    stmt = _upsert_stmt(session.bind.dialect.name, rows)
+    if stmt is not None:
+        await session.execute(stmt)
+        return
+    for r in rows:
+        cur = await session.get(DataVersion, (r["user_id"], scope))
+        if cur is None:
+            session.add(DataVersion(**r))
+        else:
+            cur.version += 1
+            session.add(cur)
+
+def _version_stmt(user_id: int, scope: str):
+    return select(DataVersion.version).where(DataVersion.user_id == user_id).where(DataVersion.scope == scope)
+
+def get_version(session, user_id: int, scope: str) -> int:
+    return session.exec(_version_stmt(user_id, scope)).first() or 0
+
+async def get_version_async(session, user_id: int, scope: str) -> int:
+    return (await session.exec(_version_stmt(user_id, scope))).first() or 0
+
+
+def make_etag(request: Request, viewer_id: int, owner_id: int, scope: str, version: int, daily: bool = False) -> str:
+    """
+    Weak ETag for `request` as seen by `viewer_id`, given the owner's data
+    version. daily=True for responses relative to today (averages, chart
+    windows), which change at midnight UTC without any write.
+    """
+    parts = [request.url.path, str(sorted(request.query_params.multi_items())), str(viewer_id)]
+    if daily:
+        parts.append(datetime.utcnow().date().isoformat())
+    digest = hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+    return f'W/"{scope}-{owner_id}.{version}-{digest}"'
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # weak comparison: W/ prefixes are ignored
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+
+class ConditionalStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.requests = 0
+        self.conditional = 0
+        self.not_modified = 0
+
+    def record(self, conditional: bool, not_modified: bool):
+        with self._lock:
+            self.requests += 1
+            self.conditional += conditional
+            self.not_modified += not_modified
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                # requests that sent If-None-Match
+                "conditional": self.conditional,
+                "not_modified": self.not_modified,
+                "hit_rate": round(self.not_modified / self.conditional, 4) if self.conditional else 0.0,
+            }
+
+conditional_stats = ConditionalStats()
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Set the ETag (and private, revalidate-every-time caching) on `response`;
+    return a 304 Response to send instead when If-None-Match matches it.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    hit = bool(if_none_match) and _matches(if_none_match, etag)
+    conditional_stats.record(bool(if_none_match), hit)
+    if hit:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,12 +1,186 @@
+import os
 from sqlmodel import SQLModel, create_engine, Session # type: ignore
-from typing import Generator
+from sqlalchemy import event # type: ignore
+from sqlalchemy.pool import StaticPool # type: ignore
+from typing import AsyncGenerator, Generator
+from dotenv import load_dotenv
 
-DATABASE_URL = "sqlite:///./mh.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+load_dotenv()
+
+# Connection settings (all overridable from the environment / .env)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./mh.db")
+# Optional separate URL for read-only traffic (e.g. a replica); defaults to DATABASE_URL
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "") or DATABASE_URL
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_ECHO = os.getenv("DB_ECHO", "0") in ("1", "true", "True")
+# Serve mood, chat, bookings, chart-data and recommendations from the async routes (routes/*_async.py).
+# Off by default: on SQLite the threadpool routes are faster (bench/async_load.py).
+DB_ASYNC = os.getenv("DB_ASYNC", "0") in ("1", "true", "True")
+
+# SQLite tuning, applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def _is_memory(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+def _sqlite_pragmas(read_only: bool):
+    def on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        if not read_only:
+            # journal mode is persistent in the file; only the writer sets it
+            cur.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cur.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cur.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cur.execute("PRAGMA query_only=ON")
+        cur.close()
+    return on_connect
+
+def make_engine(url: str, read_only: bool = False):
+    """
+    Build an engine for `url` with pool settings from the environment.
+    For SQLite, every connection gets WAL/synchronous/busy_timeout/cache/mmap
+    pragmas; read_only engines additionally set query_only.
+    """
+    if not _is_sqlite(url):
+        return create_engine(
+            url,
+            echo=DB_ECHO,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000.0}
+    if _is_memory(url):
+        # a single shared connection, otherwise every connection sees its own empty database
+        eng = create_engine(url, echo=DB_ECHO, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        eng = create_engine(
+            url,
+            echo=DB_ECHO,
+            connect_args=connect_args,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    event.listen(eng, "connect", _sqlite_pragmas(read_only=read_only))
+    return eng
+
+engine = make_engine(DATABASE_URL)
+# In-memory SQLite can't be shared across engines, so reads use the writer there
+read_engine = engine if _is_memory(DATABASE_READ_URL) else make_engine(DATABASE_READ_URL, read_only=True)
 
 def get_session() -> Generator:
     with Session(engine) as session:
         yield session
 
+def get_read_session() -> Generator:
+    """
+    Session on the read-only engine for GET routes. With WAL, readers work on a
+    snapshot and never wait for (or block) the writer.
+    """
+    with Session(read_engine) as session:
+        yield session
+
+# Async engines (aiosqlite / asyncpg) for the async routes; created on first use
+# so the sync-only tools (manage.py, benches) don't need the async drivers.
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+
+def async_url(url: str) -> str:
+    """Map a sync URL to its async driver (sqlite:// -> sqlite+aiosqlite://)."""
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        base, driver = scheme.split("+", 1)
+        if driver in ("aiosqlite", "asyncpg", "aiomysql"):
+            return url
+        scheme = base
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+def make_async_engine(url: str, read_only: bool = False):
+    """Async counterpart of make_engine(); same pool settings and SQLite pragmas."""
+    from sqlalchemy.ext.asyncio import create_async_engine # type: ignore
+
+    aurl = async_url(url)
+    if not _is_sqlite(url):
+        return create_async_engine(
+            aurl,
+            echo=DB_ECHO,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000.0}
+    if _is_memory(url):
+        eng = create_async_engine(aurl, echo=DB_ECHO, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        eng = create_async_engine(
+            aurl,
+            echo=DB_ECHO,
+            connect_args=connect_args,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    event.listen(eng.sync_engine, "connect", _sqlite_pragmas(read_only=read_only))
+    return eng
+
+_async_engine = None
+_async_read_engine = None
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = make_async_engine(DATABASE_URL)
+    return _async_engine
+
+def get_async_read_engine():
+    global _async_read_engine
+    if _async_read_engine is None:
+        if _is_memory(DATABASE_READ_URL):
+            # in-memory SQLite: the async engine is a separate database from the sync one
+            _async_read_engine = get_async_engine()
+        else:
+            _async_read_engine = make_async_engine(DATABASE_READ_URL, read_only=True)
+    return _async_read_engine
+
+async def get_async_session() -> AsyncGenerator:
+    """
+    Async alternative to get_session() for `async def` routes: queries await the
+    driver instead of holding a threadpool thread for the whole request.
+    """
+    from sqlmodel.ext.asyncio.session import AsyncSession # type: ignore
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+async def get_async_read_session() -> AsyncGenerator:
+    """Async alternative to get_read_session()."""
+    from sqlmodel.ext.asyncio.session import AsyncSession # type: ignore
+    async with AsyncSession(get_async_read_engine(), expire_on_commit=False) as session:
+        yield session
+
+async def dispose_async_engines():
+    global _async_engine, _async_read_engine
+    for eng in {id(e): e for e in (_async_engine, _async_read_engine) if e is not None}.values():
+        await eng.dispose()
+    _async_engine = _async_read_engine = None
+
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
@@ -0,0 +1,251 @@
+# backend/src/datagen.py
+"""
+Synthetic dataset generator for load testing (SQLite only).
+
+Bulk-loads User, Mood, ChatMessage, Booking and Session rows straight
+through the DBAPI connection: rows are generated in Python and written with
+executemany in batches of `batch` rows, committing every `commit_rows` rows.
+During the load:
+  - synchronous=OFF and journal_mode=MEMORY (restored afterwards),
+  - the secondary indexes of the loaded tables are dropped and rebuilt once
+    at the end, instead of being updated row by row.
+A crash mid-load can leave the file unusable, so load into a scratch
+database. Runs append: ids continue after the existing rows.
+
+Volumes are per-user means spread lognormally (spread=0 gives every user the
+mean); moods and chats fall between a user's signup and now, signups are
+spread over `days` days. Every user gets the same password. Afterwards the
+derived tables (MoodDaily, MoodState) are rebuilt so the analytics and
+roster routes see the data.
+"""
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import func, select # type: ignore
+
+from .database import SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS
+from .models import User, Mood, Booking, ChatMessage, Session as SessionModel
+
+LOADED_TABLES = (User.__table__, Mood.__table__, ChatMessage.__table__, Booking.__table__, SessionModel.__table__)
+
+MOOD_TEXTS = [
+    "Feeling okay today.", "Slept badly, tired all day.", "Good walk in the park, feeling calm.",
+    "Work was stressful but I managed.", "Anxious about tomorrow.", "Had a lovely dinner with friends.",
+    "Everything feels heavy lately.", "Not bad, a fairly normal day.", "I feel hopeless and alone.",
+    "Grateful for the small things.", "Angry at myself again.", "Productive morning, tired evening.",
+]
+CHAT_TEXTS = [
+    "I can't stop worrying about work.", "How do I sleep better?", "I had a panic attack today.",
+    "Thanks, that helped a bit.", "I feel lonely in the evenings.", "Can you suggest a breathing exercise?",
+    "I argued with my partner.", "I'm doing a little better this week.",
+]
+BOT_TEXTS = [
+    "I hear you. Can you say a little more about how that felt?", "Try breathing in for four counts and out for six.",
+    "That sounds hard. What helped last time?", "It's okay to take things one step at a time.",
+]
+SESSION_OUTCOMES = ["improving", "stable", "needs follow-up", "referred"]
+SENTIMENT_RANGES = {"LOW": (-0.2, 1.0), "MEDIUM": (-0.6, -0.2), "HIGH": (-1.0, -0.6)}
+
+@dataclass
+class GenerateSpec:
+    patients: int = 20_000
+    therapists: int = 200
+    moods_per_user: float = 100.0
+    chats_per_user: float = 150.0
+    bookings_per_patient: float = 4.0
+    spread: float = 0.8                  # lognormal sigma of the per-user counts
+    risk_mix: tuple = (0.7, 0.2, 0.1)    # LOW, MEDIUM, HIGH
+    days: int = 365                      # signups (and so history) spread over this many days
+    future_days: int = 30                # scheduled bookings up to this far ahead
+    completed_share: float = 0.85        # past bookings completed (with a Session), the rest cancelled
+    password: str = "password123"
+    seed: int = 1
+    batch: int = 50_000
+    commit_rows: int = 1_000_000
+
+
+def _count(rng, mean: float, spread: float) -> int:
+    """A per-user count with the given mean: lognormal with sigma `spread` (0 = always the mean)."""
+    if mean <= 0:
+        return 0
+    if spread <= 0:
+        return int(round(mean))
+    return int(rng.lognormvariate(math.log(mean) - spread * spread / 2, spread) + 0.5)
+
+def _stamp(dt: datetime) -> str:
+    # the text SQLAlchemy's SQLite DateTime type stores and parses
+    return dt.isoformat(" ", "microseconds")
+
+class _Writer:
+    """executemany in batches, committing every `commit_rows` rows."""
+
+    def __init__(self, raw, spec: GenerateSpec, progress: Optional[Callable]):
+        self.raw = raw
+        self.cur = raw.cursor()
+        self.spec = spec
+        self.progress = progress
+        self.pending = {}
+        self.counts = {}
+        self.uncommitted = 0
+
+    def add(self, sql: str, row: tuple):
+        rows = self.pending.setdefault(sql, [])
+        rows.append(row)
+        if len(rows) >= self.spec.batch:
+            self._flush(sql)
+            if self.uncommitted >= self.spec.commit_rows:
+                self.commit()
+
+    def _flush(self, sql: str):
+        rows = self.pending.pop(sql, None)
+        if not rows:
+            return
+        self.cur.executemany(sql, rows)
+        table = sql.split()[2]
+        self.counts[table] = self.counts.get(table, 0) + len(rows)
+        self.uncommitted += len(rows)
+
+    def commit(self):
+        for sql in list(self.pending):
+            self._flush(sql)
+        self.raw.commit()
+        self.uncommitted = 0
+        if self.progress:
+            self.progress(dict(self.counts))
+
+def _next_id(conn, table) -> int:
+    return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+def _write_rows(w: _Writer, spec: GenerateSpec, hashed: str, user_id: int, mood_id: int, booking_id: int):
+    """Generate the rows for `spec` with ids from the given starts and add them to `w`."""
+    rng = random.Random(spec.seed)
+    rand, randint = rng.random, rng.randint
+    weights = [max(0.0, x) for x in spec.risk_mix]
+    total = sum(weights) or 1.0
+    cut_low, cut_medium = weights[0] / total, (weights[0] + weights[1]) / total
+    now = datetime.utcnow().replace(microsecond=0)
+    start = now - timedelta(days=spec.days)
+    window_s = spec.days * 86400
+
+    user_sql = "INSERT INTO user (id, name, email, hashed_password, role, created_at) VALUES (?, ?, ?, ?, ?, ?)"
+    mood_sql = "INSERT INTO mood (id, user_id, text, date, sentiment, risk) VALUES (?, ?, ?, ?, ?, ?)"
+    chat_sql = "INSERT INTO chatmessage (user_id, sender, text, created_at) VALUES (?, ?, ?, ?)"
+    booking_sql = ("INSERT INTO booking (id, patient_id, therapist_id, datetime, status, completed_at, session_outcome, created_at) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+    session_sql = "INSERT INTO session (booking_id, patient_id, therapist_id, outcome, session_at) VALUES (?, ?, ?, ?, ?)"
+
+    therapist_ids = list(range(user_id, user_id + spec.therapists))
+    for tid in therapist_ids:
+        w.add(user_sql, (tid, f"Therapist {tid}", f"therapist{tid}@example.com", hashed, "therapist", _stamp(start)))
+    taken = {tid: set() for tid in therapist_ids}  # therapist hour slots already booked
+    low_lo, low_span = SENTIMENT_RANGES["LOW"][0], SENTIMENT_RANGES["LOW"][1] - SENTIMENT_RANGES["LOW"][0]
+    med_lo, med_span = SENTIMENT_RANGES["MEDIUM"][0], SENTIMENT_RANGES["MEDIUM"][1] - SENTIMENT_RANGES["MEDIUM"][0]
+    high_lo, high_span = SENTIMENT_RANGES["HIGH"][0], SENTIMENT_RANGES["HIGH"][1] - SENTIMENT_RANGES["HIGH"][0]
+    n_mood_texts, n_chat_texts, n_bot_texts = len(MOOD_TEXTS), len(CHAT_TEXTS), len(BOT_TEXTS)
+
+    for pid in range(user_id + spec.therapists, user_id + spec.therapists + spec.patients):
+        joined_s = rand() * window_s
+        joined = start + timedelta(seconds=joined_s)
+        active_s = window_s - joined_s
+        w.add(user_sql, (pid, f"Patient {pid}", f"patient{pid}@example.com", hashed, "patient", _stamp(joined)))
+
+        # moods in date order, so ids follow dates within a user
+        for off in sorted(rand() * active_s for _ in range(_count(rng, spec.moods_per_user, spec.spread))):
+            r = rand()
+            if r < cut_low:
+                risk, sentiment = "LOW", low_lo + rand() * low_span
+            elif r < cut_medium:
+                risk, sentiment = "MEDIUM", med_lo + rand() * med_span
+            else:
+                risk, sentiment = "HIGH", high_lo + rand() * high_span
+            w.add(mood_sql, (mood_id, pid, MOOD_TEXTS[int(rand() * n_mood_texts)], _stamp(joined + timedelta(seconds=off)),
+                             round(sentiment, 4), risk))
+            mood_id += 1
+
+        # chat turns: a user message and the bot reply a second later
+        for off in sorted(rand() * active_s for _ in range(_count(rng, spec.chats_per_user, spec.spread) // 2)):
+            at = joined + timedelta(seconds=off)
+            w.add(chat_sql, (pid, "user", CHAT_TEXTS[int(rand() * n_chat_texts)], _stamp(at)))
+            w.add(chat_sql, (pid, "bot", BOT_TEXTS[int(rand() * n_bot_texts)], _stamp(at + timedelta(seconds=1))))
+
+        # bookings with one therapist, on free hour slots between signup and future_days ahead
+        if therapist_ids:
+            tid = therapist_ids[int(rand() * len(therapist_ids))]
+            first_day = joined_s // 86400
+            for _ in range(_count(rng, spec.bookings_per_patient, spec.spread)):
+                slot = (randint(int(first_day), spec.days + spec.future_days), randint(9, 16))
+                if slot in taken[tid]:
+                    continue
+                taken[tid].add(slot)
+                at = start.replace(hour=slot[1], minute=0, second=0) + timedelta(days=slot[0])
+                booked = _stamp(min(at, joined + timedelta(seconds=rand() * max(0.0, (at - joined).total_seconds()))))
+                if at >= now:
+                    w.add(booking_sql, (booking_id, pid, tid, _stamp(at), "scheduled", None, None, booked))
+                elif rand() < spec.completed_share:
+                    outcome = SESSION_OUTCOMES[int(rand() * len(SESSION_OUTCOMES))]
+                    w.add(booking_sql, (booking_id, pid, tid, _stamp(at), "completed", _stamp(at + timedelta(hours=1)), outcome, booked))
+                    w.add(session_sql, (booking_id, pid, tid, outcome, _stamp(at)))
+                else:
+                    w.add(booking_sql, (booking_id, pid, tid, _stamp(at), "cancelled", None, None, booked))
+                booking_id += 1
+
+def generate(engine, spec: GenerateSpec, progress: Optional[Callable] = None, rebuild_derived: bool = True) -> dict:
+    """
+    Load a synthetic dataset per `spec` into the SQLite database behind
+    `engine` (tables must exist). Returns row counts per table and timings.
+    The pragmas and the dropped indexes are restored even if the load fails.
+    """
+    if engine.dialect.name != "sqlite":
+        raise ValueError("the generator only supports SQLite")
+    from .auth_utils import get_password_hash
+
+    hashed = get_password_hash(spec.password)
+    with engine.begin() as conn:
+        user_id, mood_id, booking_id = _next_id(conn, User.__table__), _next_id(conn, Mood.__table__), _next_id(conn, Booking.__table__)
+        indexes = [idx for table in LOADED_TABLES for idx in table.indexes]
+        for idx in indexes:
+            idx.drop(bind=conn, checkfirst=True)
+
+    try:
+        t0 = time.perf_counter()
+        raw = engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            # journal_mode answers with a row; an unread result keeps the statement open and blocks COMMIT
+            cur.execute("PRAGMA synchronous=OFF").fetchall()
+            cur.execute("PRAGMA journal_mode=MEMORY").fetchall()
+            try:
+                w = _Writer(raw, spec, progress)
+                _write_rows(w, spec, hashed, user_id, mood_id, booking_id)
+                w.commit()
+            finally:
+                # the connection goes back to the pool: leave it with the engine's settings
+                raw.rollback()
+                cur.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}").fetchall()
+                cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}").fetchall()
+            counts = w.counts
+            load_s = time.perf_counter() - t0
+        finally:
+            raw.close()
+    finally:
+        t = time.perf_counter()
+        with engine.begin() as conn:
+            for idx in indexes:
+                idx.create(bind=conn, checkfirst=True)
+        index_s = time.perf_counter() - t
+
+    report = {"rows": counts, "total_rows": sum(counts.values()), "load_s": round(load_s, 1), "index_s": round(index_s, 1)}
+    if rebuild_derived:
+        from sqlmodel import Session # type: ignore
+        from .crud_mood import rebuild_mood_rollups
+        from .mood_state import rebuild_mood_states
+        t = time.perf_counter()
+        with Session(engine) as session:
+            rebuild_mood_rollups(session)
+            rebuild_mood_states(session)
+        report["derived_s"] = round(time.perf_counter() - t, 1)
+    return report
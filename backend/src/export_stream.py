@@ -0,0 +1,198 @@
+# backend/src/export_stream.py
+"""
+Streaming data export.
+
+Each section (moods, chats, sessions) is read with yield_per, so rows arrive
+from the database EXPORT_CHUNK_ROWS at a time (a server-side cursor on
+PostgreSQL, incremental fetchmany on SQLite). Each chunk is encoded and
+yielded before the next is fetched, so memory stays flat however long a
+user's history is.
+
+Formats:
+  csv      the original layout: a header row per section, then its rows
+  ndjson   one JSON object per row, with a "type" field
+  parquet  one row group per chunk, unified nullable schema (needs pyarrow)
+  arrow    Arrow IPC stream, one record batch per chunk (needs pyarrow)
+Any format can be gzip-compressed on the fly.
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from typing import Dict, Iterable, Iterator, List
+
+from sqlmodel import Session, select # type: ignore
+
+from .models import Mood, ChatMessage, Booking
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))
+
+FORMATS: Dict[str, dict] = {
+    "csv": {"media_type": "text/csv", "ext": "csv"},
+    "ndjson": {"media_type": "application/x-ndjson", "ext": "ndjson"},
+    "parquet": {"media_type": "application/vnd.apache.parquet", "ext": "parquet"},
+    "arrow": {"media_type": "application/vnd.apache.arrow.stream", "ext": "arrow"},
+}
+COLUMNAR = ("parquet", "arrow")
+
+# unified columns for the columnar formats (and the NDJSON keys, minus the unused ones per type)
+COLUMNS = ["type", "id", "date", "risk", "sender", "status", "text", "notes", "outcome"]
+
+def _flat(s):
+    return (s or "").replace("\n", " ")
+
+def _iso(dt):
+    return dt.isoformat() if dt is not None else None
+
+def sections(user_id: int) -> List[dict]:
+    """
+    The export sections in output order. `csv_header` and `csv_row` keep the
+    original CSV layout; `record` maps a row onto COLUMNS.
+    """
+    return [
+        {
+            "type": "mood",
+            "stmt": select(Mood.id, Mood.date, Mood.risk, Mood.text)
+                .where(Mood.user_id == user_id).order_by(Mood.date.asc(), Mood.id.asc()),
+            "csv_header": ["type", "id", "date", "risk", "text"],
+            "csv_row": lambda r: ["mood", r[0], _iso(r[1]), r[2] or "", _flat(r[3])],
+            "record": lambda r: {"type": "mood", "id": r[0], "date": _iso(r[1]), "risk": r[2], "text": r[3]},
+        },
+        {
+            "type": "chat",
+            "stmt": select(ChatMessage.id, ChatMessage.created_at, ChatMessage.sender, ChatMessage.text)
+                .where(ChatMessage.user_id == user_id).order_by(ChatMessage.created_at.asc(), ChatMessage.id.asc()),
+            "csv_header": ["type", "id", "date", "sender", "text"],
+            "csv_row": lambda r: ["chat", r[0], _iso(r[1]), r[2], _flat(r[3])],
+            "record": lambda r: {"type": "chat", "id": r[0], "date": _iso(r[1]), "sender": r[2], "text": r[3]},
+        },
+        {
+            # completed and scheduled bookings the user took part in
+            "type": "session",
+            "stmt": select(Booking.id, Booking.datetime, Booking.status, Booking.session_notes, Booking.session_outcome)
+                .where((Booking.patient_id == user_id) | (Booking.therapist_id == user_id))
+                .order_by(Booking.datetime.asc(), Booking.id.asc()),
+            "csv_header": ["type", "id", "booking_id", "session_date", "status", "notes", "outcome"],
+            "csv_row": lambda r: ["session", r[0], r[0], _iso(r[1]), r[2], _flat(r[3]), _flat(r[4])],
+            "record": lambda r: {"type": "session", "id": r[0], "date": _iso(r[1]), "status": r[2], "notes": r[3], "outcome": r[4]},
+        },
+    ]
+
+def iter_chunks(session, stmt, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[list]:
+    """Rows of `stmt` in lists of at most chunk_rows, fetched incrementally."""
+    result = session.execute(stmt.execution_options(yield_per=chunk_rows))
+    try:
+        for part in result.partitions():
+            yield part
+    finally:
+        result.close()
+
+def _csv_stream(session, secs, chunk_rows) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def drain() -> bytes:
+        data = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate(0)
+        return data
+
+    for sec in secs:
+        writer.writerow(sec["csv_header"])
+        yield drain()
+        to_row = sec["csv_row"]
+        for chunk in iter_chunks(session, sec["stmt"], chunk_rows):
+            writer.writerows(to_row(r) for r in chunk)
+            yield drain()
+
+def _ndjson_stream(session, secs, chunk_rows) -> Iterator[bytes]:
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    for sec in secs:
+        to_record = sec["record"]
+        for chunk in iter_chunks(session, sec["stmt"], chunk_rows):
+            yield "".join(dumps(to_record(r)) + "\n" for r in chunk).encode("utf-8")
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose contents are taken after every batch."""
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+def _columnar_stream(session, secs, chunk_rows, fmt: str) -> Iterator[bytes]:
+    import pyarrow as pa # type: ignore
+
+    schema = pa.schema([("id", pa.int64()) if c == "id" else (c, pa.string()) for c in COLUMNS])
+    sink = _DrainableSink()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq # type: ignore
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+        write = writer.write_table
+        to_unit = lambda batch: pa.Table.from_batches([batch])
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+        write = writer.write_batch
+        to_unit = lambda batch: batch
+
+    try:
+        for sec in secs:
+            to_record = sec["record"]
+            for chunk in iter_chunks(session, sec["stmt"], chunk_rows):
+                records = [to_record(r) for r in chunk]
+                batch = pa.RecordBatch.from_pydict({c: [rec.get(c) for rec in records] for c in COLUMNS}, schema=schema)
+                write(to_unit(batch))
+                data = sink.drain()
+                if data:
+                    yield data
+    finally:
+        writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip-compress a byte stream on the fly (one gzip member)."""
+    comp = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+def columnar_available() -> bool:
+    try:
+        import pyarrow # type: ignore # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def export_stream(engine, user_id: int, fmt: str = "csv", compress: bool = False,
+                  chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Yield the user's export as bytes. Opens its own session, because the
+    response body is produced after the request's dependencies have finished.
+    """
+    def body():
+        with Session(engine) as session:
+            secs = sections(user_id)
+            if fmt == "csv":
+                yield from _csv_stream(session, secs, chunk_rows)
+            elif fmt == "ndjson":
+                yield from _ndjson_stream(session, secs, chunk_rows)
+            elif fmt in COLUMNAR:
+                yield from _columnar_stream(session, secs, chunk_rows, fmt)
+            else:
+                raise ValueError(f"unknown export format {fmt!r}")
+
+    return gzip_stream(body()) if compress else body()
@@ -0,0 +1,151 @@
+# backend/src/hashing.py
+"""
+Bounded executor for CPU-bound password hashing.
+
+Work runs in a dedicated pool (processes by default, so it escapes the GIL).
+Async callers await run(); sync routes call(), which blocks their threadpool
+thread on the result while the hashing itself runs in the pool. At most
+`max_workers` hashes run at once and at most `max_queue` more may wait.
+Beyond that, run()/call() raise HashingBusy so the route can answer 503
+instead of piling up requests.
+
+Worker functions must be module-level (picklable) and return
+(result, seconds_spent_hashing) so queue wait can be told apart from work.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+
+class HashingBusy(RuntimeError):
+    """Raised when the hashing queue is full."""
+
+
+class HashingPool:
+    def __init__(self, max_workers: int = 2, max_queue: int = 64, mode: str = "process", name: str = "hashing"):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.mode = mode
+        self.name = name
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self._pending = 0
+        self._max_pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._errors = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._work_total = 0.0
+        self._work_max = 0.0
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.mode == "inline":
+            return None
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.mode == "process":
+                        # spawn: forking a process that already runs model/batcher threads is unsafe
+                        ctx = multiprocessing.get_context("spawn")
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def start(self):
+        """Create the pool ahead of the first request (process start-up takes a moment)."""
+        self._get_executor()
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise HashingBusy(f"{self.name} queue is full")
+            self._pending += 1
+            self._max_pending = max(self._max_pending, self._pending)
+
+    def _failed(self, broken: bool):
+        with self._lock:
+            self._errors += 1
+            if broken:
+                self._executor = None
+
+    def _done(self, started: float, work: float):
+        total = time.perf_counter() - started
+        wait = max(0.0, total - work)
+        with self._lock:
+            self._completed += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            self._work_total += work
+            self._work_max = max(self._work_max, work)
+
+    async def run(self, fn: Callable[..., tuple], *args) -> Any:
+        self._admit()
+        started = time.perf_counter()
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                result, work = fn(*args)
+            else:
+                result, work = await asyncio.wrap_future(executor.submit(fn, *args))
+        except Exception as e:
+            self._failed(isinstance(e, BrokenProcessPool))
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+        self._done(started, work)
+        return result
+
+    def call(self, fn: Callable[..., tuple], *args) -> Any:
+        """run() for sync routes: blocks the calling (threadpool) thread until the pool has the result."""
+        self._admit()
+        started = time.perf_counter()
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                result, work = fn(*args)
+            else:
+                result, work = executor.submit(fn, *args).result()
+        except Exception as e:
+            self._failed(isinstance(e, BrokenProcessPool))
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+        self._done(started, work)
+        return result
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self._completed
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": min(self._pending, self.max_workers),
+                "queued": max(0, self._pending - self.max_workers),
+                "max_pending": self._max_pending,
+                "completed": done,
+                "rejected": self._rejected,
+                "errors": self._errors,
+                "avg_wait_ms": round(self._wait_total / done * 1000, 2) if done else 0.0,
+                "max_wait_ms": round(self._wait_max * 1000, 2),
+                "avg_hash_ms": round(self._work_total / done * 1000, 2) if done else 0.0,
+                "max_hash_ms": round(self._work_max * 1000, 2),
+            }
@@ -1,10 +1,23 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from datetime import datetime
 from fastapi.middleware.cors import CORSMiddleware
-from .database import create_db_and_tables
-from .routes import auth, mood, bookings, sessions, therapist, chat, recommendations, analytics, export, account, audit
+from sqlalchemy import text # type: ignore
+from .database import DB_ASYNC, create_db_and_tables, engine, dispose_async_engines
+from .migrations import AUTO_MIGRATE, run_migrations
+from .auth_utils import hashing_pool
+from .write_queue import write_queue
+from .ml.sentiment import preload as preload_sentiment_model, is_ready as sentiment_ready, model_status
+from .ml.scoring import load_cache as load_score_cache, save_cache as save_score_cache
+from .ml.retrieval import preload as preload_retrieval
+from .routes import auth, mood, bookings, sessions, therapist, chat, recommendations, analytics, export, account, audit, metrics
 from .routes.bookings_auto import router as bookings_auto_router
 
+if DB_ASYNC:
+    # same paths and responses on the async sessions (aiosqlite / asyncpg)
+    from .routes import (mood_async as mood, bookings_async as bookings, chat_async as chat, analytics_async as analytics,
+                         recommendations_async as recommendations)
+
 app = FastAPI(title="Mental Health Portal API")
 
 origins = [
@@ -20,6 +33,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # pagination / count metadata travels in headers; let the browser read them
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor", "X-Total-Count", "ETag"],
 )
 
 app.include_router(auth.router)
@@ -33,11 +48,27 @@ app.include_router(analytics.router)
 app.include_router(export.router)
 app.include_router(account.router)
 app.include_router(audit.router)
+app.include_router(metrics.router)
 app.include_router(bookings_auto_router)
 
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
+    if AUTO_MIGRATE:
+        run_migrations(engine)
+    # the model loads in the background by default, so /api/health answers right away
+    preload_sentiment_model()
+    load_score_cache()
+    preload_retrieval()
+    hashing_pool().start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    save_score_cache()
+    hashing_pool().close()
+    # flush queued writes before the process exits
+    write_queue.close()
+    await dispose_async_engines()
 
 @app.get("/api/health")
 def health_check():
@@ -46,3 +77,24 @@ def health_check():
         "message": "Backend is running successfully",
         "time": datetime.now().isoformat()
     }
+
+@app.get("/api/ready")
+def readiness_check():
+    """
+    Readiness (as opposed to liveness): 503 until the database answers and the
+    sentiment model has finished loading, so load balancers hold traffic back.
+    """
+    db_ok = True
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception:
+        db_ok = False
+    ready = db_ok and sentiment_ready()
+    body = {
+        "status": "ready" if ready else "starting",
+        "database": "ok" if db_ok else "unavailable",
+        "sentiment_model": model_status(),
+        "time": datetime.now().isoformat()
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
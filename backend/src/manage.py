@@ -0,0 +1,182 @@
+# backend/src/manage.py
+"""
+Maintenance commands. Run from the backend directory:
+
+  python -m src.manage migrate [--status]
+  python -m src.manage explain
+  python -m src.manage rebuild-rollups [--user-id N]
+  python -m src.manage check-rollups
+  python -m src.manage rebuild-mood-state [--user-id N]
+  python -m src.manage generate [--patients N] [--moods-per-user N] ... (see --help)
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from sqlmodel import Session, select # type: ignore
+from sqlalchemy import func, text # type: ignore
+from .database import engine, create_db_and_tables
+from .crud_mood import rebuild_mood_rollups, check_mood_rollups
+from .migrations import MIGRATIONS, applied_versions, run_migrations
+from .models import User, Mood, MoodState, Booking, ChatMessage, Session as SessionModel
+from .pagination import encode_cursor, keyset_query
+from .alerts import high_risk_after_stmt
+from .mood_state import rebuild_mood_states, deteriorating_stmt
+from .datagen import GenerateSpec, generate
+
+def _deep_page(stmt, kind, ts_col, id_col, descending=True):
+    """A keyset page well past the first one (what "load more" runs)."""
+    cursor = encode_cursor(kind, datetime(2026, 1, 1), 1000, "next")
+    return keyset_query(stmt, kind, ts_col, id_col, 100, cursor, descending)[0]
+
+# The filters every hot path runs; each must be answered from an index
+HOT_QUERIES = {
+    "moods page (keyset)": _deep_page(select(Mood).where(Mood.user_id == 1), "mood", Mood.date, Mood.id),
+    "chat history page (keyset)": _deep_page(select(ChatMessage).where(ChatMessage.user_id == 1), "chat", ChatMessage.created_at, ChatMessage.id),
+    "bookings page (keyset)": _deep_page(select(Booking).where(Booking.patient_id == 1), "booking", Booking.datetime, Booking.id, descending=False),
+    "sessions page (keyset)": _deep_page(select(SessionModel).where(SessionModel.patient_id == 1), "session", SessionModel.session_at, SessionModel.id),
+    "moods by user": select(Mood).where(Mood.user_id == 1).order_by(Mood.date.desc()).limit(100),
+    "high-risk audit feed": select(Mood).where(Mood.risk == "HIGH").order_by(Mood.date.desc()).limit(200),
+    "high-risk alert resume": high_risk_after_stmt(1000),
+    "deteriorating patients": deteriorating_stmt(),
+    "chat history": select(ChatMessage).where(ChatMessage.user_id == 1).order_by(ChatMessage.created_at.asc()).limit(200),
+    "bookings by therapist": select(Booking).where(Booking.therapist_id == 1).order_by(Booking.datetime.asc()).limit(200),
+    "bookings by patient": select(Booking).where(Booking.patient_id == 1).order_by(Booking.datetime.asc()).limit(200),
+    "sessions by patient": select(SessionModel).where(SessionModel.patient_id == 1).order_by(SessionModel.session_at.desc()).limit(200),
+    "user by email": select(User).where(User.email == "someone@example.com"),
+}
+
+def query_plan_problems(conn, stmt) -> tuple:
+    """(plan lines, problems) for a statement under SQLite's EXPLAIN QUERY PLAN."""
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    problems = []
+    for line in plan:
+        if line.startswith("SCAN ") and "USING" not in line:
+            problems.append(f"full table scan: {line}")
+        if "TEMP B-TREE" in line:
+            problems.append(f"sort not served by an index: {line}")
+    return plan, problems
+
+def cmd_migrate(args) -> int:
+    if args.status:
+        done = applied_versions(engine)
+        for version, description, _ in MIGRATIONS:
+            print(f"{'applied' if version in done else 'pending':8s} {version:4d}  {description}")
+        return 0
+    applied = run_migrations(engine)
+    print(f"{len(applied)} migration(s) applied")
+    return 0
+
+def cmd_explain(args) -> int:
+    if engine.dialect.name != "sqlite":
+        print("explain only supports SQLite")
+        return 2
+    failed = 0
+    with engine.connect() as conn:
+        for name, stmt in HOT_QUERIES.items():
+            plan, problems = query_plan_problems(conn, stmt)
+            print(f"{'FAIL' if problems else 'ok  '} {name}: {' | '.join(plan)}")
+            for p in problems:
+                print(f"       {p}")
+            failed += bool(problems)
+    return 1 if failed else 0
+
+def cmd_rebuild_rollups(args) -> int:
+    with Session(engine) as session:
+        n = rebuild_mood_rollups(session, user_id=args.user_id)
+    print(f"rebuilt {n} daily rollup rows")
+    return 0
+
+def cmd_rebuild_mood_state(args) -> int:
+    with Session(engine) as session:
+        n = rebuild_mood_states(session, user_id=args.user_id)
+        flagged = session.exec(select(func.count()).select_from(MoodState).where(MoodState.flagged == True)).one()  # noqa: E712
+    print(f"rebuilt {n} mood states, {flagged} flagged")
+    return 0
+
+def cmd_check_rollups(args) -> int:
+    with Session(engine) as session:
+        checked, mismatches = check_mood_rollups(session)
+    for m in mismatches:
+        print(json.dumps(m, default=str))
+    print(f"checked {checked} user-days, {len(mismatches)} mismatches" + (" (report truncated)" if len(mismatches) >= 50 else ""))
+    return 1 if mismatches else 0
+
+def cmd_generate(args) -> int:
+    if engine.dialect.name != "sqlite":
+        print("generate only supports SQLite")
+        return 2
+    run_migrations(engine)  # so startup backfills find nothing left to do
+    try:
+        risk_mix = tuple(float(x) for x in args.risk_mix.split(","))
+    except ValueError:
+        risk_mix = ()
+    if len(risk_mix) != 3 or min(risk_mix) < 0 or not sum(risk_mix):
+        print("--risk-mix takes three non-negative weights: LOW,MEDIUM,HIGH")
+        return 2
+    spec = GenerateSpec(
+        patients=args.patients, therapists=args.therapists, moods_per_user=args.moods_per_user,
+        chats_per_user=args.chats_per_user, bookings_per_patient=args.bookings_per_patient, spread=args.spread,
+        risk_mix=risk_mix, days=args.days, future_days=args.future_days, password=args.password, seed=args.seed,
+        batch=args.batch, commit_rows=args.commit_rows,
+    )
+    started = time.perf_counter()
+    def progress(counts):
+        print(f"  {sum(counts.values()):>12,} rows  {time.perf_counter() - started:7.1f}s  " +
+              "  ".join(f"{t}={n:,}" for t, n in counts.items()), flush=True)
+    report = generate(engine, spec, progress=progress, rebuild_derived=not args.no_derived)
+    report["seconds"] = round(time.perf_counter() - started, 1)
+    report["rows_per_s"] = round(report["total_rows"] / (report["load_s"] or 1))
+    print(json.dumps(report, indent=2))
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.manage", description="Mental Health Portal maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("migrate", help="apply pending schema migrations")
+    p.add_argument("--status", action="store_true", help="list migrations instead of applying them")
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser("explain", help="check that hot queries use indexes (SQLite query plans)")
+    p.set_defaults(func=cmd_explain)
+
+    p = sub.add_parser("rebuild-rollups", help="recompute the MoodDaily rollup from raw moods")
+    p.add_argument("--user-id", type=int, default=None)
+    p.set_defaults(func=cmd_rebuild_rollups)
+
+    p = sub.add_parser("rebuild-mood-state", help="replay all moods into the per-user deterioration state")
+    p.add_argument("--user-id", type=int, default=None)
+    p.set_defaults(func=cmd_rebuild_mood_state)
+
+    p = sub.add_parser("check-rollups", help="verify MoodDaily against the raw Mood table")
+    p.set_defaults(func=cmd_check_rollups)
+
+    d = GenerateSpec()
+    p = sub.add_parser("generate", help="bulk-load a synthetic dataset for load testing (SQLite; appends)",
+                       description="e.g. 10M rows: --patients 40000 --moods-per-user 100 --chats-per-user 150")
+    p.add_argument("--patients", type=int, default=d.patients)
+    p.add_argument("--therapists", type=int, default=d.therapists)
+    p.add_argument("--moods-per-user", type=float, default=d.moods_per_user, help="mean per patient")
+    p.add_argument("--chats-per-user", type=float, default=d.chats_per_user, help="mean chat messages per patient (user + bot)")
+    p.add_argument("--bookings-per-patient", type=float, default=d.bookings_per_patient, help="mean per patient")
+    p.add_argument("--spread", type=float, default=d.spread, help="lognormal sigma of the per-user counts (0 = every user gets the mean)")
+    p.add_argument("--risk-mix", default=",".join(str(x) for x in d.risk_mix), help="LOW,MEDIUM,HIGH weights")
+    p.add_argument("--days", type=int, default=d.days, help="history length: signups spread over this many days")
+    p.add_argument("--future-days", type=int, default=d.future_days, help="scheduled bookings up to this far ahead")
+    p.add_argument("--password", default=d.password, help="password of every generated user")
+    p.add_argument("--seed", type=int, default=d.seed)
+    p.add_argument("--batch", type=int, default=d.batch, help="rows per executemany")
+    p.add_argument("--commit-rows", type=int, default=d.commit_rows, help="rows per transaction")
+    p.add_argument("--no-derived", action="store_true", help="skip rebuilding MoodDaily / MoodState afterwards")
+    p.set_defaults(func=cmd_generate)
+
+    args = parser.parse_args(argv)
+    create_db_and_tables()
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
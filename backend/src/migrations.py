@@ -0,0 +1,103 @@
+# backend/src/migrations.py
+"""
+Versioned schema migrations for existing databases.
+
+create_db_and_tables() only creates missing tables; it never touches tables
+that already exist (so an old mh.db never gets new indexes or backfills).
+Each entry in MIGRATIONS runs once, in order, in its own transaction, and is
+recorded in the schema_migrations table.
+
+Applied automatically on startup (set AUTO_MIGRATE=0 to disable) or with
+  python -m src.manage migrate [--status]
+
+To add a migration append (next_version, "description", function) where
+function(conn) receives a SQLAlchemy Connection inside a transaction.
+"""
+import os
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text # type: ignore
+from sqlalchemy.exc import IntegrityError # type: ignore
+from sqlmodel import SQLModel, Session # type: ignore
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1") not in ("0", "false", "False")
+
+def ensure_model_indexes(conn):
+    """Create every index declared on the models that the database lacks."""
+    from . import models  # noqa: F401  (registers the tables on SQLModel.metadata)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+def _m001_indexes(conn):
+    ensure_model_indexes(conn)
+
+def _m002_mood_daily_backfill(conn):
+    from .crud_mood import rebuild_mood_rollups
+    has_rollups = conn.execute(text("SELECT 1 FROM mooddaily LIMIT 1")).first()
+    has_moods = conn.execute(text("SELECT 1 FROM mood LIMIT 1")).first()
+    if has_moods and not has_rollups:
+        with Session(bind=conn) as session:
+            rebuild_mood_rollups(session, commit=False)
+
+def _m003_alert_index(conn):
+    ensure_model_indexes(conn)
+
+def _m004_mood_state_backfill(conn):
+    from .mood_state import rebuild_mood_states
+    ensure_model_indexes(conn)
+    has_states = conn.execute(text("SELECT 1 FROM moodstate LIMIT 1")).first()
+    has_moods = conn.execute(text("SELECT 1 FROM mood LIMIT 1")).first()
+    if has_moods and not has_states:
+        with Session(bind=conn) as session:
+            rebuild_mood_states(session, commit=False)
+
+def _m005_mood_state_recalibrate(conn):
+    # the CUSUM now runs on the ewma and the risk window is longer; replay the stored states
+    from .mood_state import rebuild_mood_states
+    if conn.execute(text("SELECT 1 FROM moodstate LIMIT 1")).first():
+        with Session(bind=conn) as session:
+            rebuild_mood_states(session, commit=False)
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "composite indexes for hot queries", _m001_indexes),
+    (2, "backfill mood daily rollups", _m002_mood_daily_backfill),
+    (3, "mood (risk, id) index for the high-risk alert stream", _m003_alert_index),
+    (4, "backfill mood deterioration state", _m004_mood_state_backfill),
+    (5, "rebuild mood deterioration state for the recalibrated detector", _m005_mood_state_recalibrate),
+]
+
+def _ensure_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, description VARCHAR NOT NULL, applied_at VARCHAR NOT NULL)"
+        ))
+
+def applied_versions(engine) -> set:
+    _ensure_table(engine)
+    with engine.connect() as conn:
+        return {r[0] for r in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def pending_migrations(engine) -> List[Tuple[int, str, Callable]]:
+    done = applied_versions(engine)
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+def run_migrations(engine) -> List[int]:
+    """Apply pending migrations in order. Returns the versions applied by this call."""
+    applied = []
+    for version, description, fn in pending_migrations(engine):
+        try:
+            with engine.begin() as conn:
+                fn(conn)
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                    {"v": version, "d": description, "t": datetime.utcnow().isoformat()},
+                )
+        except IntegrityError:
+            # another process applied it concurrently; its transaction won
+            continue
+        print(f"Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
@@ -0,0 +1,166 @@
+# backend/src/ml/batching.py
+"""
+Dynamic micro-batching for model inference.
+
+Concurrent callers submit single items; a background worker collects them into
+batches (bounded by max_batch_size and max_wait_ms) and runs the batch function
+once per batch. Each caller gets back its own result through a Future.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+
+class MicroBatcher:
+    """
+    Collect concurrent submissions into batches for `batch_fn`.
+
+    batch_fn(items) must return a list of results in the same order as items.
+    If it raises, every caller in that batch receives the exception.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0, name: str = "batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+
+        # statistics
+        self._submitted = 0
+        self._batches = 0
+        self._items = 0
+        self._max_batch = 0
+        self._size_hist = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._infer_total = 0.0
+        self._infer_max = 0.0
+        self._errors = 0
+
+    def submit(self, item: Any) -> Future:
+        fut: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed")
+            self._queue.append((item, fut, time.perf_counter()))
+            self._submitted += 1
+            self._ensure_worker()
+            self._cond.notify()
+        return fut
+
+    def run(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Submit a single item and block until its result is ready."""
+        return self.submit(item).result(timeout=timeout)
+
+    def run_many(self, items: List[Any], timeout: Optional[float] = None) -> List[Any]:
+        """Submit several items at once; they are batched together with other callers."""
+        futs = [self.submit(it) for it in items]
+        return [f.result(timeout=timeout) for f in futs]
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop accepting work, drain what is queued and stop the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._worker.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            # wait for more items until the batch is full or the oldest item has waited long enough
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            items = [b[0] for b in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: batch function returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                results = None
+                error = e
+            finished = time.perf_counter()
+
+            for i, (_, fut, enqueued) in enumerate(batch):
+                if results is None:
+                    fut.set_exception(error)
+                else:
+                    fut.set_result(results[i])
+
+            self._record(batch, started, finished, failed=results is None)
+
+    def _record(self, batch, started: float, finished: float, failed: bool):
+        size = len(batch)
+        waits = [started - b[2] for b in batch]
+        infer = finished - started
+        with self._cond:
+            self._batches += 1
+            self._items += size
+            self._max_batch = max(self._max_batch, size)
+            self._size_hist[size] = self._size_hist.get(size, 0) + 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+            self._infer_total += infer
+            self._infer_max = max(self._infer_max, infer)
+            if failed:
+                self._errors += 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            batches = self._batches or 1
+            items = self._items or 1
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "queue_depth": len(self._queue),
+                "submitted": self._submitted,
+                "batches": self._batches,
+                "items": self._items,
+                "errors": self._errors,
+                "avg_batch_size": round(self._items / batches, 2) if self._batches else 0.0,
+                "max_batch_size_seen": self._max_batch,
+                "batch_size_histogram": dict(sorted(self._size_hist.items())),
+                "avg_wait_ms": round(self._wait_total / items * 1000, 3) if self._items else 0.0,
+                "max_wait_ms_seen": round(self._wait_max * 1000, 3),
+                "avg_inference_ms": round(self._infer_total / batches * 1000, 3) if self._batches else 0.0,
+                "max_inference_ms": round(self._infer_max * 1000, 3),
+            }
+
+    def reset_stats(self):
+        with self._cond:
+            self._batches = self._items = self._max_batch = self._errors = 0
+            self._submitted = 0
+            self._size_hist = {}
+            self._wait_total = self._wait_max = 0.0
+            self._infer_total = self._infer_max = 0.0
@@ -0,0 +1,125 @@
+# backend/src/ml/cache.py
+"""
+Bounded, content-addressed LRU cache for model results.
+
+Keys are a SHA-256 of (namespace/version, normalized text), so identical or
+trivially different entries ("Sad ", "sad") share one slot, and a model or
+rule change never serves stale results. The cache is capped both by entry
+count and by an approximate memory budget, and can be saved to / loaded from
+a local JSON-lines file so restarts come back warm.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+_WS = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """NFKC, lowercase and collapse whitespace."""
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WS.sub(" ", text).strip().lower()
+
+def cache_key(version: str, text: str) -> str:
+    h = hashlib.sha256()
+    h.update(version.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(normalize_text(text).encode("utf-8"))
+    return h.hexdigest()
+
+def _approx_size(key: str, value: Any) -> int:
+    # key + JSON payload + per-entry dict/OrderedDict overhead
+    return sys.getsizeof(key) + len(json.dumps(value, separators=(",", ":"))) + 160
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 50000, max_bytes: int = 16 * 1024 * 1024, name: str = "cache"):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.name = name
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: str, value: Any):
+        size = _approx_size(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._data),
+                "approx_bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def save(self, path: str) -> int:
+        """Write entries (least recently used first) to `path` atomically. Returns count."""
+        with self._lock:
+            items = [(k, v) for k, (v, _) in self._data.items()]
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for k, v in items:
+                f.write(json.dumps({"k": k, "v": v}, separators=(",", ":")))
+                f.write("\n")
+        os.replace(tmp, path)
+        return len(items)
+
+    def load(self, path: str) -> int:
+        """Load entries saved by save(); unreadable lines are skipped. Returns count."""
+        if not os.path.exists(path):
+            return 0
+        n = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                    self.put(rec["k"], rec["v"])
+                    n += 1
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return n
@@ -0,0 +1,63 @@
+# backend/src/ml/export_onnx.py
+"""
+Export the sentiment model to a local directory usable by every backend.
+
+  python -m src.ml.export_onnx --out models/sentiment            # fp32 ONNX graph
+  python -m src.ml.export_onnx --out models/sentiment --int8     # + model.int8.onnx
+
+The directory gets the tokenizer, config and PyTorch weights (for the pytorch and
+quantized backends) plus model.onnx (for the onnx backend). Point the API at it with
+SENTIMENT_MODEL_DIR=models/sentiment SENTIMENT_BACKEND=onnx
+(and SENTIMENT_ONNX_FILE=model.int8.onnx for the quantized graph).
+"""
+import argparse
+import os
+
+from .sentiment_bert import MODEL_NAME
+
+def export(out_dir: str, model_name: str = MODEL_NAME, opset: int = 14, int8: bool = False) -> str:
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    tokenizer.save_pretrained(out_dir)
+    model.save_pretrained(out_dir)
+
+    path = os.path.join(out_dir, "model.onnx")
+    dummy = tokenizer(["an example sentence for tracing"], return_tensors="pt")
+    torch.onnx.export(
+        model,
+        (dummy["input_ids"], dummy["attention_mask"]),
+        path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=opset,
+    )
+    print(f"wrote {path}")
+
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+        qpath = os.path.join(out_dir, "model.int8.onnx")
+        quantize_dynamic(path, qpath, weight_type=QuantType.QInt8)
+        print(f"wrote {qpath}")
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the sentiment model for local/ONNX inference")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--model", default=MODEL_NAME, help="hub id or local path of the source model")
+    parser.add_argument("--opset", type=int, default=14)
+    parser.add_argument("--int8", action="store_true", help="also write an int8 dynamically quantized ONNX graph")
+    args = parser.parse_args(argv)
+    export(args.out, args.model, args.opset, args.int8)
+
+if __name__ == "__main__":
+    main()
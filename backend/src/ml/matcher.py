@@ -0,0 +1,93 @@
+# backend/src/ml/matcher.py
+"""
+Multi-pattern keyword matcher (Aho-Corasick over word tokens).
+
+Text and keywords are casefolded and split into word tokens (unicode letters
+and digits; apostrophes and punctuation separate tokens), and the automaton
+runs over tokens instead of characters. That gives word-boundary matching for
+free ("sad" does not match "crusade") and costs one transition per word no
+matter how many keywords are compiled in.
+
+Each keyword has a priority (its position in the list passed to the
+constructor); search() returns the highest-priority keyword found.
+"""
+import re
+from typing import Iterable, List, Optional
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall((text or "").casefold())
+
+
+class KeywordMatcher:
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        # trie: per state a dict token -> next state
+        self._goto: List[dict] = [{}]
+        self._fail: List[int] = [0]
+        # best (lowest) keyword index that ends at each state, following fail links
+        self._out: List[Optional[int]] = [None]
+
+        for kw in keywords:
+            tokens = tokenize(kw)
+            if not tokens:
+                continue
+            idx = len(self.keywords)
+            self.keywords.append(kw)
+            state = 0
+            for tok in tokens:
+                nxt = self._goto[state].get(tok)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(None)
+                    self._goto[state][tok] = nxt
+                state = nxt
+            if self._out[state] is None or idx < self._out[state]:
+                self._out[state] = idx
+        self._build_fail_links()
+
+    def _build_fail_links(self):
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for tok, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and tok not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(tok, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                inherited = self._out[self._fail[nxt]]
+                if inherited is not None and (self._out[nxt] is None or inherited < self._out[nxt]):
+                    self._out[nxt] = inherited
+
+    def search(self, text: str) -> Optional[int]:
+        """Index of the highest-priority keyword present in text, or None."""
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        best = None
+        state = 0
+        for tok in tokenize(text):
+            if state == 0:
+                # fast path: most words never start a keyword
+                state = root.get(tok, 0)
+                if state == 0:
+                    continue
+            else:
+                while state and tok not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(tok, 0)
+            hit = out[state]
+            if hit is not None and (best is None or hit < best):
+                best = hit
+                if best == 0:
+                    break
+        return best
+
+    def __len__(self):
+        return len(self.keywords)
@@ -21,6 +21,37 @@ RECOMMENDATION_POOL = [
     {"id":"daily_routine","title":"Create a Small Daily Routine","text":"Aim for consistency: a short morning routine (stretch, water, planning) and an evening wind-down to stabilize mood."}
 ]
 
+# Ordered pool ids placed first for each context bucket (the rest of the pool follows)
+_BUCKET_PRIORITY = {
+    # recent HIGH risk or very negative latest entry: immediate coping + professional help
+    "crisis": ("breathing", "seek_professional", "grounding", "short_walk"),
+    # last 7 days very negative: routine, sleep, grounding
+    "low_week": ("daily_routine", "sleep_hygiene", "tiny_task", "connect"),
+    # last 7 days moderately negative: coping skills + short activities
+    "mixed_week": ("grounding", "breathing", "short_walk", "journaling"),
+    "default": (),
+}
+
+def context_bucket(context: Dict) -> str:
+    """Which prioritisation a context gets (see _BUCKET_PRIORITY)."""
+    latest_sentiment = context.get("latest_mood_sentiment")
+    latest_risk = (context.get("latest_risk") or "").upper() if context.get("latest_risk") else None
+    avg7 = context.get("avg_7_days")
+    if latest_risk == "HIGH" or (isinstance(latest_sentiment, (int,float)) and latest_sentiment <= -0.6):
+        return "crisis"
+    if avg7 is not None and avg7 <= -0.5:
+        return "low_week"
+    if avg7 is not None and -0.5 < avg7 <= 0:
+        return "mixed_week"
+    return "default"
+
+def _build_bucket(priority) -> List[Dict]:
+    first = [r for r in RECOMMENDATION_POOL if r["id"] in priority]
+    return (first + [r for r in RECOMMENDATION_POOL if r not in first])[:12]
+
+# precomputed once: a request only picks its bucket's list
+RECOMMENDATIONS_BY_BUCKET = {bucket: tuple(_build_bucket(ids)) for bucket, ids in _BUCKET_PRIORITY.items()}
+
 def generate_recommendations(context: Dict) -> List[Dict]:
     """
     context: {
@@ -30,31 +61,6 @@ def generate_recommendations(context: Dict) -> List[Dict]:
       avg_30_days: float or None
     }
 
-    Return a list of recommendation dicts prioritized for the user.
+    Return a list of recommendation dicts prioritized for the user (up to 12).
     """
-    latest_sentiment = context.get("latest_mood_sentiment")
-    latest_risk = (context.get("latest_risk") or "").upper() if context.get("latest_risk") else None
-    avg7 = context.get("avg_7_days")
-    avg30 = context.get("avg_30_days")
-
-    recs = []
-
-    # If recent HIGH risk -> immediate safety + booking items first
-    if latest_risk == "HIGH" or (isinstance(latest_sentiment, (int,float)) and latest_sentiment <= -0.6):
-        # immediate coping + professional help
-        recs.extend([r for r in RECOMMENDATION_POOL if r["id"] in ("breathing","seek_professional","grounding","short_walk")])
-    else:
-        # if average last 7 days very negative -> recommend routine, sleep, grounding
-        if avg7 is not None and avg7 <= -0.5:
-            recs.extend([r for r in RECOMMENDATION_POOL if r["id"] in ("daily_routine","sleep_hygiene","tiny_task","connect")])
-        # if moderate negative sentiment -> coping skills + short activities
-        if avg7 is not None and -0.5 < avg7 <= 0:
-            recs.extend([r for r in RECOMMENDATION_POOL if r["id"] in ("grounding","breathing","short_walk","journaling")])
-
-    # If not already included, add some general helpful items
-    for r in RECOMMENDATION_POOL:
-        if r not in recs:
-            recs.append(r)
-
-    # Return up to 12 recommendations
-    return recs[:12]
+    return list(RECOMMENDATIONS_BY_BUCKET[context_bucket(context)])
@@ -1,7 +1,10 @@
 # backend/src/ml/retrieval.py
-# Simple retrieval of canned responses using keyword matching.
+# Retrieval of canned responses.
 # get_best_response(message) -> (reply_text, response_id, score)
+# Uses the vectorized engine in retrieval_engine.py; the original keyword
+# matcher is kept as keyword_best_response (fallback when numpy is unavailable).
 
+import os
 from typing import Tuple, List
 import re
 
@@ -37,6 +40,9 @@ RESPONSES = [
     {"id":"fallback_positive","patterns":[],"text":"I hear you. Can you say a bit more about how that made you feel? I’m here to listen."}
 ]
 
+# Below this engine score the empathetic fallback_positive reply is used
+MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.5"))
+
 # Simple normalization helper
 def _norm(text: str) -> str:
     return (text or "").lower()
@@ -55,10 +61,19 @@ def _score_for_match(message: str, patterns: List[str]) -> float:
     # score is fraction of matched patterns (capped)
     return min(1.0, found / len(patterns))
 
-def get_best_response(message: str) -> Tuple[str, str, float]:
+def _fallback() -> Tuple[str, str, float]:
+    # fallback response (empathetic)
+    fallback = next((r for r in RESPONSES if r["id"] == "fallback_positive"), None)
+    if fallback:
+        return fallback["text"], fallback["id"], 0.05
+
+    # hard fallback
+    return "I hear you. Can you tell me a little more?", "hard_fallback", 0.01
+
+def keyword_best_response(message: str) -> Tuple[str, str, float]:
     """
-    Return (reply_text, response_id, score).
-    Score is 0.0-1.0; higher is better.
+    Original substring matcher: score is the fraction of a response's patterns
+    found in the message. Kept for comparison and as a dependency-free fallback.
     """
     msg = message or ""
     msg_lower = _norm(msg)
@@ -75,10 +90,37 @@ def get_best_response(message: str) -> Tuple[str, str, float]:
     if best and best_score > 0.0:
         return best["text"], best["id"], best_score
 
-    # fallback response (empathetic)
-    fallback = next((r for r in RESPONSES if r["id"] == "fallback_positive"), None)
-    if fallback:
-        return fallback["text"], fallback["id"], 0.05
+    return _fallback()
 
-    # hard fallback
-    return "I hear you. Can you tell me a little more?", "hard_fallback", 0.01
+def _get_engine():
+    try:
+        from .retrieval_engine import get_engine
+        return get_engine(RESPONSES)
+    except ImportError:
+        return None
+
+def preload():
+    """Build the retrieval index now (e.g. at startup) instead of on the first chat."""
+    _get_engine()
+
+def top_responses(message: str, k: int = 3) -> List[Tuple[str, float]]:
+    """Top-k (response_id, score) candidates for a message, best first."""
+    engine = _get_engine()
+    if engine is None:
+        _, rid, score = keyword_best_response(message)
+        return [(rid, score)]
+    return engine.top_k(message or "", k)
+
+def get_best_response(message: str) -> Tuple[str, str, float]:
+    """
+    Return (reply_text, response_id, score).
+    Score is 0.0-1.0; higher is better.
+    """
+    engine = _get_engine()
+    if engine is None:
+        return keyword_best_response(message)
+
+    rid, score = engine.top_k(message or "", 1)[0]
+    if score < MIN_SCORE:
+        return _fallback()
+    return engine.by_id[rid]["text"], rid, score
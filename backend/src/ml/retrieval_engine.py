@@ -0,0 +1,144 @@
+# backend/src/ml/retrieval_engine.py
+"""
+Vectorized retrieval over the canned response catalog.
+
+At build time every pattern of every response becomes one row of a matrix:
+  - default: idf-weighted character n-grams (3-5, within word boundaries), each
+    row normalized to sum 1, so a query scores the share of a pattern's n-gram
+    mass it contains. Robust to inflections ("depressed" ~ "depress") and typos,
+    and "sad" no longer fires on "crusade".
+  - optional: a local sentence encoder (RETRIEVAL_ENCODER=<sentence-transformers
+    model dir or name>), scoring cosine similarity, which also catches paraphrases.
+
+A query is one gather/matmul over that matrix plus a grouped reduction per
+response; top-k comes from argpartition.
+"""
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+ENCODER = os.getenv("RETRIEVAL_ENCODER", "")
+NGRAM_MIN = 3
+NGRAM_MAX = 5
+# a pattern counts as "matched" above this similarity (used for the coverage bonus)
+PATTERN_MATCH_LEVEL = 0.85
+# weight of the best pattern vs. the share of a response's patterns that matched
+BEST_WEIGHT = 0.8
+
+_WORD = re.compile(r"[^\W_]+")
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall((text or "").lower().replace("'", "").replace("’", ""))
+
+def char_ngrams(text: str) -> set:
+    grams = set()
+    add = grams.add
+    for w in set(_words(text)):
+        padded = f" {w} "
+        for n in range(NGRAM_MIN, NGRAM_MAX + 1):
+            for i in range(len(padded) - n + 1):
+                add(padded[i:i + n])
+    return grams
+
+
+class RetrievalEngine:
+    def __init__(self, responses: List[Dict], encoder: str = ENCODER):
+        import numpy as np
+
+        self.np = np
+        self.responses = [r for r in responses if r.get("patterns")]
+        self.by_id = {r["id"]: r for r in responses}
+
+        patterns, owner = [], []
+        for ri, r in enumerate(self.responses):
+            for p in r["patterns"]:
+                patterns.append(p)
+                owner.append(ri)
+        self.patterns = patterns
+        # rows are grouped by response, so reduceat can aggregate per response
+        self._owner = np.asarray(owner, dtype=np.int64)
+        self._starts = np.flatnonzero(np.r_[True, self._owner[1:] != self._owner[:-1]])
+        self._pattern_counts = np.diff(np.r_[self._starts, len(owner)])
+
+        self.encoder_name = None
+        self._encoder = None
+        if encoder:
+            try:
+                from sentence_transformers import SentenceTransformer  # type: ignore
+                self._encoder = SentenceTransformer(encoder, device="cpu")
+                self.encoder_name = encoder
+            except Exception as e:
+                print(f"Warning: could not load retrieval encoder {encoder!r}, using n-gram index: {e}")
+
+        if self._encoder is not None:
+            emb = self._encoder.encode(patterns, normalize_embeddings=True)
+            self._matrix = np.asarray(emb, dtype=np.float32)
+        else:
+            self._build_ngram_index(patterns)
+
+    def _build_ngram_index(self, patterns: List[str]):
+        np = self.np
+        gram_sets = [char_ngrams(p) for p in patterns]
+        vocab: Dict[str, int] = {}
+        for gs in gram_sets:
+            for g in gs:
+                vocab.setdefault(g, len(vocab))
+        df = np.zeros(len(vocab), dtype=np.float64)
+        for gs in gram_sets:
+            df[[vocab[g] for g in gs]] += 1
+        idf = np.log((1 + len(patterns)) / (1 + df)) + 1.0
+
+        m = np.zeros((len(patterns), len(vocab)), dtype=np.float32)
+        for row, gs in enumerate(gram_sets):
+            cols = [vocab[g] for g in gs]
+            m[row, cols] = idf[cols]
+        sums = m.sum(axis=1, keepdims=True)
+        sums[sums == 0] = 1.0
+        # transpose once so a query gathers contiguous rows
+        self._matrix_t = np.ascontiguousarray((m / sums).T)
+        self.vocab = vocab
+
+    def _pattern_scores(self, message: str):
+        np = self.np
+        if self._encoder is not None:
+            q = self._encoder.encode([message], normalize_embeddings=True)[0]
+            return np.clip(self._matrix @ q, 0.0, 1.0)
+        cols = [self.vocab[g] for g in char_ngrams(message) if g in self.vocab]
+        if not cols:
+            return np.zeros(len(self.patterns), dtype=np.float32)
+        return self._matrix_t[cols].sum(axis=0)
+
+    def response_scores(self, message: str):
+        """Score of every response (aligned with self.responses)."""
+        np = self.np
+        s = self._pattern_scores(message)
+        best = np.maximum.reduceat(s, self._starts)
+        covered = np.add.reduceat((s >= PATTERN_MATCH_LEVEL).astype(np.float32), self._starts) / self._pattern_counts
+        return BEST_WEIGHT * best + (1.0 - BEST_WEIGHT) * covered
+
+    def top_k(self, message: str, k: int = 3) -> List[Tuple[str, float]]:
+        np = self.np
+        scores = self.response_scores(message)
+        k = max(1, min(k, len(scores)))
+        if k == 1:
+            # argmax keeps the catalog order on ties, like the keyword matcher did
+            i = int(scores.argmax())
+            return [(self.responses[i]["id"], round(float(scores[i]), 4))]
+        else:
+            idx = np.sort(np.argpartition(-scores, k - 1)[:k])
+            idx = idx[np.argsort(-scores[idx], kind="stable")]
+        return [(self.responses[i]["id"], round(float(scores[i]), 4)) for i in idx]
+
+
+_engine: Optional[RetrievalEngine] = None
+_engine_lock = threading.Lock()
+
+def get_engine(responses: List[Dict]) -> RetrievalEngine:
+    """Build the engine once (lazily, thread-safe) and reuse it."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RetrievalEngine(responses)
+    return _engine
@@ -1,5 +1,10 @@
 # backend/src/ml/risk.py
-from typing import Tuple, List
+import hashlib
+import json
+import os
+from typing import Tuple, List, Optional
+
+from .matcher import KeywordMatcher, tokenize
 
 # Keywords that indicate high immediate risk (lowercase)
 HIGH_KEYWORDS: List[str] = [
@@ -12,6 +17,41 @@ MEDIUM_KEYWORDS: List[str] = [
     "sad", "unhappy", "panic attack", "anxious", "anxiety"
 ]
 
+# Optional JSON file {"HIGH": [...], "MEDIUM": [...]} with extra (e.g. non-English) keywords
+KEYWORDS_FILE = os.getenv("RISK_KEYWORDS_FILE", "")
+
+def _load_extra_keywords(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        extra = json.load(f)
+    for kw in extra.get("HIGH", []):
+        if kw not in HIGH_KEYWORDS:
+            HIGH_KEYWORDS.append(kw)
+    for kw in extra.get("MEDIUM", []):
+        if kw not in MEDIUM_KEYWORDS:
+            MEDIUM_KEYWORDS.append(kw)
+
+if KEYWORDS_FILE:
+    _load_extra_keywords(KEYWORDS_FILE)
+
+_matcher: KeywordMatcher = None
+_n_high = 0
+
+def rebuild_matcher():
+    """
+    Compile HIGH_KEYWORDS then MEDIUM_KEYWORDS into one automaton. Call again
+    after mutating the keyword lists.
+    """
+    global _matcher, _n_high
+    _matcher = KeywordMatcher(HIGH_KEYWORDS + MEDIUM_KEYWORDS)
+    _n_high = sum(1 for kw in HIGH_KEYWORDS if tokenize(kw))
+
+rebuild_matcher()
+
+def rules_version() -> str:
+    """Short fingerprint of the keyword lists, used to key cached risk results."""
+    h = hashlib.sha1("\n".join(HIGH_KEYWORDS + ["--"] + MEDIUM_KEYWORDS).encode("utf-8"))
+    return h.hexdigest()[:12]
+
 def detect_risk(text: str, compound_score: float, mood_value: int = None) -> Tuple[str, str]:
     """
     Return (risk_level, explanation)
@@ -21,15 +61,14 @@ def detect_risk(text: str, compound_score: float, mood_value: int = None) -> Tup
       - HIGH if any HIGH_KEYWORDS present OR compound_score <= -0.6
       - MEDIUM if any MEDIUM_KEYWORDS present OR compound_score <= -0.3
       - LOW otherwise
+    Keywords match on whole words; when several match, the first HIGH keyword
+    (in list order) wins, then the first MEDIUM one.
     """
     if text:
-        lower = text.lower()
-        for kw in HIGH_KEYWORDS:
-            if kw in lower:
-                return "HIGH", f"keyword match: '{kw}'"
-        for kw in MEDIUM_KEYWORDS:
-            if kw in lower:
-                return "MEDIUM", f"keyword match: '{kw}'"
+        hit = _matcher.search(text)
+        if hit is not None:
+            level = "HIGH" if hit < _n_high else "MEDIUM"
+            return level, f"keyword match: '{_matcher.keywords[hit]}'"
 
     if compound_score is not None:
         if compound_score <= -0.6:
@@ -38,3 +77,11 @@ def detect_risk(text: str, compound_score: float, mood_value: int = None) -> Tup
             return "MEDIUM", f"compound {compound_score}"
 
     return "LOW", f"compound {compound_score}"
+
+def detect_risk_batch(texts: List[str], compound_scores: List[Optional[float]]) -> List[Tuple[str, str]]:
+    """
+    Score many texts in one call (same rules as detect_risk, one shared automaton).
+    """
+    if len(texts) != len(compound_scores):
+        raise ValueError("texts and compound_scores must have the same length")
+    return [detect_risk(t, c) for t, c in zip(texts, compound_scores)]
@@ -0,0 +1,113 @@
+# backend/src/ml/scoring.py
+"""
+Cached sentiment + risk scoring for mood entries.
+
+score_text / score_texts wrap analyze_text(s) and detect_risk behind a
+content-addressed LRU cache (see cache.py). Routes that score mood text should
+call these instead of the model directly. Neutral fallbacks (model not loaded,
+inference error) are returned but never cached.
+"""
+import os
+from typing import List, Tuple
+
+from .cache import ResultCache, cache_key
+from .sentiment_bert import NEUTRAL, try_analyze_text, try_analyze_texts, model_version
+from .risk import detect_risk, detect_risk_batch, rules_version
+
+CACHE_ENABLED = os.getenv("SCORE_CACHE", "1") not in ("0", "false", "False")
+CACHE_MAX_ENTRIES = int(os.getenv("SCORE_CACHE_MAX_ENTRIES", "50000"))
+CACHE_MAX_BYTES = int(os.getenv("SCORE_CACHE_MAX_MB", "16")) * 1024 * 1024
+# Optional JSON-lines file used to persist the cache across restarts
+CACHE_PATH = os.getenv("SCORE_CACHE_PATH", "")
+
+score_cache = ResultCache(max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, name="score-cache")
+
+def _version():
+    mv = model_version()
+    if mv is None:
+        return None
+    return f"{mv}|risk:{rules_version()}"
+
+def _combine(scores: dict, text: str) -> Tuple[dict, str, str]:
+    compound = float(scores.get("compound", 0.0))
+    risk_level, explanation = detect_risk(text, compound)
+    return scores, risk_level, explanation
+
+def score_text(text: str) -> Tuple[dict, str, str]:
+    """
+    Return (sentiment_scores, risk_level, explanation) for one text.
+    """
+    text = text or ""
+    cacheable = CACHE_ENABLED and bool(text.strip())
+    version = _version() if cacheable else None
+    if version is not None:
+        hit = score_cache.get(cache_key(version, text))
+        if hit is not None:
+            return hit["s"], hit["r"], hit["e"]
+
+    scores = try_analyze_text(text)
+    failed = scores is None
+    scores, risk_level, explanation = _combine(dict(NEUTRAL) if failed else scores, text)
+
+    # analyze_text may have just loaded the model, so look the version up again
+    version = _version() if cacheable and not failed else None
+    if version is not None:
+        score_cache.put(cache_key(version, text), {"s": scores, "r": risk_level, "e": explanation})
+    return scores, risk_level, explanation
+
+def score_texts(texts: List[str]) -> List[Tuple[dict, str, str]]:
+    """
+    Batch variant of score_text: cache hits are answered directly and all misses
+    go to the model together (one call to analyze_texts).
+    """
+    texts = [t or "" for t in texts]
+    out = [None] * len(texts)
+    version = _version() if CACHE_ENABLED else None
+
+    missing = []
+    for i, t in enumerate(texts):
+        if version is not None and t.strip():
+            hit = score_cache.get(cache_key(version, t))
+            if hit is not None:
+                out[i] = (hit["s"], hit["r"], hit["e"])
+                continue
+        missing.append(i)
+
+    if missing:
+        scored = try_analyze_texts([texts[i] for i in missing])
+        failed = [s is None for s in scored]
+        scored = [dict(NEUTRAL) if s is None else s for s in scored]
+        risks = detect_risk_batch([texts[i] for i in missing], [float(s.get("compound", 0.0)) for s in scored])
+        version = _version() if CACHE_ENABLED else None
+        for i, scores, (risk_level, explanation), fail in zip(missing, scored, risks, failed):
+            out[i] = (scores, risk_level, explanation)
+            if version is not None and not fail and texts[i].strip():
+                s, r, e = out[i]
+                score_cache.put(cache_key(version, texts[i]), {"s": s, "r": r, "e": e})
+    return out
+
+def load_cache() -> int:
+    """Warm the cache from SCORE_CACHE_PATH (no-op when unset)."""
+    if not (CACHE_ENABLED and CACHE_PATH):
+        return 0
+    try:
+        return score_cache.load(CACHE_PATH)
+    except OSError as e:
+        print(f"Warning: could not load score cache: {e}")
+        return 0
+
+def save_cache() -> int:
+    """Persist the cache to SCORE_CACHE_PATH (no-op when unset)."""
+    if not (CACHE_ENABLED and CACHE_PATH):
+        return 0
+    try:
+        return score_cache.save(CACHE_PATH)
+    except OSError as e:
+        print(f"Warning: could not save score cache: {e}")
+        return 0
+
+def cache_stats() -> dict:
+    stats = score_cache.stats()
+    stats["enabled"] = CACHE_ENABLED
+    stats["path"] = CACHE_PATH or None
+    return stats
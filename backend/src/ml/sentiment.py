@@ -2,6 +2,6 @@
 """
 Sentiment analysis module - uses BERT-based model for advanced analysis.
 """
-from .sentiment_bert import analyze_text
+from .sentiment_bert import analyze_text, analyze_texts, batcher_stats, preload, is_ready, model_status
 
-__all__ = ["analyze_text"]
+__all__ = ["analyze_text", "analyze_texts", "batcher_stats", "preload", "is_ready", "model_status"]
@@ -0,0 +1,118 @@
+# backend/src/ml/sentiment_backends.py
+"""
+Inference backends for the sentiment model.
+
+Every builder returns a callable with the transformers pipeline calling
+convention: fn(texts, batch_size=N) -> [{"label": "POSITIVE"|"NEGATIVE", "score": float}, ...]
+so sentiment_bert can swap them without changing its output contract.
+
+  pytorch    - fp32 transformers pipeline (default)
+  quantized  - same model with int8 dynamic quantization of the Linear layers (CPU)
+  onnx       - ONNX Runtime session over an exported graph (see export_onnx.py)
+  stub       - tiny deterministic lexicon scorer, for benchmarks/CI without model weights
+
+All heavy imports happen inside the builders.
+"""
+import math
+import os
+from typing import Callable, Dict, List
+
+BACKENDS = ("pytorch", "quantized", "onnx", "stub")
+
+# Thread count for CPU backends; 0 lets the runtime decide
+CPU_THREADS = int(os.getenv("SENTIMENT_CPU_THREADS", "0"))
+
+def _as_list(texts):
+    return [texts] if isinstance(texts, str) else list(texts)
+
+def build_pytorch(model_path: str, device: int) -> Callable:
+    from transformers import pipeline
+    return pipeline("sentiment-analysis", model=model_path, device=device)
+
+def build_quantized(model_path: str, device: int) -> Callable:
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    if CPU_THREADS:
+        torch.set_num_threads(CPU_THREADS)
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+    # int8 weights for nn.Linear, activations quantized on the fly; CPU only
+    qmodel = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline("sentiment-analysis", model=qmodel, tokenizer=tokenizer, device=-1)
+
+
+class OnnxSentimentPipeline:
+    """Tokenizer + onnxruntime session that mimics the transformers pipeline output."""
+
+    def __init__(self, model_dir: str, model_file: str = "model.onnx"):
+        import onnxruntime as ort  # type: ignore
+        from transformers import AutoConfig, AutoTokenizer
+
+        path = os.path.join(model_dir, model_file)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found; export it with `python -m src.ml.export_onnx --out {model_dir}`")
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if CPU_THREADS:
+            opts.intra_op_num_threads = CPU_THREADS
+        self.session = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        config = AutoConfig.from_pretrained(model_dir)
+        self.id2label = {int(k): v for k, v in config.id2label.items()}
+
+    def __call__(self, texts, batch_size: int = 16, **kwargs) -> List[Dict]:
+        import numpy as np
+
+        texts = _as_list(texts)
+        batch_size = max(1, int(batch_size or 1))
+        out = []
+        for start in range(0, len(texts), batch_size):
+            chunk = texts[start:start + batch_size]
+            enc = self.tokenizer(chunk, padding=True, truncation=True, max_length=512, return_tensors="np")
+            feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in self.input_names}
+            logits = self.session.run(None, feeds)[0]
+            logits = logits - logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            best = probs.argmax(axis=1)
+            for row, idx in zip(probs, best):
+                out.append({"label": self.id2label[int(idx)], "score": float(row[idx])})
+        return out
+
+def build_onnx(model_path: str, device: int) -> Callable:
+    model_file = os.getenv("SENTIMENT_ONNX_FILE", "model.onnx")
+    return OnnxSentimentPipeline(model_path, model_file=model_file)
+
+
+_STUB_NEGATIVE = ("sad", "bad", "tired", "hopeless", "anxious", "angry", "die", "hate", "lonely", "awful", "worthless", "cry")
+_STUB_POSITIVE = ("good", "great", "happy", "calm", "ok", "okay", "better", "love", "fine", "grateful", "relaxed")
+
+def stub_pipeline(texts, batch_size: int = 16, **kwargs) -> List[Dict]:
+    out = []
+    for t in _as_list(texts):
+        words = t.lower().split()
+        neg = sum(1 for w in words if w.strip(".,!?") in _STUB_NEGATIVE)
+        pos = sum(1 for w in words if w.strip(".,!?") in _STUB_POSITIVE)
+        margin = pos - neg
+        label = "NEGATIVE" if margin < 0 else "POSITIVE"
+        out.append({"label": label, "score": round(0.5 + 0.5 * math.tanh(abs(margin) + 0.2), 4)})
+    return out
+
+def build_stub(model_path: str, device: int) -> Callable:
+    return stub_pipeline
+
+BUILDERS = {
+    "pytorch": build_pytorch,
+    "quantized": build_quantized,
+    "onnx": build_onnx,
+    "stub": build_stub,
+}
+
+def build(backend: str, model_path: str, device: int) -> Callable:
+    if backend not in BUILDERS:
+        raise ValueError(f"Unknown sentiment backend {backend!r}; choose one of {', '.join(BACKENDS)}")
+    return BUILDERS[backend](model_path, device)
@@ -2,24 +2,157 @@
 """
 BERT-based sentiment analysis using transformers library.
 Replaces NLTK VADER with a more advanced pre-trained model.
+
+Concurrent analyze_text calls are collected into micro-batches so the pipeline
+runs one forward pass per batch instead of one per request.
+
+torch/transformers are imported and the model is built lazily (on first use or
+by preload() in the background after startup), so importing this module is cheap.
 """
-from transformers import pipeline
-import torch
-
-# Use GPU if available, otherwise CPU
-device = 0 if torch.cuda.is_available() else -1
-
-# Initialize the sentiment analysis pipeline with a pre-trained model
-# Using distilbert-base-uncased-finetuned-sst-2-english for efficiency
-try:
-    _sentiment_pipeline = pipeline(
-        "sentiment-analysis",
-        model="distilbert-base-uncased-finetuned-sst-2-english",
-        device=device
-    )
-except Exception as e:
-    print(f"Warning: Could not load sentiment model: {e}")
-    _sentiment_pipeline = None
+import os
+import threading
+import time
+from typing import List, Optional
+
+from .batching import MicroBatcher
+from . import sentiment_backends
+
+MODEL_NAME = os.getenv("SENTIMENT_MODEL", "distilbert-base-uncased-finetuned-sst-2-english")
+# Inference backend: pytorch (default), quantized (int8 dynamic), onnx, stub - see sentiment_backends.py
+BACKEND = os.getenv("SENTIMENT_BACKEND", "pytorch").lower()
+# Optional local model directory (required for onnx); falls back to MODEL_NAME from the hub cache
+MODEL_DIR = os.getenv("SENTIMENT_MODEL_DIR", "")
+
+# Micro-batching knobs (see batcher_stats() to tune them)
+BATCHING_ENABLED = os.getenv("SENTIMENT_BATCHING", "1") not in ("0", "false", "False")
+BATCH_MAX_SIZE = int(os.getenv("SENTIMENT_BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("SENTIMENT_BATCH_MAX_WAIT_MS", "5"))
+
+# Loading: "background" (load in a thread after startup), "eager" (block startup) or "lazy" (first request)
+PRELOAD_MODE = os.getenv("SENTIMENT_PRELOAD", "background")
+WARMUP_ENABLED = os.getenv("SENTIMENT_WARMUP", "1") not in ("0", "false", "False")
+WARMUP_TEXTS = ["I feel okay today.", "I am really sad and tired."]
+
+NEUTRAL = {"label": "NEUTRAL", "score": 0.5, "compound": 0.0}
+
+_sentiment_pipeline = None
+device = None
+_load_lock = threading.Lock()
+_load_state = "not_loaded"  # not_loaded -> loading -> ready | failed
+_load_error = None
+_load_seconds = None
+_warmup_seconds = None
+
+def _build_pipeline():
+    global device
+    if BACKEND == "pytorch":
+        import torch
+        # Use GPU if available, otherwise CPU
+        device = 0 if torch.cuda.is_available() else -1
+    else:
+        # quantized and onnx backends are CPU-only
+        device = -1
+
+    # Using distilbert-base-uncased-finetuned-sst-2-english (or a local copy) for efficiency
+    return sentiment_backends.build(BACKEND, MODEL_DIR or MODEL_NAME, device)
+
+def load_model():
+    """
+    Import the ML stack and build the pipeline (idempotent, thread-safe).
+    Concurrent callers block until the first load finishes.
+    """
+    global _sentiment_pipeline, _load_state, _load_error, _load_seconds, _warmup_seconds
+    if _load_state in ("ready", "failed"):
+        return _sentiment_pipeline
+    with _load_lock:
+        if _load_state in ("ready", "failed"):
+            return _sentiment_pipeline
+        _load_state = "loading"
+        started = time.perf_counter()
+        try:
+            _sentiment_pipeline = _build_pipeline()
+        except Exception as e:
+            print(f"Warning: Could not load sentiment model: {e}")
+            _sentiment_pipeline = None
+            _load_error = str(e)
+            _load_state = "failed"
+            return None
+        _load_seconds = round(time.perf_counter() - started, 3)
+
+        if WARMUP_ENABLED:
+            # one forward pass so the first real request doesn't pay for lazy kernel init
+            started = time.perf_counter()
+            try:
+                _sentiment_pipeline(WARMUP_TEXTS, batch_size=len(WARMUP_TEXTS))
+            except Exception as e:
+                print(f"Warning: sentiment warm-up failed: {e}")
+            _warmup_seconds = round(time.perf_counter() - started, 3)
+
+        _load_state = "ready"
+        return _sentiment_pipeline
+
+def preload():
+    """
+    Called on application startup. Honors SENTIMENT_PRELOAD:
+      background - load in a daemon thread so the API can serve immediately
+      eager      - load before returning
+      lazy       - do nothing; the first analyze_text call loads the model
+    """
+    if PRELOAD_MODE == "eager":
+        load_model()
+    elif PRELOAD_MODE == "background":
+        threading.Thread(target=load_model, name="sentiment-loader", daemon=True).start()
+
+def model_status() -> dict:
+    return {
+        "state": _load_state,
+        "model": MODEL_DIR or MODEL_NAME,
+        "backend": BACKEND,
+        "device": device,
+        "preload": PRELOAD_MODE,
+        "error": _load_error,
+        "load_seconds": _load_seconds,
+        "warmup_seconds": _warmup_seconds,
+    }
+
+def model_version():
+    """
+    Identifier of the model currently serving results, or None while it is not
+    loaded (neutral fallbacks must not be cached as real results).
+    """
+    if _load_state != "ready":
+        return None
+    return f"{MODEL_DIR or MODEL_NAME}@{BACKEND}"
+
+def is_ready() -> bool:
+    """
+    True once the model is usable for requests. A failed load counts as ready
+    (analyze_text degrades to neutral scores); lazy mode never gates readiness.
+    """
+    return _load_state in ("ready", "failed") or PRELOAD_MODE == "lazy"
+
+def _to_scores(result: dict) -> dict:
+    label = result["label"]  # "POSITIVE" or "NEGATIVE"
+    score = result["score"]  # confidence 0-1
+
+    # Convert to compound score [-1, 1]
+    if label == "POSITIVE":
+        compound = score
+    else:  # NEGATIVE
+        compound = -score
+
+    return {
+        "label": label,
+        "score": score,
+        "compound": compound
+    }
+
+def _run_batch(texts: List[str]) -> List[dict]:
+    """Run one forward pass over a batch of (already truncated) texts."""
+    results = _sentiment_pipeline(texts, batch_size=len(texts))
+    return [_to_scores(r) for r in results]
+
+_batcher = MicroBatcher(_run_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS, name="sentiment-batcher")
 
 def analyze_text(text: str) -> dict:
     """
@@ -27,31 +160,72 @@ def analyze_text(text: str) -> dict:
     Returns dict with keys: label (POSITIVE/NEGATIVE), score (0-1)
     Converts to compound score format for compatibility: [-1, 1]
     """
+    scores = try_analyze_text(text)
+    return dict(NEUTRAL) if scores is None else scores
+
+def try_analyze_text(text: str) -> Optional[dict]:
+    """
+    analyze_text(), but None instead of the neutral fallback when the model is
+    unavailable or inference failed, so callers can tell a real score from a
+    fallback (and not cache the latter). Empty text is a real NEUTRAL.
+    """
     if not text or not text.strip():
-        return {"label": "NEUTRAL", "score": 0.5, "compound": 0.0}
-    
+        return dict(NEUTRAL)
+
     try:
-        if _sentiment_pipeline is None:
-            return {"label": "NEUTRAL", "score": 0.5, "compound": 0.0}
-        
+        if load_model() is None:
+            return None
+
         # Truncate text to 512 tokens (BERT limit)
         text = text[:512]
-        
-        result = _sentiment_pipeline(text)[0]
-        label = result["label"]  # "POSITIVE" or "NEGATIVE"
-        score = result["score"]  # confidence 0-1
-        
-        # Convert to compound score [-1, 1]
-        if label == "POSITIVE":
-            compound = score
-        else:  # NEGATIVE
-            compound = -score
-        
-        return {
-            "label": label,
-            "score": score,
-            "compound": compound
-        }
+
+        if BATCHING_ENABLED:
+            return _batcher.run(text)
+        return _run_batch([text])[0]
     except Exception as e:
         print(f"Error in sentiment analysis: {e}")
-        return {"label": "NEUTRAL", "score": 0.5, "compound": 0.0}
+        return None
+
+def analyze_texts(texts: List[str]) -> List[dict]:
+    """
+    Batch variant of analyze_text: returns one result dict per input, in order.
+    Items go through the same micro-batcher, so they share forward passes with
+    concurrent single-text callers.
+    """
+    return [dict(NEUTRAL) if r is None else r for r in try_analyze_texts(texts)]
+
+def try_analyze_texts(texts: List[str]) -> List[Optional[dict]]:
+    """Batch variant of try_analyze_text: None for each item whose batch failed."""
+    out = [dict(NEUTRAL) if not (t and t.strip()) else None for t in texts]
+    idx = [i for i, t in enumerate(texts) if t and t.strip()]
+    if not idx or load_model() is None:
+        return out
+    batch = [texts[i][:512] for i in idx]
+    if BATCHING_ENABLED:
+        try:
+            futures = [_batcher.submit(t) for t in batch]
+        except Exception as e:
+            print(f"Error in sentiment analysis: {e}")
+            return out
+        # a failed forward pass fails only the items that were in it
+        for i, fut in zip(idx, futures):
+            try:
+                out[i] = fut.result()
+            except Exception as e:
+                print(f"Error in sentiment analysis: {e}")
+        return out
+    for start in range(0, len(batch), BATCH_MAX_SIZE):
+        try:
+            results = _run_batch(batch[start:start + BATCH_MAX_SIZE])
+        except Exception as e:
+            print(f"Error in sentiment analysis: {e}")
+            continue
+        for i, r in zip(idx[start:start + BATCH_MAX_SIZE], results):
+            out[i] = r
+    return out
+
+def batcher_stats() -> dict:
+    """Queue depth, batch-size and wait-time statistics of the inference batcher."""
+    stats = _batcher.stats()
+    stats["enabled"] = BATCHING_ENABLED
+    return stats
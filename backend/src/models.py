@@ -1,17 +1,24 @@
 # backend/src/models.py
 from typing import Optional
 from sqlmodel import SQLModel, Field # type: ignore
-from datetime import datetime
+from sqlalchemy import Index # type: ignore
+from datetime import datetime, date
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
-    email: str
+    email: str = Field(index=True)
     hashed_password: str
     role: str = Field(default="patient")
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Mood(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_mood_user_id_date", "user_id", "date"),
+        Index("ix_mood_risk_date", "risk", "date"),
+        # alert stream resume: risk == HIGH AND id > last event id
+        Index("ix_mood_risk_id", "risk", "id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     text: Optional[str] = None
@@ -19,7 +26,46 @@ class Mood(SQLModel, table=True):
     sentiment: Optional[float] = None
     risk: Optional[str] = None
 
+class MoodDaily(SQLModel, table=True):
+    """Per-user, per-day rollup of Mood, maintained by crud_mood.create_mood."""
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    sentiment_sum: float = Field(default=0.0)
+    count: int = Field(default=0)
+    high: int = Field(default=0)
+    medium: int = Field(default=0)
+    low: int = Field(default=0)
+
+class MoodState(SQLModel, table=True):
+    """Per-user streaming mood statistics and deterioration flag, maintained by mood_state.py."""
+    __table_args__ = (
+        Index("ix_moodstate_flagged_since", "flagged", "flagged_since"),
+    )
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    entries: int = Field(default=0)
+    ewma: float = Field(default=0.0)
+    baseline: float = Field(default=0.0)
+    cusum: float = Field(default=0.0)
+    # one bit per recent entry, newest in bit 0
+    high_bits: int = Field(default=0)
+    medium_bits: int = Field(default=0)
+    last_mood_id: Optional[int] = None
+    flagged: bool = Field(default=False)
+    flagged_since: Optional[datetime] = None
+    reasons: Optional[str] = None
+    last_mood_at: Optional[datetime] = None
+
+class DataVersion(SQLModel, table=True):
+    """Per-user change counter for one kind of data ("mood", "bookings", "sessions"); see data_versions.py."""
+    user_id: int = Field(primary_key=True)
+    scope: str = Field(primary_key=True)
+    version: int = Field(default=0)
+
 class Booking(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_booking_therapist_id_datetime", "therapist_id", "datetime"),
+        Index("ix_booking_patient_id_datetime", "patient_id", "datetime"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     patient_id: int = Field(foreign_key="user.id")
     therapist_id: int = Field(foreign_key="user.id")
@@ -32,6 +78,10 @@ class Booking(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow) # type: ignore
 
 class Session(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_session_patient_id_session_at", "patient_id", "session_at"),
+        Index("ix_session_therapist_id_session_at", "therapist_id", "session_at"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     booking_id: Optional[int] = Field(default=None, foreign_key="booking.id")
     patient_id: int = Field(foreign_key="user.id")
@@ -41,6 +91,9 @@ class Session(SQLModel, table=True):
     session_at: datetime = Field(default_factory=datetime.utcnow)
 
 class ChatMessage(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_chatmessage_user_id_created_at", "user_id", "created_at"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     sender: str = Field(default="user")  # "user" or "bot" or "system"
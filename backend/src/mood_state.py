@@ -0,0 +1,201 @@
+# backend/src/mood_state.py
+"""
+Streaming per-user deterioration detector.
+
+Each user's MoodState row is updated in constant time per mood, inside the
+transaction that writes the mood (apply_mood_states), in mood-id order:
+  - ewma      fast exponentially weighted mean of sentiment (MOOD_STATE_ALPHA)
+  - baseline  slow one (MOOD_STATE_BASELINE_ALPHA), the user's usual level
+  - cusum     one-sided CUSUM of the ewma's drops below the baseline:
+              max(0, cusum + (baseline - ewma) - MOOD_STATE_CUSUM_SLACK),
+              accumulated from entry MOOD_STATE_WARMUP + 1 on
+  - high_bits / medium_bits  the risk of the last MOOD_STATE_RISK_WINDOW entries
+
+Sentiment scores are bimodal (the SST-2 compound sits near +-0.95), so a
+stable user with a 70/30 positive/negative mix swings by almost 2 from one
+entry to the next. The CUSUM therefore runs on the smoothed ewma rather than
+on raw scores, and both means start as running averages (weight
+max(alpha, 1/n)) so one early extreme entry doesn't set the user's level.
+The risk rule makes every clearly negative score HIGH, so the risk window
+flags a majority of HIGH entries over 20 rather than a few over 10. The
+defaults were calibrated with bench/mood_state.py on such scores.
+
+A user is flagged while any of these holds (reasons in that order):
+  "cusum"          cusum > MOOD_STATE_CUSUM_LIMIT, after MOOD_STATE_WARMUP entries
+  "ewma"           ewma <= MOOD_STATE_EWMA_FLOOR
+  "high_risk"      at least MOOD_STATE_HIGH_LIMIT HIGH entries in the window
+  "elevated_risk"  at least MOOD_STATE_ELEVATED_LIMIT HIGH or MEDIUM entries in the window
+
+rebuild_mood_states() replays the whole Mood table in one pass in id order
+(the order the incremental updates see), so a rebuild reproduces the state
+the write path would have built.
+"""
+import os
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import insert # type: ignore
+from sqlmodel import delete, select # type: ignore
+
+from .models import Mood, MoodState, User
+
+MOOD_STATE_ALPHA = float(os.getenv("MOOD_STATE_ALPHA", "0.1"))
+MOOD_STATE_BASELINE_ALPHA = float(os.getenv("MOOD_STATE_BASELINE_ALPHA", "0.01"))
+MOOD_STATE_CUSUM_SLACK = float(os.getenv("MOOD_STATE_CUSUM_SLACK", "0.3"))
+MOOD_STATE_CUSUM_LIMIT = float(os.getenv("MOOD_STATE_CUSUM_LIMIT", "2.0"))
+MOOD_STATE_WARMUP = int(os.getenv("MOOD_STATE_WARMUP", "10"))
+MOOD_STATE_EWMA_FLOOR = float(os.getenv("MOOD_STATE_EWMA_FLOOR", "-0.5"))
+MOOD_STATE_RISK_WINDOW = int(os.getenv("MOOD_STATE_RISK_WINDOW", "20"))
+MOOD_STATE_HIGH_LIMIT = int(os.getenv("MOOD_STATE_HIGH_LIMIT", "11"))
+MOOD_STATE_ELEVATED_LIMIT = int(os.getenv("MOOD_STATE_ELEVATED_LIMIT", "13"))
+
+_WINDOW_MASK = (1 << MOOD_STATE_RISK_WINDOW) - 1
+_STATE_FIELDS = ("user_id", "entries", "ewma", "baseline", "cusum", "high_bits", "medium_bits",
+                 "last_mood_id", "flagged", "flagged_since", "reasons", "last_mood_at")
+REBUILD_CHUNK = 5000
+
+
+def step(state: MoodState, sentiment: Optional[float], risk: Optional[str], mood_id: int = None, when: datetime = None):
+    """
+    Fold one mood into `state` (same accounting as the rollups: no sentiment
+    counts as 0). `when` is the mood's date; flagged_since is the date of
+    the mood that raised the flag.
+    """
+    x = float(sentiment or 0.0)
+    if state.entries == 0:
+        state.ewma = state.baseline = x
+        state.cusum = 0.0
+    else:
+        n = state.entries + 1
+        state.ewma += max(MOOD_STATE_ALPHA, 1.0 / n) * (x - state.ewma)
+        if n > MOOD_STATE_WARMUP:
+            state.cusum = max(0.0, state.cusum + (state.baseline - state.ewma) - MOOD_STATE_CUSUM_SLACK)
+        state.baseline += max(MOOD_STATE_BASELINE_ALPHA, 1.0 / n) * (x - state.baseline)
+    state.entries += 1
+    state.high_bits = ((state.high_bits << 1) | (risk == "HIGH")) & _WINDOW_MASK
+    state.medium_bits = ((state.medium_bits << 1) | (risk == "MEDIUM")) & _WINDOW_MASK
+    state.last_mood_id = mood_id
+    state.last_mood_at = when
+    reasons = flag_reasons(state)
+    if reasons and not state.flagged:
+        state.flagged_since = when
+    elif not reasons:
+        state.flagged_since = None
+    state.flagged = bool(reasons)
+    state.reasons = ",".join(reasons) or None
+
+def flag_reasons(state: MoodState) -> List[str]:
+    high = state.high_bits.bit_count()
+    reasons = []
+    if state.entries >= MOOD_STATE_WARMUP and state.cusum > MOOD_STATE_CUSUM_LIMIT:
+        reasons.append("cusum")
+    if state.ewma <= MOOD_STATE_EWMA_FLOOR:
+        reasons.append("ewma")
+    if high >= MOOD_STATE_HIGH_LIMIT:
+        reasons.append("high_risk")
+    if high + state.medium_bits.bit_count() >= MOOD_STATE_ELEVATED_LIMIT:
+        reasons.append("elevated_risk")
+    return reasons
+
+def state_payload(state: Optional[MoodState]) -> Optional[dict]:
+    """The API view of a MoodState (None if the user has no moods yet)."""
+    if state is None:
+        return None
+    return {
+        "deteriorating": state.flagged,
+        "reasons": state.reasons.split(",") if state.reasons else [],
+        "since": state.flagged_since,
+        "sentiment_ewma": round(state.ewma, 3),
+        "baseline": round(state.baseline, 3),
+        "cusum": round(state.cusum, 3),
+        "recent_high": state.high_bits.bit_count(),
+        "recent_medium": state.medium_bits.bit_count(),
+        "entries": state.entries,
+    }
+
+
+def _items(moods: Iterable) -> list:
+    out = []
+    for m in moods:
+        get = m.get if isinstance(m, dict) else lambda k, m=m: getattr(m, k)
+        out.append((get("user_id"), get("sentiment"), get("risk"), get("id"), get("date")))
+    return out
+
+def _states_stmt(user_ids):
+    # FOR UPDATE keeps concurrent writers for one user in line on PostgreSQL (SQLite has one writer anyway)
+    return select(MoodState).where(MoodState.user_id.in_(user_ids)).with_for_update()
+
+def _fold(states: dict, items: list):
+    for user_id, sentiment, risk, mood_id, when in items:
+        state = states.get(user_id)
+        if state is None:
+            state = states[user_id] = MoodState(user_id=user_id)
+        step(state, sentiment, risk, mood_id, when)
+
+def apply_mood_states(session, moods: Iterable):
+    """Update the MoodState of each mood's user inside the caller's transaction (no commit); moods in id order."""
+    moods = list(moods)
+    if not moods:
+        return
+    user_ids = sorted({(m["user_id"] if isinstance(m, dict) else m.user_id) for m in moods})
+    # the query flushes pending Mood objects first, so their ids are set below
+    states = {s.user_id: s for s in session.exec(_states_stmt(user_ids)).all()}
+    _fold(states, _items(moods))
+    session.add_all(states.values())
+
+async def apply_mood_states_async(session, moods: Iterable):
+    """apply_mood_states() for an AsyncSession."""
+    moods = list(moods)
+    if not moods:
+        return
+    user_ids = sorted({(m["user_id"] if isinstance(m, dict) else m.user_id) for m in moods})
+    states = {s.user_id: s for s in (await session.exec(_states_stmt(user_ids))).all()}
+    _fold(states, _items(moods))
+    session.add_all(states.values())
+
+def get_mood_state(session, user_id: int) -> Optional[MoodState]:
+    return session.get(MoodState, user_id)
+
+def deteriorating_stmt(limit: int = 200):
+    """Flagged users with their User row, most recently flagged first."""
+    return (select(MoodState, User).join(User, User.id == MoodState.user_id)
+            .where(MoodState.flagged == True)  # noqa: E712
+            .order_by(MoodState.flagged_since.desc()).limit(limit))
+
+
+class _ReplayState:
+    """A plain stand-in for MoodState while replaying (ORM attribute sets are slow in a hot loop)."""
+    __slots__ = _STATE_FIELDS
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.entries = 0
+        self.ewma = self.baseline = self.cusum = 0.0
+        self.high_bits = self.medium_bits = 0
+        self.last_mood_id = self.flagged_since = self.reasons = self.last_mood_at = None
+        self.flagged = False
+
+def rebuild_mood_states(session, user_id: int = None, commit: bool = True) -> int:
+    """
+    Recompute MoodState from the raw Mood table in one streaming pass in id
+    order (optionally for a single user). Memory is one small state per user.
+    Returns the number of states written.
+    """
+    clear = delete(MoodState)
+    source = select(Mood.id, Mood.user_id, Mood.sentiment, Mood.risk, Mood.date).order_by(Mood.id)
+    if user_id is not None:
+        clear = clear.where(MoodState.user_id == user_id)
+        source = source.where(Mood.user_id == user_id)
+    session.exec(clear)
+    states = {}
+    for mood_id, uid, sentiment, risk, when in session.execute(source.execution_options(yield_per=REBUILD_CHUNK)):
+        state = states.get(uid)
+        if state is None:
+            state = states[uid] = _ReplayState(uid)
+        step(state, sentiment, risk, mood_id, when)
+    rows = [{f: getattr(s, f) for f in _STATE_FIELDS} for s in states.values()]
+    for start in range(0, len(rows), REBUILD_CHUNK):
+        session.execute(insert(MoodState), rows[start:start + REBUILD_CHUNK])
+    if commit:
+        session.commit()
+    return len(rows)
@@ -0,0 +1,103 @@
+# backend/src/pagination.py
+"""
+Keyset (cursor) pagination on (timestamp, id).
+
+A page is fetched with `WHERE (ts, id) < (:ts, :id) ORDER BY ts DESC, id DESC
+LIMIT n+1` (or the ascending mirror image), which the (owner, ts) composite
+indexes answer with a range scan. So page 1000 costs the same as page 1,
+unlike OFFSET.
+
+Cursors are opaque to clients (urlsafe base64 of a small JSON object) and
+carry the kind of list they belong to, so a mood cursor can't be replayed
+against bookings. Routes return the page items as the body, as before, and
+the cursors in the X-Next-Cursor / X-Prev-Cursor headers.
+"""
+import base64
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import tuple_ # type: ignore
+
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class Page:
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+    def headers(self) -> dict:
+        out = {}
+        if self.next_cursor:
+            out["X-Next-Cursor"] = self.next_cursor
+        if self.prev_cursor:
+            out["X-Prev-Cursor"] = self.prev_cursor
+        return out
+
+
+def encode_cursor(kind: str, ts: datetime, row_id: int, direction: str) -> str:
+    raw = json.dumps({"k": kind, "t": ts.isoformat(), "i": row_id, "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(kind: str, cursor: str) -> Tuple[datetime, int, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if data["k"] != kind or data["d"] not in ("next", "prev"):
+            raise ValueError
+        return datetime.fromisoformat(data["t"]), int(data["i"]), data["d"]
+    except Exception:
+        raise InvalidCursor("Invalid or expired cursor")
+
+def keyset_query(stmt, kind: str, ts_col, id_col, limit: int, cursor: Optional[str] = None,
+                 descending: bool = True) -> Tuple[Any, Callable[[List[Any]], Page]]:
+    """
+    Apply keyset pagination to `stmt` (which must not be ordered or limited).
+    Returns (paged statement, finish) where finish(rows) turns the fetched
+    rows into a Page. Rows must expose the ts/id columns as attributes.
+    Raises InvalidCursor for a malformed cursor.
+    """
+    limit = max(1, min(int(limit), PAGE_SIZE_MAX))
+    direction = "next"
+    if cursor:
+        ts, row_id, direction = decode_cursor(kind, cursor)
+        key = tuple_(ts_col, id_col)
+        # "next" continues in display order, "prev" walks back towards the start
+        forward = direction == "next"
+        if descending == forward:
+            stmt = stmt.where(key < tuple_(ts, row_id))
+        else:
+            stmt = stmt.where(key > tuple_(ts, row_id))
+    # prev pages are fetched in reverse and flipped back afterwards
+    fetch_desc = descending if direction == "next" else not descending
+    order = (ts_col.desc(), id_col.desc()) if fetch_desc else (ts_col.asc(), id_col.asc())
+    stmt = stmt.order_by(*order).limit(limit + 1)
+
+    ts_name, id_name = ts_col.key, id_col.key
+
+    def finish(rows: List[Any]) -> Page:
+        rows = list(rows)
+        more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == "prev":
+            rows.reverse()
+        page = Page(items=rows)
+        if rows:
+            first, last = rows[0], rows[-1]
+            # going forward there is a next page if we over-fetched; after a prev step there always is
+            if (direction == "next" and more) or direction == "prev":
+                page.next_cursor = encode_cursor(kind, getattr(last, ts_name), getattr(last, id_name), "next")
+            # a prev page exists after any cursor step forward, or if the prev fetch over-fetched
+            if (direction == "next" and cursor) or (direction == "prev" and more):
+                page.prev_cursor = encode_cursor(kind, getattr(first, ts_name), getattr(first, id_name), "prev")
+        return page
+
+    return stmt, finish
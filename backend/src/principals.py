@@ -0,0 +1,169 @@
+# backend/src/principals.py
+"""
+In-process cache of authenticated principals (id, name, email, role).
+
+get_current_user used to load the User row on every request just to learn
+the caller's id and role. Resolved principals are now kept here for
+PRINCIPAL_CACHE_TTL_S seconds (LRU-bounded by PRINCIPAL_CACHE_MAX_ENTRIES).
+invalidate(user_id) drops a user's entry and marks tokens issued before that
+moment as stale, so their embedded claims are not trusted again; a lookup
+that read the User before the invalidation is not cached when it finishes.
+
+With AUTH_TOKEN_CLAIMS=1, login also embeds role/name/email claims in the
+token (create_access_token(claims=...)), and a cache miss is filled from them
+without a database lookup. Leave it off when several processes serve the API:
+invalidation here is per process, and claims stay valid until the token expires.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+PRINCIPAL_CACHE = os.getenv("PRINCIPAL_CACHE", "1") not in ("0", "false", "False")
+PRINCIPAL_CACHE_TTL_S = float(os.getenv("PRINCIPAL_CACHE_TTL_S", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+AUTH_TOKEN_CLAIMS = os.getenv("AUTH_TOKEN_CLAIMS", "0") in ("1", "true", "True")
+
+CLAIM_FIELDS = ("role", "name", "email")
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller; has the User attributes the routes use."""
+    id: int
+    name: str
+    email: str
+    role: str
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(id=user.id, name=user.name, email=user.email, role=user.role)
+
+    def claims(self) -> dict:
+        return {"role": self.role, "name": self.name, "email": self.email}
+
+    @classmethod
+    def from_claims(cls, user_id: int, payload: dict) -> Optional["Principal"]:
+        if not all(isinstance(payload.get(k), str) for k in CLAIM_FIELDS):
+            return None
+        return cls(id=user_id, name=payload["name"], email=payload["email"], role=payload["role"])
+
+
+class PrincipalCache:
+    def __init__(self, ttl_s: float = PRINCIPAL_CACHE_TTL_S, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES, enabled: bool = PRINCIPAL_CACHE):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        # user_id -> time of the last invalidation; older tokens' claims are not trusted
+        self._not_before: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.claim_fills = 0
+        self.db_lookups = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires = entry
+            if expires <= now:
+                del self._entries[user_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return principal
+
+    def put(self, principal: Principal, read_at: Optional[float] = None):
+        """
+        Cache `principal`. `read_at` is the time.time() at which its data was
+        read (lookup_started()); if the user was invalidated since, the
+        principal may predate the change and is not stored.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            not_before = self._not_before.get(principal.id)
+            if read_at is not None and not_before is not None and read_at <= not_before:
+                self.stale_puts += 1
+                return
+            self._entries[principal.id] = (principal, time.monotonic() + self.ttl_s)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def from_token(self, user_id: int, payload: dict) -> Optional[Principal]:
+        """Principal built from token claims, if trusted and not issued before an invalidation."""
+        if not AUTH_TOKEN_CLAIMS:
+            return None
+        issued = payload.get("iat")
+        with self._lock:
+            not_before = self._not_before.get(user_id)
+        if not_before is not None and (not isinstance(issued, (int, float)) or issued <= not_before):
+            return None
+        principal = Principal.from_claims(user_id, payload)
+        if principal is not None:
+            with self._lock:
+                self.claim_fills += 1
+        return principal
+
+    def lookup_started(self) -> float:
+        """Count a User lookup about to run; pass the returned time to put() as `read_at`."""
+        with self._lock:
+            self.db_lookups += 1
+        return time.time()
+
+    def invalidate(self, user_id: int):
+        """Drop a user's cached principal (call on delete or role/profile change)."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._not_before[user_id] = time.time()
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "claim_fills": self.claim_fills,
+                "db_lookups": self.db_lookups,
+                # every cache hit or claim fill is a user query that did not run
+                "db_lookups_saved": self.hits + self.claim_fills,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+            }
+
+
+principal_cache = PrincipalCache()
+
+def invalidate_principal(user_id: int):
+    principal_cache.invalidate(user_id)
@@ -1,11 +1,15 @@
 # backend/src/routes/account.py
 from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel
-from sqlmodel import Session, delete # type: ignore
+from sqlmodel import Session, delete, select # type: ignore
 from ..database import get_session
-from ..routes.auth import get_current_user
-from ..auth_utils import verify_password
-from ..models import User, Mood, ChatMessage, Booking, Session as SessionModel
+from ..routes.auth import get_current_user, check_password
+from ..principals import invalidate_principal
+from ..scheduler import scheduler
+from ..user_context import context_cache
+from ..data_versions import bump
+from ..cohort import cohort_cache
+from ..models import User, Mood, MoodDaily, MoodState, ChatMessage, Booking, Session as SessionModel
 
 router = APIRouter(prefix="/api/account", tags=["account"])
 
@@ -15,10 +19,21 @@ class DeleteBody(BaseModel):
 @router.delete("", status_code=204)
 def delete_account(payload: DeleteBody, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
     user = session.get(User, current_user.id)
-    if not verify_password(payload.password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    if not check_password(session, user, payload.password):
         raise HTTPException(status_code=401, detail="Invalid password")
 
+    # everyone who shared a booking or session with them sees it disappear from their lists
+    for model, scope in ((Booking, "bookings"), (SessionModel, "sessions")):
+        rows = session.exec(select(model.patient_id, model.therapist_id)
+                            .where((model.patient_id == user.id) | (model.therapist_id == user.id)).distinct()).all()
+        bump(session, {uid for row in rows for uid in row} | {user.id}, scope)
+    bump(session, [user.id], "mood")
+
     session.exec(delete(Mood).where(Mood.user_id == user.id))
+    session.exec(delete(MoodDaily).where(MoodDaily.user_id == user.id))
+    session.exec(delete(MoodState).where(MoodState.user_id == user.id))
     session.exec(delete(ChatMessage).where(ChatMessage.user_id == user.id))
     session.exec(delete(Booking).where(Booking.patient_id == user.id))
     session.exec(delete(Booking).where(Booking.therapist_id == user.id))
@@ -26,4 +41,9 @@ def delete_account(payload: DeleteBody, current_user = Depends(get_current_user)
     session.exec(delete(SessionModel).where(SessionModel.therapist_id == user.id))
     session.exec(delete(User).where(User.id == user.id))
     session.commit()
+    invalidate_principal(user.id)
+    context_cache.invalidate(user.id)
+    cohort_cache.invalidate_user(user.id)
+    # their bookings may sit in any therapist's calendar
+    scheduler.forget()
     return Response(status_code=204)
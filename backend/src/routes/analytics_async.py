@@ -0,0 +1,21 @@
+# backend/src/routes/analytics_async.py
+"""/api/analytics on the async database path (served instead of routes/analytics.py when DB_ASYNC=1)."""
+from fastapi import APIRouter, Depends, Query, Request, Response
+from ..database import get_async_read_session
+from ..routes.auth import get_current_user_async
+from ..crud_mood import chart_buckets, daily_rollups_async
+from ..data_versions import get_version_async, make_etag, not_modified
+from .analytics import chart_window
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+@router.get("/chart-data")
+async def chart_data(request: Request, response: Response, days: int = Query(7, ge=1, le=365, alias="range"),
+                     current_user = Depends(get_current_user_async), session = Depends(get_async_read_session)):
+    version = await get_version_async(session, current_user.id, "mood")
+    cached = not_modified(request, response, make_etag(request, current_user.id, current_user.id, "mood", version, daily=True))
+    if cached:
+        return cached
+
+    first, last = chart_window(days)
+    return chart_buckets(await daily_rollups_async(session, current_user.id, first, last), first, days)
@@ -1,14 +1,63 @@
 # backend/src/routes/audit.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select # type: ignore
-from ..database import get_session
+from typing import Optional
+from ..database import get_read_session, read_engine
 from ..deps import require_role
 from ..models import Mood
+from ..alerts import alert_bus, alert_payload, high_risk_after_stmt, stream_alerts, ALERT_REPLAY_MAX
+from ..mood_state import deteriorating_stmt, state_payload
+from .auth import get_current_user
 
 router = APIRouter(prefix="/api/audit", tags=["audit"])
 
 @router.get("/high-risk")
-def high_risk_logs(current_user = Depends(require_role("therapist")), session: Session = Depends(get_session)):
-    stmt = select(Mood).where(Mood.risk == "HIGH").order_by(Mood.date.desc()).limit(200)
-    rows = session.exec(stmt).all()
-    return [{"id": r.id, "user_id": r.user_id, "date": r.date.isoformat(), "text": r.text, "sentiment": r.sentiment, "risk": r.risk} for r in rows]
+def high_risk_logs(after_id: Optional[int] = Query(None, ge=0), current_user = Depends(require_role("therapist")),
+                   session: Session = Depends(get_read_session)):
+    """
+    Newest HIGH-risk entries. With ?after_id= only the ones newer than that
+    id are returned (up to ALERT_REPLAY_MAX), so a poller doesn't refetch rows
+    it already has.
+    """
+    if after_id is None:
+        stmt = select(Mood).where(Mood.risk == "HIGH").order_by(Mood.date.desc()).limit(200)
+    else:
+        stmt = high_risk_after_stmt(after_id, ALERT_REPLAY_MAX)
+    return [alert_payload(r) for r in session.exec(stmt).all()]
+
+@router.get("/deteriorating")
+def deteriorating_patients(limit: int = Query(200, ge=1, le=1000), current_user = Depends(require_role("therapist")),
+                           session: Session = Depends(get_read_session)):
+    """Patients currently flagged by the deterioration detector, most recently flagged first."""
+    return [{"user_id": user.id, "name": user.name, **state_payload(state)}
+            for state, user in session.exec(deteriorating_stmt(limit)).all()]
+
+def _stream_therapist(authorization: Optional[str] = Header(None), token: Optional[str] = None):
+    # EventSource can't set headers, so the token may come as ?token= instead
+    if not authorization and token:
+        authorization = f"Bearer {token}"
+    # a get_read_session dependency would keep its pooled connection until the stream ends
+    with Session(read_engine) as session:
+        user = get_current_user(authorization, session)
+    if user.role != "therapist":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return user
+
+@router.get("/high-risk/stream")
+async def high_risk_stream(last_event_id: Optional[int] = Header(None, ge=0), since: Optional[int] = Query(None, ge=0),
+                           current_user = Depends(_stream_therapist)):
+    """
+    Server-Sent Events: one `high-risk` event per HIGH-risk mood as it is
+    saved (event id = mood id, data = a /high-risk row). Reconnects resume
+    from the Last-Event-ID header; ?since=<id> does the same for the first
+    connection. Comment lines are sent as keep-alives.
+    """
+    if alert_bus.full():
+        raise HTTPException(status_code=503, detail="Too many alert streams", headers={"Retry-After": "5"})
+    resume = last_event_id if last_event_id is not None else since
+    return StreamingResponse(
+        stream_alerts(resume),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -2,9 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status, Header
 from pydantic import BaseModel, EmailStr
 from sqlmodel import Session # type: ignore
 from typing import Optional
-from ..database import get_session
-from ..crud import get_user_by_email, create_user, get_user_by_id
-from ..auth_utils import get_password_hash, verify_password, create_access_token, decode_access_token
+import time
+from ..database import get_session, get_read_session, get_async_read_session
+from ..crud import get_user_by_email, create_user, get_user_by_id, get_user_by_id_async
+from ..auth_utils import get_password_hash_pooled, verify_and_update_pooled, create_access_token, decode_access_token
+from ..hashing import HashingBusy
+from ..principals import AUTH_TOKEN_CLAIMS, Principal, principal_cache
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -22,24 +25,49 @@ class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
 
+def hashing_busy() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many requests, please retry shortly", headers={"Retry-After": "1"})
+
+def check_password(session, user, password: str) -> bool:
+    """
+    Verify `password` on the hashing pool (this threadpool thread only waits
+    for it). If the stored hash uses an outdated work factor it is replaced
+    (committed) with a fresh one.
+    """
+    try:
+        ok, new_hash = verify_and_update_pooled(password, user.hashed_password)
+    except HashingBusy:
+        raise hashing_busy()
+    if ok and new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        session.commit()
+    return ok
+
 @router.post("/register")
 def register(data: RegisterRequest, session: Session = Depends(get_session)):
     existing = get_user_by_email(session, data.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed = get_password_hash(data.password)
+    try:
+        hashed = get_password_hash_pooled(data.password)
+    except HashingBusy:
+        raise hashing_busy()
     user = create_user(session, data.name, data.email, hashed, data.role)
     return {"id": user.id, "name": user.name, "email": user.email, "role": user.role}
 
 @router.post("/login", response_model=TokenResponse)
 def login(data: LoginRequest, session: Session = Depends(get_session)):
+    read_at = time.time()
     user = get_user_by_email(session, data.email)
-    if not user or not verify_password(data.password, user.hashed_password):
+    if not user or not check_password(session, user, data.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    token = create_access_token(subject=str(user.id))
+    principal = Principal.from_user(user)
+    principal_cache.put(principal, read_at=read_at)
+    token = create_access_token(subject=str(user.id), claims=principal.claims() if AUTH_TOKEN_CLAIMS else None)
     return {"access_token": token}
 
-def get_current_user(authorization: Optional[str] = Header(None), session: Session = Depends(get_session)):
+def _token_payload(authorization: Optional[str]) -> tuple:
     if not authorization:
         raise HTTPException(status_code=401, detail="Missing authorization header")
     if not authorization.startswith("Bearer "):
@@ -47,13 +75,64 @@ def get_current_user(authorization: Optional[str] = Header(None), session: Sessi
     token = authorization.split(" ")[1]
     try:
         payload = decode_access_token(token)
-        user_id = int(payload.get("sub"))
+        return int(payload.get("sub")), payload
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = get_user_by_id(session, user_id)
+
+def _cached_principal(user_id: int, payload: dict) -> Optional[Principal]:
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        principal = principal_cache.from_token(user_id, payload)
+        if principal is not None:
+            # checked against invalidations again under the cache lock
+            principal_cache.put(principal, read_at=payload.get("iat"))
+    return principal
+
+def _resolved(user, read_at: float) -> Principal:
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(principal, read_at=read_at)
+    return principal
+
+def get_current_user(authorization: Optional[str] = Header(None), session: Session = Depends(get_read_session)):
+    """
+    The caller as a Principal (id, name, email, role). Served from the
+    principal cache when possible; otherwise one User lookup.
+    """
+    user_id, payload = _token_payload(authorization)
+    principal = _cached_principal(user_id, payload)
+    if principal is not None:
+        return principal
+    read_at = principal_cache.lookup_started()
+    return _resolved(get_user_by_id(session, user_id), read_at)
+
+async def get_current_user_async(authorization: Optional[str] = Header(None), session = Depends(get_async_read_session)):
+    """get_current_user() for async routes (a sync dependency would take a threadpool thread)."""
+    user_id, payload = _token_payload(authorization)
+    principal = _cached_principal(user_id, payload)
+    if principal is not None:
+        return principal
+    read_at = principal_cache.lookup_started()
+    return _resolved(await get_user_by_id_async(session, user_id), read_at)
+
+def get_optional_user(authorization: Optional[str] = Header(None), session: Session = Depends(get_read_session)) -> Optional[Principal]:
+    """The caller if a valid bearer token was sent, else None (for routes that also serve anonymous users)."""
+    if not authorization:
+        return None
+    try:
+        return get_current_user(authorization, session)
+    except HTTPException:
+        return None
+
+async def get_optional_user_async(authorization: Optional[str] = Header(None), session = Depends(get_async_read_session)) -> Optional[Principal]:
+    """get_optional_user() for async routes."""
+    if not authorization:
+        return None
+    try:
+        return await get_current_user_async(authorization, session)
+    except HTTPException:
+        return None
 
 @router.get("/me")
 def me(current_user = Depends(get_current_user)):
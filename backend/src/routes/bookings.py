@@ -1,11 +1,14 @@
 # backend/src/routes/bookings.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 from sqlmodel import Session # type: ignore
-from ..database import get_session
-from ..crud_bookings import create_booking, list_bookings, get_booking, update_booking, complete_booking
+from ..database import get_session, get_read_session
+from ..crud_bookings import create_booking, page_bookings, get_booking, update_booking, complete_booking
+from ..pagination import PAGE_SIZE_MAX, InvalidCursor
+from ..data_versions import get_version, make_etag, not_modified
+from ..scheduler import BookingConflict
 from ..routes.auth import get_current_user
 from ..models import Booking  # optional, for typing/clarity
 
@@ -22,6 +25,14 @@ class BookingPatch(BaseModel):
     status: Optional[str] = None
     notes: Optional[str] = None
 
+class SessionCompletionIn(BaseModel):
+    session_notes: Optional[str] = None
+    session_outcome: Optional[str] = None
+
+def conflict_error(e: BookingConflict) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT,
+                         detail={"message": str(e), "therapist_id": e.therapist_id, "conflicting_booking_id": e.booking_id})
+
 def _parse_datetime(dt_str: str) -> datetime:
     try:
         # Try parsing ISO format
@@ -29,93 +40,109 @@ def _parse_datetime(dt_str: str) -> datetime:
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid datetime format: {dt_str}. Use ISO format like 2026-01-05T10:30:00")
 
-@router.post("", response_model=dict)
-def post_booking(payload: BookingIn, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+def booking_therapist(payload: BookingIn, current_user) -> int:
     """
-    Create a booking.
+    therapist_id for a new booking:
     - If the caller is a therapist, therapist_id defaults to current_user.id when not provided.
     - If the caller is a patient, therapist_id must be provided (booking request).
     """
-    # Resolve therapist_id
     if current_user.role == "therapist":
-        therapist_id = payload.therapist_id or current_user.id
-    elif current_user.role == "patient":
-        therapist_id = payload.therapist_id
-        if not therapist_id:
+        return payload.therapist_id or current_user.id
+    if current_user.role == "patient":
+        if not payload.therapist_id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="therapist_id is required when a patient requests a booking")
-    else:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only patients and therapists may create bookings")
+        return payload.therapist_id
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only patients and therapists may create bookings")
 
-    # Validate datetime
-    dt = _parse_datetime(payload.datetime)
+def booking_filters(current_user, therapist_id: Optional[int], patient_id: Optional[int]) -> tuple:
+    """(filters, owner): what a caller may list, and whose "bookings" version the listing depends on."""
+    if current_user.role == "therapist":
+        tid = therapist_id or current_user.id
+        return {"therapist_id": tid, "patient_id": patient_id}, tid
+    if current_user.role == "patient":
+        # force patient_id to current user
+        return {"patient_id": current_user.id}, current_user.id
+    raise HTTPException(status_code=403, detail="Not authorized")
+
+def check_owner(b, current_user, action: str):
+    if not b:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
+    if current_user.role != "therapist" or b.therapist_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Only the owning therapist may {action} this booking")
+
+def booking_patch(payload: BookingPatch) -> dict:
+    patch = {}
+    if payload.datetime is not None:
+        patch["datetime"] = _parse_datetime(payload.datetime)
+    if payload.status is not None:
+        patch["status"] = payload.status
+    if payload.notes is not None:
+        patch["notes"] = payload.notes
+    return patch
 
+@router.post("", response_model=dict)
+def post_booking(payload: BookingIn, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+    """
+    Create a booking (409 if the therapist already has one overlapping that slot).
+    - If the caller is a therapist, therapist_id defaults to current_user.id when not provided.
+    - If the caller is a patient, therapist_id must be provided (booking request).
+    """
+    therapist_id = booking_therapist(payload, current_user)
+    dt = _parse_datetime(payload.datetime)
     try:
         b = create_booking(session, patient_id=payload.patient_id, therapist_id=therapist_id, dt=dt, notes=payload.notes)
         # return a plain dict so FastAPI's response_model=dict validation succeeds
         return b.dict()
+    except BookingConflict as e:
+        raise conflict_error(e)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not create booking: {str(e)}")
 
 @router.get("", response_model=List[dict])
-def get_bookings(therapist_id: Optional[int] = None, patient_id: Optional[int] = None, status: Optional[str] = None, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+def get_bookings(request: Request, response: Response, therapist_id: Optional[int] = None, patient_id: Optional[int] = None, status: Optional[str] = None,
+                 limit: int = Query(200, ge=1, le=PAGE_SIZE_MAX), cursor: Optional[str] = None,
+                 current_user = Depends(get_current_user), session: Session = Depends(get_read_session)):
     """
     - Therapists: may query their own bookings (therapist_id can be omitted).
     - Patients: may only query their own bookings (patient_id ignored if caller is a patient).
+    Earliest first, `limit` per page; follow X-Next-Cursor / X-Prev-Cursor with ?cursor=.
+    Conditional on the listed therapist's (or patient's) "bookings" data version.
     """
-    if current_user.role == "therapist":
-        tid = therapist_id or current_user.id
-        rows = list_bookings(session, therapist_id=tid, patient_id=patient_id, status=status)
-        return [r.dict() for r in rows]
-    elif current_user.role == "patient":
-        # force patient_id to current user
-        rows = list_bookings(session, patient_id=current_user.id, status=status)
-        return [r.dict() for r in rows]
-    else:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    filters, owner = booking_filters(current_user, therapist_id, patient_id)
+    version = get_version(session, owner, "bookings")
+    cached = not_modified(request, response, make_etag(request, current_user.id, owner, "bookings", version))
+    if cached:
+        return cached
+    try:
+        page = page_bookings(session, status=status, limit=limit, cursor=cursor, **filters)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(page.headers())
+    return [r.dict() for r in page.items]
 
 @router.patch("/{booking_id}", response_model=dict)
 def patch_booking(booking_id: int, payload: BookingPatch, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
     """
-    Only a therapist who owns the booking may update it.
+    Only a therapist who owns the booking may update it. Moving it onto
+    another booking's slot is a 409.
     """
-    b = get_booking(session, booking_id)
-    if not b:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
-
-    if current_user.role != "therapist" or b.therapist_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the owning therapist may modify this booking")
-
-    patch = {}
-    if payload.datetime is not None:
-        patch["datetime"] = _parse_datetime(payload.datetime)
-    if payload.status is not None:
-        patch["status"] = payload.status
-    if payload.notes is not None:
-        patch["notes"] = payload.notes
-
+    check_owner(get_booking(session, booking_id), current_user, "modify")
+    patch = booking_patch(payload)
     try:
         updated = update_booking(session, booking_id, **patch)
         return updated.dict()
+    except BookingConflict as e:
+        raise conflict_error(e)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not update booking: {str(e)}")
 
-class SessionCompletionIn(BaseModel):
-    session_notes: Optional[str] = None
-    session_outcome: Optional[str] = None
-
 @router.post("/{booking_id}/complete", response_model=dict)
 def complete_session(booking_id: int, payload: SessionCompletionIn, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
     """
     Mark a booking as completed and record session details.
     Only the therapist who owns the booking may complete it.
     """
-    b = get_booking(session, booking_id)
-    if not b:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
-
-    if current_user.role != "therapist" or b.therapist_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only the owning therapist may complete this booking")
-
+    check_owner(get_booking(session, booking_id), current_user, "complete")
     try:
         completed = complete_booking(session, booking_id, payload.session_notes, payload.session_outcome)
         return completed.dict()
@@ -0,0 +1,63 @@
+# backend/src/routes/bookings_async.py
+"""/api/bookings on the async database path (served instead of routes/bookings.py when DB_ASYNC=1)."""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import Optional, List
+from ..database import get_async_session, get_async_read_session
+from ..crud_bookings import create_booking_async, page_bookings_async, get_booking_async, update_booking_async, complete_booking_async
+from ..pagination import PAGE_SIZE_MAX, InvalidCursor
+from ..data_versions import get_version_async, make_etag, not_modified
+from ..scheduler import BookingConflict
+from ..routes.auth import get_current_user_async
+from .bookings import (BookingIn, BookingPatch, SessionCompletionIn, conflict_error, _parse_datetime,
+                       booking_therapist, booking_filters, check_owner, booking_patch)
+
+router = APIRouter(prefix="/api/bookings", tags=["bookings"])
+
+@router.post("", response_model=dict)
+async def post_booking(payload: BookingIn, current_user = Depends(get_current_user_async), session = Depends(get_async_session)):
+    therapist_id = booking_therapist(payload, current_user)
+    dt = _parse_datetime(payload.datetime)
+    try:
+        b = await create_booking_async(session, patient_id=payload.patient_id, therapist_id=therapist_id, dt=dt, notes=payload.notes)
+        return b.dict()
+    except BookingConflict as e:
+        raise conflict_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not create booking: {str(e)}")
+
+@router.get("", response_model=List[dict])
+async def get_bookings(request: Request, response: Response, therapist_id: Optional[int] = None, patient_id: Optional[int] = None, status: Optional[str] = None,
+                       limit: int = Query(200, ge=1, le=PAGE_SIZE_MAX), cursor: Optional[str] = None,
+                       current_user = Depends(get_current_user_async), session = Depends(get_async_read_session)):
+    filters, owner = booking_filters(current_user, therapist_id, patient_id)
+    version = await get_version_async(session, owner, "bookings")
+    cached = not_modified(request, response, make_etag(request, current_user.id, owner, "bookings", version))
+    if cached:
+        return cached
+    try:
+        page = await page_bookings_async(session, status=status, limit=limit, cursor=cursor, **filters)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(page.headers())
+    return [r.dict() for r in page.items]
+
+@router.patch("/{booking_id}", response_model=dict)
+async def patch_booking(booking_id: int, payload: BookingPatch, current_user = Depends(get_current_user_async), session = Depends(get_async_session)):
+    check_owner(await get_booking_async(session, booking_id), current_user, "modify")
+    patch = booking_patch(payload)
+    try:
+        updated = await update_booking_async(session, booking_id, **patch)
+        return updated.dict()
+    except BookingConflict as e:
+        raise conflict_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not update booking: {str(e)}")
+
+@router.post("/{booking_id}/complete", response_model=dict)
+async def complete_session(booking_id: int, payload: SessionCompletionIn, current_user = Depends(get_current_user_async), session = Depends(get_async_session)):
+    check_owner(await get_booking_async(session, booking_id), current_user, "complete")
+    try:
+        completed = await complete_booking_async(session, booking_id, payload.session_notes, payload.session_outcome)
+        return completed.dict()
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not complete booking: {str(e)}")
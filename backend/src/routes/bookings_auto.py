@@ -1,38 +1,46 @@
 # backend/src/routes/bookings_auto.py
+import os
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select # type: ignore
-from datetime import datetime, timedelta
+from sqlmodel import Session # type: ignore
 
 from ..database import get_session
 from ..routes.auth import get_current_user
-from ..models import User
 from ..crud_bookings import create_booking
+from ..scheduler import BookingConflict, scheduler
+from .bookings import conflict_error
 
 router = APIRouter(prefix="/api/bookings", tags=["bookings_auto"])
 
+# slots tried when another worker has taken the earliest one meanwhile
+AUTO_BOOK_ATTEMPTS = int(os.getenv("AUTO_BOOK_ATTEMPTS", "3"))
+
 @router.post("/auto", response_model=dict)
 def auto_book(current_user = Depends(get_current_user), session: Session = Depends(get_session)):
     """
-    Auto-create a booking for the calling patient by assigning the first available therapist.
+    Auto-create a booking for the calling patient with the therapist who has
+    the earliest free slot (from now + SCHEDULER_LEAD_MINUTES), preferring the
+    least-booked therapist when several are free then.
     - Endpoint: POST /api/bookings/auto
     - Caller must be authenticated (patient allowed)
+    - 409 if the slot is still taken after AUTO_BOOK_ATTEMPTS tries
     """
     # Only allow patients to call this (or allow therapists to schedule on behalf later)
     if current_user.role != "patient":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only patients may request an automatic booking via this endpoint")
 
-    # find the first therapist
-    stmt = select(User).where(User.role == "therapist").limit(1)
-    res = session.exec(stmt).first()
-    if not res:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No therapists available")
-
-    therapist = res
-    # schedule time: now + 1 hour (server UTC)
-    dt = datetime.utcnow() + timedelta(hours=1)
-
-    try:
-        b = create_booking(session, patient_id=current_user.id, therapist_id=therapist.id, dt=dt, notes="Auto-assigned due to high-risk mood entry")
-        return b.dict()
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to create booking: {str(e)}")
+    conflict = None
+    for _ in range(max(AUTO_BOOK_ATTEMPTS, 1)):
+        # reserves the slot, so a concurrent auto-booking in this process can't take it too
+        hold = scheduler.hold_earliest()
+        if hold is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No therapists available")
+        try:
+            b = create_booking(session, patient_id=current_user.id, therapist_id=hold.therapist_id, dt=hold.datetime,
+                               notes="Auto-assigned due to high-risk mood entry", hold=hold)
+            return b.dict()
+        except BookingConflict as e:
+            # another worker booked the slot; re-read that calendar so the next hold skips it
+            session.rollback()
+            scheduler.load(e.therapist_id)
+            conflict = e
+    raise conflict_error(conflict)
@@ -1,12 +1,15 @@
 # backend/src/routes/chat.py
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, Request, Depends, HTTPException, Query, Response
 from pydantic import BaseModel
 from typing import Optional
 from sqlmodel import Session # type: ignore
 
-from ..database import get_session
-from ..crud_chat import create_chat_message
+from ..database import get_session, get_read_session
+from ..crud_chat import create_chat_message, page_history
+from ..pagination import PAGE_SIZE_MAX, InvalidCursor
 from ..ml.retrieval import get_best_response
+from ..routes.auth import get_optional_user, get_current_user
+from ..write_queue import WRITE_QUEUE, enqueue_chat_message
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
@@ -16,8 +19,49 @@ class ChatIn(BaseModel):
     text: Optional[str] = None
     context: Optional[str] = None
 
+EMPTY_REPLY = {"reply": "Please send a non-empty message.", "response_id": "empty_input"}
+
+def queue_message(user_id: Optional[int], role: str, text: str) -> bool:
+    """Hand one turn to the write queue; False when it has to be written in the request instead."""
+    if user_id is None:
+        # anonymous messages aren't stored: ChatMessage.user_id is required
+        return True
+    if WRITE_QUEUE:
+        # group-committed in the background; the client never needs the id
+        enqueue_chat_message(user_id, role, text).add_done_callback(_log_failed_save)
+        return True
+    return False
+
+def _log_failed_save(fut):
+    if fut.exception() is not None:
+        print(f"Warning: could not save chat message: {fut.exception()}")
+
+def _save_message(session, user_id: Optional[int], role: str, text: str):
+    """Persist one turn (non-fatal)."""
+    if queue_message(user_id, role, text):
+        return
+    try:
+        create_chat_message(session, user_id=user_id, role=role, text=text)
+    except Exception:
+        session.rollback()
+
+def best_reply(incoming: str) -> tuple:
+    """(reply, response_id) for a message: the best canned response, or an empathetic fallback."""
+    reply_text, response_id, score = get_best_response(incoming or "")
+    if score < 0.05:
+        reply_text = "I hear you. Can you say a little more about how that felt?"
+        response_id = "fallback_emp"
+    return reply_text, response_id
+
+def history_items(page) -> list:
+    # pages come newest first; display them in chronological order
+    return [
+        {"id": m.id, "role": m.sender, "text": m.text, "ts": m.created_at.isoformat()}
+        for m in reversed(page.items)
+    ]
+
 @router.post("")
-def post_chat(payload: ChatIn, request: Request, session: Session = Depends(get_session)):
+def post_chat(payload: ChatIn, request: Request, current_user = Depends(get_optional_user), session: Session = Depends(get_session)):
     """
     Accept chat messages from authenticated or anonymous users.
     Payload accepts either {"message": "..."} or {"text": "..."} for compatibility.
@@ -26,27 +70,33 @@ def post_chat(payload: ChatIn, request: Request, session: Session = Depends(get_
     incoming = (payload.message or payload.text or "").strip()
     if not incoming:
         # return a 400-like response for empty payload
-        return {"reply": "Please send a non-empty message.", "response_id": "empty_input"}
+        return dict(EMPTY_REPLY)
 
-    user_id = None  # anonymous by default; you can populate from token if you wire it later
+    # anonymous unless a valid bearer token was sent
+    user_id = current_user.id if current_user is not None else None
 
     # save user's message (non-fatal)
-    try:
-        create_chat_message(session, user_id=user_id, role="user", text=incoming)
-    except Exception:
-        pass
+    _save_message(session, user_id, "user", incoming)
 
     # generate canned reply
-    reply_text, response_id, score = get_best_response(incoming or "")
-
-    if score < 0.05:
-        reply_text = "I hear you. Can you say a little more about how that felt?"
-        response_id = "fallback_emp"
+    reply_text, response_id = best_reply(incoming)
 
     # Save bot reply (non-fatal)
-    try:
-        create_chat_message(session, user_id=user_id, role="bot", text=reply_text)
-    except Exception:
-        pass
+    _save_message(session, user_id, "bot", reply_text)
 
     return {"reply": reply_text, "response_id": response_id}
+
+@router.get("/history")
+def get_history(response: Response, limit: int = Query(50, ge=1, le=PAGE_SIZE_MAX), cursor: Optional[str] = None,
+                current_user = Depends(get_current_user), session: Session = Depends(get_read_session)):
+    """
+    The caller's conversation. The first page is the most recent `limit`
+    messages; X-Next-Cursor loads earlier ones ("load more"), X-Prev-Cursor
+    newer ones. Messages within a page are in chronological order for display.
+    """
+    try:
+        page = page_history(session, current_user.id, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(page.headers())
+    return history_items(page)
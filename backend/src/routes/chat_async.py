@@ -0,0 +1,43 @@
+# backend/src/routes/chat_async.py
+"""/api/chat on the async database path (served instead of routes/chat.py when DB_ASYNC=1)."""
+from fastapi import APIRouter, Request, Depends, HTTPException, Query, Response
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+
+from ..database import get_async_session, get_async_read_session
+from ..crud_chat import create_chat_message_async, page_history_async
+from ..pagination import PAGE_SIZE_MAX, InvalidCursor
+from ..routes.auth import get_optional_user_async, get_current_user_async
+from .chat import ChatIn, EMPTY_REPLY, queue_message, best_reply, history_items
+
+router = APIRouter(prefix="/api/chat", tags=["chat"])
+
+async def _save_message(session, user_id: Optional[int], role: str, text: str):
+    if queue_message(user_id, role, text):
+        return
+    try:
+        await create_chat_message_async(session, user_id=user_id, role=role, text=text)
+    except Exception:
+        await session.rollback()
+
+@router.post("")
+async def post_chat(payload: ChatIn, request: Request, current_user = Depends(get_optional_user_async), session = Depends(get_async_session)):
+    incoming = (payload.message or payload.text or "").strip()
+    if not incoming:
+        return dict(EMPTY_REPLY)
+    user_id = current_user.id if current_user is not None else None
+    await _save_message(session, user_id, "user", incoming)
+    # retrieval scoring is CPU work; keep it off the event loop like sentiment scoring
+    reply_text, response_id = await run_in_threadpool(best_reply, incoming)
+    await _save_message(session, user_id, "bot", reply_text)
+    return {"reply": reply_text, "response_id": response_id}
+
+@router.get("/history")
+async def get_history(response: Response, limit: int = Query(50, ge=1, le=PAGE_SIZE_MAX), cursor: Optional[str] = None,
+                      current_user = Depends(get_current_user_async), session = Depends(get_async_read_session)):
+    try:
+        page = await page_history_async(session, current_user.id, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(page.headers())
+    return history_items(page)
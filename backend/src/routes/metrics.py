@@ -0,0 +1,52 @@
+# backend/src/routes/metrics.py
+import hmac
+import os
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlmodel import Session # type: ignore
+from typing import Optional
+from ..database import get_read_session
+from ..routes.auth import get_current_user
+from ..ml.sentiment import batcher_stats, model_status
+from ..ml.scoring import cache_stats
+from ..principals import principal_cache
+from ..auth_utils import hashing_pool
+from ..write_queue import write_queue
+from ..alerts import alert_bus
+from ..scheduler import scheduler
+from ..user_context import context_cache
+from ..data_versions import conditional_stats
+from ..cohort import cohort_cache
+
+# Bearer token for scrapers (Authorization: Bearer <METRICS_TOKEN>); unset = therapists only
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+def require_metrics_access(authorization: Optional[str] = Header(None), session: Session = Depends(get_read_session)):
+    """The operator token if one is configured and sent, else a logged-in therapist."""
+    if METRICS_TOKEN and authorization and hmac.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        return None
+    current_user = get_current_user(authorization, session)
+    if current_user.role != "therapist":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    return current_user
+
+@router.get("", dependencies=[Depends(require_metrics_access)])
+def get_metrics():
+    """
+    Operational counters used to tune the service (no patient data).
+    Requires a therapist login or the METRICS_TOKEN operator token.
+    """
+    return {
+        "sentiment_model": model_status(),
+        "sentiment_batcher": batcher_stats(),
+        "score_cache": cache_stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_hashing": hashing_pool().stats(),
+        "write_queue": write_queue.stats(),
+        "alert_stream": alert_bus.stats(),
+        "scheduler": scheduler.stats(),
+        "context_cache": context_cache.stats(),
+        "conditional_get": conditional_stats.stats(),
+        "cohort_cache": cohort_cache.stats(),
+    }
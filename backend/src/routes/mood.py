@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, Field
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Dict, List, Optional
+import os
 from datetime import datetime
 from sqlmodel import Session # type: ignore
-from ..database import get_session
-from ..crud_mood import create_mood, list_moods_for_user, avg_mood_for_user
+from ..database import get_session, get_read_session
+from ..crud_mood import create_mood, bulk_create_moods, page_moods_for_user, avg_mood_for_user
+from ..pagination import PAGE_SIZE_MAX, InvalidCursor
+from ..data_versions import get_version, make_etag, not_modified
 from ..routes.auth import get_current_user
-from ..ml.sentiment import analyze_text
-from ..ml.risk import detect_risk
+from ..ml.scoring import score_text, score_texts
+from ..write_queue import WRITE_QUEUE, WRITE_QUEUE_MOODS, enqueue_mood
 
 router = APIRouter(prefix="/api/mood", tags=["mood"])
 
+# Bulk ingestion limits: entries per request, and entries scored per model call
+MOOD_BULK_MAX_ENTRIES = int(os.getenv("MOOD_BULK_MAX_ENTRIES", "5000"))
+MOOD_BULK_SCORE_CHUNK = int(os.getenv("MOOD_BULK_SCORE_CHUNK", "256"))
+
 class MoodIn(BaseModel):
     text: Optional[str] = None
     date: Optional[datetime] = None
@@ -25,22 +32,95 @@ class MoodOut(BaseModel):
 
 @router.post("", response_model=MoodOut)
 def post_mood(payload: MoodIn, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
-    # run sentiment analysis (compound)
-    scores = analyze_text(payload.text or "")
+    # run sentiment analysis (compound) + risk detection, cached by normalized text
+    scores, risk_level, explanation = score_text(payload.text or "")
     compound = float(scores.get("compound", 0.0))
-    # run risk detection (no mood_value parameter)
-    risk_level, explanation = detect_risk(payload.text or "", compound)
     # create mood entry with sentiment & risk
+    if WRITE_QUEUE and WRITE_QUEUE_MOODS:
+        # shares its commit with concurrent writers; returns once the batch is durable
+        date = payload.date or datetime.utcnow()
+        mood_id = enqueue_mood(current_user.id, payload.text, date, compound, risk_level).result()
+        return {"id": mood_id, "user_id": current_user.id, "text": payload.text, "date": date, "sentiment": compound, "risk": risk_level}
     m = create_mood(session, user_id=current_user.id, text=payload.text, date=payload.date, sentiment=compound, risk=risk_level)
     return m
 
 @router.get("", response_model=list[MoodOut])
-def get_moods(current_user = Depends(get_current_user), session: Session = Depends(get_session)):
-    rows = list_moods_for_user(session, user_id=current_user.id, limit=500)
-    return rows
+def get_moods(request: Request, response: Response, limit: int = Query(500, ge=1, le=PAGE_SIZE_MAX), cursor: Optional[str] = None,
+              current_user = Depends(get_current_user), session: Session = Depends(get_read_session)):
+    """
+    Newest first, `limit` per page; follow X-Next-Cursor / X-Prev-Cursor with ?cursor=.
+    Sends an ETag; If-None-Match with it gets a 304 until the user's moods change.
+    """
+    version = get_version(session, current_user.id, "mood")
+    cached = not_modified(request, response, make_etag(request, current_user.id, current_user.id, "mood", version))
+    if cached:
+        return cached
+    try:
+        page = page_moods_for_user(session, user_id=current_user.id, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(page.headers())
+    return page.items
 
 @router.get("/analytics")
-def get_analytics(current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+def get_analytics(request: Request, response: Response, current_user = Depends(get_current_user), session: Session = Depends(get_read_session)):
+    version = get_version(session, current_user.id, "mood")
+    cached = not_modified(request, response, make_etag(request, current_user.id, current_user.id, "mood", version, daily=True))
+    if cached:
+        return cached
     avg7 = avg_mood_for_user(session, current_user.id, days=7)
     avg30 = avg_mood_for_user(session, current_user.id, days=30)
     return {"avg_7_days": avg7, "avg_30_days": avg30}
+
+class MoodBulkIn(BaseModel):
+    # items are validated one by one so a bad entry doesn't reject the whole sync
+    entries: List[Any]
+
+def validate_bulk(payload: MoodBulkIn) -> tuple:
+    """(results, valid): one result per entry (errors filled in) and the valid (result index, MoodIn) pairs."""
+    if len(payload.entries) > MOOD_BULK_MAX_ENTRIES:
+        raise HTTPException(status_code=413, detail=f"At most {MOOD_BULK_MAX_ENTRIES} entries per request")
+
+    results: List[Dict[str, Any]] = []
+    valid: List[tuple] = []  # (result index, MoodIn)
+    for i, raw in enumerate(payload.entries):
+        client_id = raw.get("client_id") if isinstance(raw, dict) else None
+        result = {"index": i, "client_id": client_id}
+        try:
+            item = MoodIn.model_validate(raw)
+        except ValidationError as e:
+            result.update(status="error", errors=[
+                {"loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors(include_url=False, include_context=False)
+            ])
+        else:
+            valid.append((i, item))
+        results.append(result)
+    return results, valid
+
+def score_chunks(valid: List[tuple]) -> List[List[str]]:
+    """The texts of `valid` in chunks of MOOD_BULK_SCORE_CHUNK (one score_texts call each)."""
+    return [[item.text or "" for _, item in valid[start:start + MOOD_BULK_SCORE_CHUNK]]
+            for start in range(0, len(valid), MOOD_BULK_SCORE_CHUNK)]
+
+def scored_entries(valid: List[tuple], scored: List[tuple]) -> List[dict]:
+    return [{"text": item.text, "date": item.date, "sentiment": float(scores.get("compound", 0.0)), "risk": risk_level}
+            for (_, item), (scores, risk_level, _) in zip(valid, scored)]
+
+def bulk_report(results: List[dict], valid: List[tuple], entries: List[dict], ids: List[int]) -> dict:
+    for (i, _), entry, mood_id in zip(valid, entries, ids):
+        results[i].update(status="created", id=mood_id, sentiment=entry["sentiment"], risk=entry["risk"])
+    return {"received": len(results), "created": len(ids), "failed": len(results) - len(ids), "results": results}
+
+@router.post("/bulk")
+def post_moods_bulk(payload: MoodBulkIn, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+    """
+    Ingest many mood entries at once (e.g. an offline journal sync).
+    Each entry has the POST /api/mood shape plus an optional client_id echoed
+    back. Valid entries are scored in batches and inserted in one transaction;
+    the response has one result per entry, in order, with validation errors
+    for the rejected ones.
+    """
+    results, valid = validate_bulk(payload)
+    entries = scored_entries(valid, [s for texts in score_chunks(valid) for s in score_texts(texts)])
+    ids = bulk_create_moods(session, current_user.id, entries) if entries else []
+    return bulk_report(results, valid, entries, ids)
@@ -0,0 +1,63 @@
+# backend/src/routes/mood_async.py
+"""/api/mood on the async database path (served instead of routes/mood.py when DB_ASYNC=1)."""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import Optional
+import asyncio
+from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+from ..database import get_async_session, get_async_read_session
+from ..crud_mood import create_mood_async, bulk_create_moods_async, page_moods_for_user_async, avg_mood_for_user_async
+from ..pagination import PAGE_SIZE_MAX, InvalidCursor
+from ..data_versions import get_version_async, make_etag, not_modified
+from ..routes.auth import get_current_user_async
+from ..ml.scoring import score_text, score_texts
+from ..write_queue import WRITE_QUEUE, WRITE_QUEUE_MOODS, enqueue_mood
+from .mood import MoodIn, MoodOut, MoodBulkIn, validate_bulk, score_chunks, scored_entries, bulk_report
+
+router = APIRouter(prefix="/api/mood", tags=["mood"])
+
+@router.post("", response_model=MoodOut)
+async def post_mood(payload: MoodIn, current_user = Depends(get_current_user_async), session = Depends(get_async_session)):
+    # model inference blocks, so it runs off the event loop
+    scores, risk_level, explanation = await run_in_threadpool(score_text, payload.text or "")
+    compound = float(scores.get("compound", 0.0))
+    if WRITE_QUEUE and WRITE_QUEUE_MOODS:
+        date = payload.date or datetime.utcnow()
+        mood_id = await asyncio.wrap_future(enqueue_mood(current_user.id, payload.text, date, compound, risk_level))
+        return {"id": mood_id, "user_id": current_user.id, "text": payload.text, "date": date, "sentiment": compound, "risk": risk_level}
+    m = await create_mood_async(session, user_id=current_user.id, text=payload.text, date=payload.date, sentiment=compound, risk=risk_level)
+    return m
+
+@router.get("", response_model=list[MoodOut])
+async def get_moods(request: Request, response: Response, limit: int = Query(500, ge=1, le=PAGE_SIZE_MAX), cursor: Optional[str] = None,
+                    current_user = Depends(get_current_user_async), session = Depends(get_async_read_session)):
+    version = await get_version_async(session, current_user.id, "mood")
+    cached = not_modified(request, response, make_etag(request, current_user.id, current_user.id, "mood", version))
+    if cached:
+        return cached
+    try:
+        page = await page_moods_for_user_async(session, user_id=current_user.id, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(page.headers())
+    return page.items
+
+@router.get("/analytics")
+async def get_analytics(request: Request, response: Response, current_user = Depends(get_current_user_async), session = Depends(get_async_read_session)):
+    version = await get_version_async(session, current_user.id, "mood")
+    cached = not_modified(request, response, make_etag(request, current_user.id, current_user.id, "mood", version, daily=True))
+    if cached:
+        return cached
+    avg7 = await avg_mood_for_user_async(session, current_user.id, days=7)
+    avg30 = await avg_mood_for_user_async(session, current_user.id, days=30)
+    return {"avg_7_days": avg7, "avg_30_days": avg30}
+
+@router.post("/bulk")
+async def post_moods_bulk(payload: MoodBulkIn, current_user = Depends(get_current_user_async), session = Depends(get_async_session)):
+    results, valid = validate_bulk(payload)
+    scored = []
+    for texts in score_chunks(valid):
+        scored.extend(await run_in_threadpool(score_texts, texts))
+    entries = scored_entries(valid, scored)
+    ids = await bulk_create_moods_async(session, current_user.id, entries) if entries else []
+    return bulk_report(results, valid, entries, ids)
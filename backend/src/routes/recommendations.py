@@ -1,27 +1,25 @@
 # backend/src/routes/recommendations.py
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, Depends
 from sqlmodel import Session # type: ignore
 from typing import Dict
 
-from ..database import get_session
+from ..database import get_read_session
+from ..routes.auth import get_optional_user
 from ..ml.recommendations import generate_recommendations
+from ..user_context import EMPTY_CONTEXT, context_cache
 
 router = APIRouter(prefix="/api/recommendations", tags=["recommendations"])
 
 
 @router.get("")
-def get_recommendations(request: Request, session: Session = Depends(get_session)):
+def get_recommendations(current_user = Depends(get_optional_user), session: Session = Depends(get_read_session)):
     """
-    Return prioritized recommendations. Works for anonymous users as well as authenticated users.
+    Return prioritized recommendations. Works for anonymous users as well as authenticated users;
+    for the latter the context (latest sentiment/risk, 7/30-day averages) comes from the
+    per-user context cache, and the list for its bucket is precomputed.
     """
-    # Default (anonymous) context
-    context: Dict = {
-        "latest_mood_sentiment": None,
-        "latest_risk": None,
-        "avg_7_days": None,
-        "avg_30_days": None,
-    }
-
-    # If you later extract a user id from the token, you can populate context here.
+    context: Dict = dict(EMPTY_CONTEXT)
+    if current_user is not None:
+        context = context_cache.load(session, current_user.id)
     recs = generate_recommendations(context)
     return {"context": context, "recommendations": recs}
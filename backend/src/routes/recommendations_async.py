@@ -0,0 +1,20 @@
+# backend/src/routes/recommendations_async.py
+"""/api/recommendations on the async database path (served instead of routes/recommendations.py when DB_ASYNC=1)."""
+from fastapi import APIRouter, Depends
+from typing import Dict
+
+from ..database import get_async_read_session
+from ..routes.auth import get_optional_user_async
+from ..ml.recommendations import generate_recommendations
+from ..user_context import EMPTY_CONTEXT, context_cache
+
+router = APIRouter(prefix="/api/recommendations", tags=["recommendations"])
+
+
+@router.get("")
+async def get_recommendations(current_user = Depends(get_optional_user_async), session = Depends(get_async_read_session)):
+    context: Dict = dict(EMPTY_CONTEXT)
+    if current_user is not None:
+        context = await context_cache.load_async(session, current_user.id)
+    recs = generate_recommendations(context)
+    return {"context": context, "recommendations": recs}
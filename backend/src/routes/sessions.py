@@ -1,11 +1,13 @@
 # backend/src/routes/sessions.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 from sqlmodel import Session # type: ignore
-from ..database import get_session
-from ..crud_sessions import create_session, list_sessions
+from ..database import get_session, get_read_session
+from ..crud_sessions import create_session, page_sessions
+from ..pagination import PAGE_SIZE_MAX, InvalidCursor
+from ..data_versions import get_version, make_etag, not_modified
 from ..routes.auth import get_current_user
 from ..models import Session as SessionModel  # optional alias
 
@@ -46,17 +48,31 @@ def post_session(payload: SessionIn, current_user = Depends(get_current_user), s
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not create session: {str(e)}")
 
 @router.get("", response_model=List[dict])
-def get_sessions(patient_id: Optional[int] = None, therapist_id: Optional[int] = None, current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+def get_sessions(request: Request, response: Response, patient_id: Optional[int] = None, therapist_id: Optional[int] = None,
+                 limit: int = Query(200, ge=1, le=PAGE_SIZE_MAX), cursor: Optional[str] = None,
+                 current_user = Depends(get_current_user), session: Session = Depends(get_read_session)):
     """
     Therapist: may query their sessions (therapist_id defaults to current_user.id)
     Patient: may query their sessions (patient_id defaults to current_user.id)
+    Most recent first, `limit` per page; follow X-Next-Cursor / X-Prev-Cursor with ?cursor=.
+    Conditional on the listed therapist's (or patient's) "sessions" data version.
     """
     if current_user.role == "therapist":
         tid = therapist_id or current_user.id
-        rows = list_sessions(session, patient_id=patient_id, therapist_id=tid)
-        return [r.dict() for r in rows]
+        filters = {"patient_id": patient_id, "therapist_id": tid}
+        owner = tid
     elif current_user.role == "patient":
-        rows = list_sessions(session, patient_id=current_user.id)
-        return [r.dict() for r in rows]
+        filters = {"patient_id": current_user.id}
+        owner = current_user.id
     else:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    version = get_version(session, owner, "sessions")
+    cached = not_modified(request, response, make_etag(request, current_user.id, owner, "sessions", version))
+    if cached:
+        return cached
+    try:
+        page = page_sessions(session, limit=limit, cursor=cursor, **filters)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(page.headers())
+    return [r.dict() for r in page.items]
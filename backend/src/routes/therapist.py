@@ -1,40 +1,56 @@
 # backend/src/routes/therapist.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select # type: ignore
-from ..database import get_session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import Optional
+from sqlmodel import Session # type: ignore
+from ..database import get_read_session
 from ..models import User
 from ..routes.auth import get_current_user
 from ..deps import require_role
-from ..crud_mood import list_moods_for_user, avg_mood_for_user
+from ..crud_mood import list_moods_for_user, patient_roster, ROSTER_SORTS
 from ..crud_sessions import list_sessions
 from ..crud_bookings import list_bookings
+from ..cohort import cohort_cache, COHORT_MAX_DAYS, COHORT_SORTS
+from ..mood_state import get_mood_state, state_payload
 
 router = APIRouter(prefix="/api/therapist", tags=["therapist"])
 
 @router.get("/patients")
-def list_patients(current_user = Depends(require_role("therapist")), session: Session = Depends(get_session)):
-    # List all patients with their latest mood & avg mood
-    stmt = select(User).where(User.role == "patient")
-    patients = session.exec(stmt).all()
-    out = []
-    for p in patients:
-        moods = list_moods_for_user(session, p.id, limit=1)
-        latest = moods[0] if moods else None
-        avg7 = avg_mood_for_user(session, p.id, days=7)
-        avg30 = avg_mood_for_user(session, p.id, days=30)
-        out.append({
-            "id": p.id,
-            "name": p.name,
-            "email": p.email,
-            "latest_mood_sentiment": latest.sentiment if latest else None,
-            "latest_mood_risk": latest.risk if latest else None,
-            "avg_7_days": avg7,
-            "avg_30_days": avg30
-        })
-    return out
+def list_patients(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="page size; omitted returns every patient"),
+    offset: int = Query(0, ge=0),
+    sort: str = Query("id", description="id | name | risk | sentiment | deterioration"),
+    current_user = Depends(require_role("therapist")),
+    session: Session = Depends(get_read_session),
+):
+    # List patients with their latest mood & avg mood (single aggregate query; paginated only when `limit` is given)
+    if sort not in ROSTER_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(ROSTER_SORTS)}")
+    rows, total = patient_roster(session, limit=limit, offset=offset, sort=sort)
+    response.headers["X-Total-Count"] = str(total)
+    return rows
+
+@router.get("/cohort")
+def cohort_analytics(
+    days: int = Query(90, ge=7, le=COHORT_MAX_DAYS),
+    sort: str = Query("trend", description="trend | volatility | high_share | avg_7_days"),
+    limit: int = Query(50, ge=0, le=1000),
+    current_user = Depends(require_role("therapist")),
+    session: Session = Depends(get_read_session),
+):
+    """
+    Mood trends across the caller's caseload (patients with a booking or
+    session with them) over the last `days` days: summary figures, the daily
+    cohort mean with 7/30-day rolling means, and the first `limit` patients
+    ordered by `sort` (steepest decline, most volatile, highest HIGH share or
+    lowest 7-day average first).
+    """
+    if sort not in COHORT_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(COHORT_SORTS)}")
+    return cohort_cache.load(session, current_user.id, days).analyze(days=days, sort=sort, limit=limit)
 
 @router.get("/patient/{patient_id}")
-def patient_detail(patient_id: int, current_user = Depends(require_role("therapist")), session: Session = Depends(get_session)):
+def patient_detail(patient_id: int, current_user = Depends(require_role("therapist")), session: Session = Depends(get_read_session)):
     p = session.get(User, patient_id)
     if not p:
         raise HTTPException(status_code=404, detail="Patient not found")
@@ -45,6 +61,7 @@ def patient_detail(patient_id: int, current_user = Depends(require_role("therapi
         "id": p.id,
         "name": p.name,
         "email": p.email,
+        "deterioration": state_payload(get_mood_state(session, p.id)),
         "moods": moods,
         "sessions": sessions,
         "bookings": bookings
@@ -0,0 +1,380 @@
+# backend/src/scheduler.py
+"""
+In-memory booking calendars for conflict checks and auto-booking.
+
+Every booking occupies [datetime, datetime + BOOKING_SLOT_MINUTES). Each
+therapist's upcoming bookings are kept as a sorted list of start times, so
+"does this overlap anything?" and "next free slot after t" are a bisect plus
+a walk over back-to-back bookings. Auto-booking takes the earliest slot across
+everyone, preferring the therapist with the fewest upcoming bookings on ties:
+a heap of (next free slot, load, therapist) for the current earliest start
+answers that from the top, and only therapists whose calendar changed since
+are re-pushed, so a full pass over the roster happens once per grid step
+rather than once per request.
+
+Calendars are loaded per therapist on first use (all at once for
+auto-booking) and kept in sync by crud_bookings: a write first takes a hold
+on its slot (check + reserve under one lock, so two requests can't both pass),
+then confirms or releases it after the commit. Calendars older than
+SCHEDULER_RESYNC_S are reloaded, which bounds drift from writes made by other
+processes and drops bookings that have ended (they never block a search,
+which starts after now, but they count towards load until then).
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlmodel import Session, select # type: ignore
+
+from .database import engine
+from .models import Booking, User
+
+BOOKING_SLOT_MINUTES = int(os.getenv("BOOKING_SLOT_MINUTES", "60"))
+# auto-booking: earliest start (minutes from now) and the grid slots are aligned to
+SCHEDULER_LEAD_MINUTES = int(os.getenv("SCHEDULER_LEAD_MINUTES", "60"))
+SCHEDULER_GRID_MINUTES = int(os.getenv("SCHEDULER_GRID_MINUTES", "15"))
+SCHEDULER_RESYNC_S = float(os.getenv("SCHEDULER_RESYNC_S", "60"))
+# statuses that give the slot back
+FREE_STATUSES = ("cancelled", "canceled")
+
+
+class BookingConflict(Exception):
+    def __init__(self, therapist_id: int, booking_id: Optional[int]):
+        self.therapist_id = therapist_id
+        self.booking_id = booking_id
+        super().__init__(f"Therapist {therapist_id} already has a booking in that slot")
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+def to_ts(dt: datetime) -> int:
+    """Epoch seconds; naive datetimes are UTC, as stored."""
+    if dt.tzinfo is None:
+        return int((dt - _EPOCH).total_seconds())
+    return int(dt.timestamp())
+
+def from_ts(ts: int) -> datetime:
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None)
+
+def is_active(status: Optional[str]) -> bool:
+    return (status or "scheduled") not in FREE_STATUSES
+
+
+class Calendar:
+    """One therapist's upcoming bookings, sorted by start."""
+    __slots__ = ("starts", "ids", "loaded_at")
+
+    def __init__(self, loaded_at: float):
+        self.starts: List[int] = []
+        self.ids: List[int] = []
+        self.loaded_at = loaded_at
+
+    def add(self, start: int, booking_id: int):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ids.insert(i, booking_id)
+
+    def _find(self, start: int, booking_id: int) -> int:
+        i = bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.ids[i] == booking_id:
+                return i
+            i += 1
+        return -1
+
+    def has(self, start: int, booking_id: int) -> bool:
+        return self._find(start, booking_id) >= 0
+
+    def remove(self, start: int, booking_id: int) -> bool:
+        i = self._find(start, booking_id)
+        if i < 0:
+            return False
+        del self.starts[i]
+        del self.ids[i]
+        return True
+
+    def conflict(self, start: int, length: int, exclude: Optional[int] = None) -> Optional[int]:
+        """Id of a booking overlapping [start, start + length), if any."""
+        i = bisect_right(self.starts, start - length)
+        while i < len(self.starts) and self.starts[i] < start + length:
+            if self.ids[i] != exclude:
+                return self.ids[i]
+            i += 1
+        return None
+
+    def next_free(self, start: int, length: int, grid: int) -> int:
+        """Earliest grid-aligned t >= start with [t, t + length) free."""
+        i = bisect_right(self.starts, start - length)
+        while i < len(self.starts) and self.starts[i] < start + length:
+            start = _align(self.starts[i] + length, grid)
+            i = bisect_right(self.starts, start - length, lo=i)
+        return start
+
+def _align(ts: int, grid: int) -> int:
+    return -(-ts // grid) * grid
+
+
+class Hold:
+    """A reserved slot, confirmed or released once the booking is (not) committed."""
+    __slots__ = ("therapist_id", "start", "key")
+
+    def __init__(self, therapist_id: int, start: int, key: int):
+        self.therapist_id = therapist_id
+        self.start = start
+        self.key = key
+
+    @property
+    def datetime(self) -> datetime:
+        return from_ts(self.start)
+
+
+class Scheduler:
+    def __init__(self, engine, slot_minutes: int = BOOKING_SLOT_MINUTES, grid_minutes: int = SCHEDULER_GRID_MINUTES,
+                 resync_s: float = SCHEDULER_RESYNC_S):
+        self.engine = engine
+        self.length = slot_minutes * 60
+        self.grid = max(1, grid_minutes) * 60
+        self.resync_s = resync_s
+        self._lock = threading.RLock()
+        self._calendars: Dict[int, Calendar] = {}
+        # upcoming bookings per roster therapist; bumping _version invalidates their frontier entry
+        self._load: Dict[int, int] = {}
+        self._version: Dict[int, int] = {}
+        self._dirty: set = set()
+        # (next free start, load, therapist_id, version) for earliest start _frontier_t0
+        self._frontier: List[tuple] = []
+        self._frontier_t0: Optional[int] = None
+        # therapists eligible for auto-booking
+        self._roster: set = set()
+        # confirm/discard log kept while a load's query is in flight
+        self._journal: Optional[List[tuple]] = None
+        self._loading = 0
+        self._roster_at: Optional[float] = None
+        # holds get negative keys until their booking id is known
+        self._hold_keys = itertools.count(-1, -1)
+        self._stats = {"loads": 0, "roster_loads": 0, "holds": 0, "conflicts": 0, "auto_bookings": 0, "frontier_rebuilds": 0}
+
+    # -- loading -------------------------------------------------------------
+
+    def _stale(self, loaded_at: Optional[float]) -> bool:
+        return loaded_at is None or (self.resync_s > 0 and time.monotonic() - loaded_at > self.resync_s)
+
+    def needs_load(self, therapist_id: int) -> bool:
+        cal = self._calendars.get(therapist_id)
+        return cal is None or self._stale(cal.loaded_at)
+
+    def _upcoming(self, therapist_ids: Optional[Iterable[int]] = None):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.length)
+        stmt = select(Booking.therapist_id, Booking.id, Booking.datetime, Booking.status).where(Booking.datetime > cutoff)
+        if therapist_ids is not None:
+            stmt = stmt.where(Booking.therapist_id.in_(list(therapist_ids)))
+        with Session(self.engine) as session:
+            return session.exec(stmt).all()
+
+    def _begin_load(self) -> int:
+        """Start journalling confirm/discard so a load can replay what it raced with."""
+        with self._lock:
+            if self._journal is None:
+                self._journal = []
+            self._loading += 1
+            return len(self._journal)
+
+    def _install(self, therapist_ids: Iterable[int], rows, since: int, roster: bool = False):
+        """Build calendars from rows, then swap them in; with roster=True they replace the whole roster."""
+        fresh_rows: Dict[int, list] = {tid: [] for tid in therapist_ids}
+        for tid, bid, dt, status in rows:
+            entries = fresh_rows.get(tid)
+            if entries is not None and is_active(status):
+                entries.append((to_ts(dt), bid))
+        now = time.monotonic()
+        fresh = {}
+        for tid, entries in fresh_rows.items():
+            entries.sort()
+            cal = fresh[tid] = Calendar(now)
+            cal.starts = [e[0] for e in entries]
+            cal.ids = [e[1] for e in entries]
+        with self._lock:
+            if roster:
+                for tid in set(self._calendars) - set(fresh):
+                    self._calendars.pop(tid)
+                self._roster = set(fresh)
+                self._load.clear()
+                self._frontier_t0 = None
+                self._roster_at = time.monotonic()
+                self._stats["roster_loads"] += 1
+            for tid, cal in fresh.items():
+                old = self._calendars.get(tid)
+                if old is not None:
+                    # keep holds that haven't been confirmed yet
+                    for start, key in zip(old.starts, old.ids):
+                        if key < 0:
+                            cal.add(start, key)
+            # writes that committed while the query ran may be missing from (or stale in) its rows
+            for op, tid, start, bid in self._journal[since:]:
+                cal = fresh.get(tid)
+                if cal is None:
+                    continue
+                if op == "add" and not cal.has(start, bid):
+                    cal.add(start, bid)
+                elif op == "remove":
+                    cal.remove(start, bid)
+            for tid, cal in fresh.items():
+                self._calendars[tid] = cal
+                self._set_load(tid, len(cal.starts))
+            self._loading -= 1
+            if not self._loading:
+                self._journal = None
+            self._stats["loads"] += len(fresh)
+
+    def _record(self, op: str, tid: int, start: int, bid: int):
+        if self._journal is not None:
+            self._journal.append((op, tid, start, bid))
+
+    def load(self, therapist_id: int):
+        """(Re)load one therapist's upcoming bookings."""
+        since = self._begin_load()
+        self._install([therapist_id], self._upcoming([therapist_id]), since)
+
+    def load_all(self):
+        """(Re)load the therapist roster and every calendar, in two queries (run outside the lock)."""
+        since = self._begin_load()
+        with Session(self.engine) as session:
+            roster = session.exec(select(User.id).where(User.role == "therapist")).all()
+        self._install(roster, self._upcoming(), since, roster=True)
+
+    def forget(self, therapist_id: Optional[int] = None):
+        """
+        Drop one therapist's calendar, or all of them, so they are reloaded on
+        next use (role changes, bulk deletes that bypass crud_bookings).
+        """
+        with self._lock:
+            if therapist_id is None:
+                self._calendars.clear()
+                self._load.clear()
+                self._frontier_t0 = None
+            else:
+                self._drop(therapist_id)
+            self._roster_at = None
+
+    def _drop(self, tid: int):
+        self._calendars.pop(tid, None)
+        self._load.pop(tid, None)
+        self._roster.discard(tid)
+        self._version[tid] = self._version.get(tid, 0) + 1
+
+    def _calendar(self, therapist_id: int) -> Calendar:
+        if self.needs_load(therapist_id):
+            self.load(therapist_id)
+        return self._calendars[therapist_id]
+
+    # -- load / frontier ---------------------------------------------------------
+
+    def _set_load(self, tid: int, load: int):
+        """Record a calendar change: its frontier entry is stale from now on."""
+        if tid not in self._roster:
+            return
+        self._load[tid] = load
+        self._version[tid] = self._version.get(tid, 0) + 1
+        self._dirty.add(tid)
+
+    def _entry(self, tid: int, t0: int) -> tuple:
+        start = self._calendars[tid].next_free(t0, self.length, self.grid)
+        return (start, self._load.get(tid, 0), tid, self._version.get(tid, 0))
+
+    def _refresh_frontier(self, t0: int):
+        if self._frontier_t0 != t0 or len(self._frontier) > 4 * len(self._roster) + 64:
+            self._frontier = [self._entry(tid, t0) for tid in self._roster if tid in self._calendars]
+            heapq.heapify(self._frontier)
+            self._frontier_t0 = t0
+            self._stats["frontier_rebuilds"] += 1
+        else:
+            for tid in self._dirty:
+                if tid in self._roster and tid in self._calendars:
+                    heapq.heappush(self._frontier, self._entry(tid, t0))
+        self._dirty.clear()
+        # drop entries superseded by a later change
+        while self._frontier and self._frontier[0][3] != self._version.get(self._frontier[0][2], 0):
+            heapq.heappop(self._frontier)
+
+    # -- holds ----------------------------------------------------------------
+
+    def _reserve(self, tid: int, cal: Calendar, start: int) -> Hold:
+        hold = Hold(tid, start, next(self._hold_keys))
+        cal.add(start, hold.key)
+        self._set_load(tid, len(cal.starts))
+        self._stats["holds"] += 1
+        return hold
+
+    def hold(self, therapist_id: int, dt: datetime, exclude: Optional[int] = None) -> Hold:
+        """
+        Reserve dt for therapist_id or raise BookingConflict. `exclude` is the
+        booking being moved (it doesn't conflict with itself).
+        """
+        cal = self._calendar(therapist_id)
+        start = to_ts(dt)
+        with self._lock:
+            cal = self._calendars.get(therapist_id, cal)
+            other = cal.conflict(start, self.length, exclude)
+            if other is not None:
+                self._stats["conflicts"] += 1
+                # an unconfirmed hold has no booking id yet
+                raise BookingConflict(therapist_id, other if other > 0 else None)
+            return self._reserve(therapist_id, cal, start)
+
+    def hold_earliest(self, after: Optional[datetime] = None) -> Optional[Hold]:
+        """
+        Reserve the earliest free slot at or after `after` (default: now +
+        SCHEDULER_LEAD_MINUTES) across all therapists, least-loaded first on
+        ties. None if there are no therapists.
+        """
+        if self._stale(self._roster_at):
+            self.load_all()
+        t0 = _align(to_ts(after) if after else int(time.time()) + SCHEDULER_LEAD_MINUTES * 60, self.grid)
+        with self._lock:
+            self._refresh_frontier(t0)
+            if not self._frontier:
+                return None
+            start, _, tid, _ = self._frontier[0]
+            self._stats["auto_bookings"] += 1
+            return self._reserve(tid, self._calendars[tid], start)
+
+    def confirm(self, hold: Hold, booking_id: int):
+        """The held booking was committed as booking_id."""
+        with self._lock:
+            cal = self._calendars.get(hold.therapist_id)
+            # a reload may already have picked the committed row up
+            self._record("add", hold.therapist_id, hold.start, booking_id)
+            if cal is not None and cal.remove(hold.start, hold.key):
+                if not cal.has(hold.start, booking_id):
+                    cal.add(hold.start, booking_id)
+                self._set_load(hold.therapist_id, len(cal.starts))
+
+    def release(self, hold: Hold):
+        """The held booking was not written; give the slot back."""
+        self.discard(hold.therapist_id, hold.datetime, hold.key)
+
+    def discard(self, therapist_id: int, dt: datetime, booking_id: int):
+        """A booking left this slot (moved, cancelled or deleted)."""
+        with self._lock:
+            self._record("remove", therapist_id, to_ts(dt), booking_id)
+            cal = self._calendars.get(therapist_id)
+            if cal is not None and cal.remove(to_ts(dt), booking_id):
+                self._set_load(therapist_id, len(cal.starts))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "therapists": len(self._calendars),
+                "bookings_indexed": sum(len(c.starts) for c in self._calendars.values()),
+                "frontier_size": len(self._frontier),
+                "slot_minutes": self.length // 60,
+                **self._stats,
+            }
+
+
+scheduler = Scheduler(engine)
@@ -0,0 +1,221 @@
+# backend/src/user_context.py
+"""
+Per-user mood context for recommendations: latest sentiment and risk, and
+the 7/30-day sentiment averages.
+
+Building it from the database takes a few queries (latest Mood, last 30 days
+of MoodDaily), so entries are cached per user (CONTEXT_CACHE_TTL_S,
+LRU-bounded by CONTEXT_CACHE_MAX_ENTRIES). An entry keeps per-day sums rather
+than the averages, so mood writes update it in place (record_moods, called by
+crud_mood after each commit) and the averages are computed at read time for
+the current window, with the same day cutoff as crud_mood.avg_mood_for_user.
+
+Races with writers: a load that a write's post-commit hook overtook is not
+cached (it may predate the row), and an entry ignores moods at or below the
+highest mood id its load could see (the row is already in its sums). Ids
+follow commit order on SQLite's single writer. Writes from other processes
+show up within the TTL.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func # type: ignore
+from sqlmodel import select # type: ignore
+
+from .models import Mood, MoodDaily
+
+CONTEXT_CACHE = os.getenv("CONTEXT_CACHE", "1") not in ("0", "false", "False")
+CONTEXT_CACHE_TTL_S = float(os.getenv("CONTEXT_CACHE_TTL_S", "300"))
+CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("CONTEXT_CACHE_MAX_ENTRIES", "10000"))
+CONTEXT_WINDOW_DAYS = 30
+
+EMPTY_CONTEXT = {"latest_mood_sentiment": None, "latest_risk": None, "avg_7_days": None, "avg_30_days": None}
+
+
+def _avg(days: Dict[date, list], cutoff: date) -> Optional[float]:
+    total = count = 0
+    for day, (s, n) in days.items():
+        if day >= cutoff:
+            total += s
+            count += n
+    return round(total / count, 2) if count else None
+
+
+class MoodContext:
+    """One user's cached context: the latest entry plus per-day (sentiment sum, count)."""
+    __slots__ = ("latest", "days", "high_water", "expires")
+
+    def __init__(self, latest: Optional[tuple], days: Dict[date, list], high_water: int, expires: float):
+        self.latest = latest  # ((date, id), sentiment, risk)
+        self.days = days
+        self.high_water = high_water
+        self.expires = expires
+
+    def record(self, mood_id: int, when: datetime, sentiment: Optional[float], risk: Optional[str]):
+        if mood_id <= self.high_water:
+            return
+        if self.latest is None or (when, mood_id) > self.latest[0]:
+            self.latest = ((when, mood_id), sentiment, risk)
+        # same accounting as the MoodDaily rollup
+        day = self.days.setdefault(when.date(), [0.0, 0])
+        day[0] += float(sentiment or 0.0)
+        day[1] += 1
+
+    def as_context(self, now: datetime = None) -> dict:
+        now = now or datetime.utcnow()
+        today = now.date()
+        oldest = today - timedelta(days=CONTEXT_WINDOW_DAYS - 1)
+        for day in [d for d in self.days if d < oldest]:
+            del self.days[day]
+        return {
+            "latest_mood_sentiment": self.latest[1] if self.latest else None,
+            "latest_risk": self.latest[2] if self.latest else None,
+            "avg_7_days": _avg(self.days, today - timedelta(days=7 - 1)),
+            "avg_30_days": _avg(self.days, oldest),
+        }
+
+
+def _latest_stmt(user_id: int):
+    return (select(Mood.id, Mood.date, Mood.sentiment, Mood.risk).where(Mood.user_id == user_id)
+            .order_by(Mood.date.desc(), Mood.id.desc()).limit(1))
+
+def _days_stmt(user_id: int):
+    oldest = datetime.utcnow().date() - timedelta(days=CONTEXT_WINDOW_DAYS - 1)
+    return (select(MoodDaily.day, MoodDaily.sentiment_sum, MoodDaily.count)
+            .where(MoodDaily.user_id == user_id).where(MoodDaily.day >= oldest))
+
+def _high_water_stmt():
+    return select(func.max(Mood.id))
+
+def _build(latest_row, day_rows, high_water) -> tuple:
+    latest = ((latest_row[1], latest_row[0]), latest_row[2], latest_row[3]) if latest_row else None
+    return latest, {d: [s, n] for d, s, n in day_rows}, high_water or 0
+
+
+class UserContextCache:
+    def __init__(self, ttl_s: float = CONTEXT_CACHE_TTL_S, max_entries: int = CONTEXT_CACHE_MAX_ENTRIES, enabled: bool = CONTEXT_CACHE):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[int, MoodContext]" = OrderedDict()
+        # user_id -> time of the last write; a load that started before it is not cached
+        self._written: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.updates = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires <= now:
+                del self._entries[user_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry.as_context()
+
+    def _put(self, user_id: int, latest, days, high_water: int, started: float) -> dict:
+        entry = MoodContext(latest, days, high_water, time.monotonic() + self.ttl_s)
+        context = entry.as_context()
+        with self._lock:
+            self.loads += 1
+            if not self.enabled or self._written.get(user_id, 0.0) >= started:
+                return context
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return context
+
+    def load(self, session, user_id: int) -> dict:
+        """Cached context, or build it from the database and cache it."""
+        context = self.get(user_id)
+        if context is not None:
+            return context
+        started = time.monotonic()
+        # one read transaction, so the three agree
+        high_water = session.exec(_high_water_stmt()).one()
+        latest = session.exec(_latest_stmt(user_id)).first()
+        days = session.exec(_days_stmt(user_id)).all()
+        return self._put(user_id, *_build(latest, days, high_water), started)
+
+    async def load_async(self, session, user_id: int) -> dict:
+        context = self.get(user_id)
+        if context is not None:
+            return context
+        started = time.monotonic()
+        high_water = (await session.exec(_high_water_stmt())).one()
+        latest = (await session.exec(_latest_stmt(user_id))).first()
+        days = (await session.exec(_days_stmt(user_id))).all()
+        return self._put(user_id, *_build(latest, days, high_water), started)
+
+    def record_moods(self, moods: Iterable):
+        """Fold committed moods (Mood objects or row dicts with an id) into cached entries."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for m in moods:
+                get = m.get if isinstance(m, dict) else lambda k, m=m: getattr(m, k)
+                user_id = get("user_id")
+                self._written[user_id] = now
+                entry = self._entries.get(user_id)
+                if entry is not None:
+                    entry.record(get("id"), get("date"), get("sentiment"), get("risk"))
+                    self.updates += 1
+            if len(self._written) > 4 * self.max_entries:
+                # only loads still in flight need these
+                self._written = {k: t for k, t in self._written.items() if now - t < 60}
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._written[user_id] = time.monotonic()
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "loads": self.loads,
+                # moods folded into a cached entry instead of dropping it
+                "incremental_updates": self.updates,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+context_cache = UserContextCache()
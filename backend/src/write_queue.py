@@ -0,0 +1,227 @@
+# backend/src/write_queue.py
+"""
+Group-commit writer for high-frequency inserts.
+
+On SQLite every commit is an fsync, so one commit per chat message caps write
+throughput at disk latency. Requests submit rows here instead; a background
+thread collects them (up to WRITE_QUEUE_MAX_BATCH rows, waiting at most
+WRITE_QUEUE_MAX_DELAY_MS after the oldest) and writes the whole batch in one
+transaction.
+
+Durability: a submitted row is on disk once its Future resolves. Callers that
+need the id (moods) wait for it; chat messages are fire-and-forget, so a crash
+can lose at most the last max-delay window of them. close() (called on
+shutdown and at interpreter exit) drains everything queued before returning.
+
+If a batch fails, each row is retried in its own transaction, so one bad row
+doesn't take its neighbours down with it.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert # type: ignore
+from sqlmodel import Session # type: ignore
+
+from .database import engine
+from .models import ChatMessage
+
+WRITE_QUEUE = os.getenv("WRITE_QUEUE", "1") not in ("0", "false", "False")
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "256"))
+WRITE_QUEUE_MAX_DELAY_MS = float(os.getenv("WRITE_QUEUE_MAX_DELAY_MS", "10"))
+# moods need their id in the response, so the request waits for the group commit
+WRITE_QUEUE_MOODS = os.getenv("WRITE_QUEUE_MOODS", "0") in ("1", "true", "True")
+
+# flush function: fn(session, rows) -> one result per row, inside the batch transaction
+FlushFn = Callable[[Session, List[dict]], List]
+
+
+class GroupCommitWriter:
+    def __init__(self, engine, max_batch: int = WRITE_QUEUE_MAX_BATCH, max_delay_ms: float = WRITE_QUEUE_MAX_DELAY_MS,
+                 name: str = "write-queue"):
+        self.engine = engine
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay = max(0.0, float(max_delay_ms)) / 1000.0
+        self.name = name
+        self._handlers: Dict[str, FlushFn] = {}
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        self.reset_stats()
+
+    def register(self, kind: str, fn: FlushFn):
+        self._handlers[kind] = fn
+
+    def reset_stats(self):
+        self._submitted = 0
+        self._batches = 0
+        self._rows = 0
+        self._max_batch_seen = 0
+        self._size_hist: Dict[int, int] = {}
+        self._flush_total = 0.0
+        self._flush_max = 0.0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._fallbacks = 0
+        self._failed_rows = 0
+
+    def submit(self, kind: str, row: dict) -> Future:
+        """Queue one row; the Future resolves to the flush function's result once committed."""
+        if kind not in self._handlers:
+            raise KeyError(f"{self.name}: no handler registered for {kind!r}")
+        fut: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed")
+            self._queue.append((kind, row, fut, time.perf_counter()))
+            self._submitted += 1
+            self._ensure_worker()
+            # wake the worker for a new batch, or early when the batch is full
+            if len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+                self._cond.notify()
+        return fut
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop accepting rows, flush everything queued and stop the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._worker.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            deadline = self._queue[0][3] + self.max_delay
+            while len(self._queue) < self.max_batch and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(len(self._queue), self.max_batch)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _write(self, items) -> List:
+        """Write items in one transaction; returns results aligned with items."""
+        by_kind: Dict[str, List[int]] = {}
+        for i, item in enumerate(items):
+            by_kind.setdefault(item[0], []).append(i)
+        results = [None] * len(items)
+        with Session(self.engine) as session:
+            for kind, idx in by_kind.items():
+                out = self._handlers[kind](session, [items[i][1] for i in idx])
+                for i, r in zip(idx, out):
+                    results[i] = r
+            session.commit()
+        return results
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            try:
+                results = self._write(batch)
+                outcomes = [(True, r) for r in results]
+                fallback = False
+            except Exception:
+                fallback = True
+                outcomes = []
+                for item in batch:
+                    try:
+                        outcomes.append((True, self._write([item])[0]))
+                    except Exception as e:
+                        outcomes.append((False, e))
+            finished = time.perf_counter()
+            for (_, _, fut, _), (ok, value) in zip(batch, outcomes):
+                if ok:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(value)
+            self._record(batch, started, finished, fallback, sum(1 for ok, _ in outcomes if not ok))
+
+    def _record(self, batch, started: float, finished: float, fallback: bool, failed: int):
+        size = len(batch)
+        latencies = [finished - b[3] for b in batch]
+        with self._cond:
+            self._batches += 1
+            self._rows += size
+            self._max_batch_seen = max(self._max_batch_seen, size)
+            self._size_hist[size] = self._size_hist.get(size, 0) + 1
+            self._flush_total += finished - started
+            self._flush_max = max(self._flush_max, finished - started)
+            self._latency_total += sum(latencies)
+            self._latency_max = max(self._latency_max, max(latencies))
+            self._fallbacks += 1 if fallback else 0
+            self._failed_rows += failed
+
+    def stats(self) -> dict:
+        with self._cond:
+            batches = self._batches or 1
+            rows = self._rows or 1
+            return {
+                "enabled": WRITE_QUEUE,
+                "max_batch": self.max_batch,
+                "max_delay_ms": self.max_delay * 1000,
+                "queue_depth": len(self._queue),
+                "submitted": self._submitted,
+                "rows_written": self._rows - self._failed_rows,
+                "failed_rows": self._failed_rows,
+                "batches": self._batches,
+                "avg_batch_size": round(self._rows / batches, 2),
+                "max_batch_size": self._max_batch_seen,
+                "batch_size_hist": {str(k): v for k, v in sorted(self._size_hist.items())},
+                "avg_flush_ms": round(self._flush_total / batches * 1000, 2),
+                "max_flush_ms": round(self._flush_max * 1000, 2),
+                # submit -> committed, per row
+                "avg_commit_latency_ms": round(self._latency_total / rows * 1000, 2),
+                "max_commit_latency_ms": round(self._latency_max * 1000, 2),
+                "fallbacks": self._fallbacks,
+            }
+
+
+def _flush_chat(session, rows: List[dict]) -> List[int]:
+    stmt = insert(ChatMessage).returning(ChatMessage.id, sort_by_parameter_order=True)
+    return session.execute(stmt, rows).scalars().all()
+
+def _flush_moods(session, rows: List[dict]) -> List[int]:
+    from .crud_mood import insert_mood_rows
+    return insert_mood_rows(session, rows)
+
+write_queue = GroupCommitWriter(engine)
+write_queue.register("chat", _flush_chat)
+write_queue.register("mood", _flush_moods)
+atexit.register(write_queue.close)
+
+def enqueue_chat_message(user_id: int, sender: str, text: str) -> Future:
+    """Queue a chat message; created_at is the time of the call, not of the flush."""
+    return write_queue.submit("chat", {"user_id": user_id, "sender": sender, "text": text, "created_at": datetime.utcnow()})
+
+def enqueue_mood(user_id: int, text: str, date: datetime = None, sentiment: float = None, risk: str = None) -> Future:
+    """Queue a mood entry; the Future resolves to its id once committed."""
+    row = {"user_id": user_id, "text": text, "date": date or datetime.utcnow(), "sentiment": sentiment, "risk": risk}
+    fut = write_queue.submit("mood", row)
+
+    def committed(f: Future):
+        # runs on the writer thread once the batch has committed
+        if f.exception() is None:
+            from .crud_mood import moods_committed
+            moods_committed([dict(row, id=f.result())])
+    fut.add_done_callback(committed)
+    return fut
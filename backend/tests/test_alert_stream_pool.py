@@ -0,0 +1,83 @@
+# backend/tests/test_alert_stream_pool.py
+"""
+An open /api/audit/high-risk/stream must not hold a pooled database
+connection: with DB_POOL_SIZE=2 / DB_MAX_OVERFLOW=0, two open streams still
+leave the sync routes their connections.
+
+Runs the app in-process on a scratch SQLite file (the engines are built at
+import, so the settings below only apply when this module imports src first).
+
+  cd backend && python -m pytest tests/test_alert_stream_pool.py
+"""
+import os
+import tempfile
+
+_DB = os.path.join(tempfile.mkdtemp(), "stream_pool.db")
+for key, value in {"DATABASE_URL": f"sqlite:///{_DB}", "DB_POOL_SIZE": "2", "DB_MAX_OVERFLOW": "0", "DB_POOL_TIMEOUT": "2",
+                   "SENTIMENT_BACKEND": "stub", "ALERT_HEARTBEAT_S": "0.2",
+                   "PRINCIPAL_CACHE": "0"}.items():
+    os.environ.setdefault(key, value)
+
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+from sqlmodel import Session # type: ignore
+
+from src import crud
+from src.auth_utils import create_access_token
+from src.database import DB_POOL_SIZE, DB_MAX_OVERFLOW, engine, read_engine, get_async_read_engine
+from src.main import app
+
+STREAMS = 2
+
+def _checked_out() -> int:
+    engines = {id(e): e for e in (engine, read_engine, get_async_read_engine().sync_engine)}.values()
+    return sum(e.pool.checkedout() for e in engines if hasattr(e.pool, "checkedout"))
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@pytest.fixture(scope="module")
+def base_url():
+    # a real server: TestClient buffers the whole response, and an SSE stream never ends
+    uvicorn = pytest.importorskip("uvicorn")
+    if DB_POOL_SIZE + DB_MAX_OVERFLOW > STREAMS:
+        pytest.skip("src.database was imported with a larger pool; run this module on its own")
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", timeout_graceful_shutdown=1))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        assert time.monotonic() < deadline and thread.is_alive(), "server did not start"
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(10)
+
+@pytest.fixture(scope="module")
+def auth(base_url):
+    with Session(engine) as s:
+        user = crud.create_user(s, "Stream Therapist", "stream@example.com", "x", "therapist")
+    return {"Authorization": f"Bearer {create_access_token(subject=str(user.id))}"}
+
+def test_open_streams_hold_no_connection(base_url, auth):
+    with httpx.Client(base_url=base_url, timeout=10) as client:
+        streams = [client.stream("GET", "/api/audit/high-risk/stream", headers=auth) for _ in range(STREAMS)]
+        responses = [s.__enter__() for s in streams]
+        try:
+            for r in responses:
+                assert r.status_code == 200
+                next(r.iter_lines())  # the retry: line
+            time.sleep(0.5)  # past the high-water mark query, waiting for alerts
+            assert _checked_out() == 0
+            # a sync route still gets a connection from the 2-connection pool
+            assert client.get("/api/audit/high-risk", headers=auth).status_code == 200
+        finally:
+            for s in streams:
+                s.__exit__(None, None, None)
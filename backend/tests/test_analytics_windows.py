@@ -0,0 +1,92 @@
+# backend/tests/test_analytics_windows.py
+"""
+Every 7/30-day average covers the same N calendar days including today:
+GET /api/therapist/cohort (summary and per-patient rows) and
+GET /api/mood/analytics agree with crud_mood.avg_mood_for_user, with moods
+on both sides of each cutoff.
+
+Runs the app in-process on a scratch SQLite file (the engines are built at
+import, so the settings below only apply when this module imports src first).
+
+  cd backend && python -m pytest tests/test_analytics_windows.py
+"""
+import os
+import tempfile
+
+_DB = os.path.join(tempfile.mkdtemp(), "analytics_windows.db")
+for key, value in {"DATABASE_URL": f"sqlite:///{_DB}", "SENTIMENT_BACKEND": "stub", "PRINCIPAL_CACHE": "0"}.items():
+    os.environ.setdefault(key, value)
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session # type: ignore
+
+pytest.importorskip("numpy")
+
+from src import crud
+from src.auth_utils import create_access_token
+from src.crud_mood import avg_mood_for_user, create_mood
+from src.database import engine
+from src.main import app
+from src.models import Booking
+
+# (days before today, sentiment) per patient; 6/7 and 29/30 straddle the cutoffs
+MOODS = [
+    [(0, 0.4), (6, 0.6), (7, -0.9), (7, -0.8), (29, 0.2), (30, -1.0)],
+    [(3, -0.5), (7, 0.9), (20, -0.3), (30, 0.7), (31, 0.7)],
+]
+
+def _bearer(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(subject=str(user_id))}"}
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture(scope="module")
+def cohort(client):
+    now = datetime.utcnow()
+    with Session(engine) as s:
+        therapist_id = crud.create_user(s, "Window Therapist", "windows-therapist@example.com", "x", "therapist").id
+        patients = []
+        for i, moods in enumerate(MOODS):
+            patient_id = crud.create_user(s, f"Window Patient {i}", f"windows-patient-{i}@example.com", "x", "patient").id
+            s.add(Booking(patient_id=patient_id, therapist_id=therapist_id, datetime=now + timedelta(days=60 + i)))
+            s.commit()
+            for ago, sentiment in moods:
+                create_mood(s, user_id=patient_id, text=None, date=now - timedelta(days=ago), sentiment=sentiment)
+            patients.append(patient_id)
+    return therapist_id, patients
+
+def _expected(patients: list, days: int) -> tuple:
+    """(per-patient averages, cohort average) from avg_mood_for_user."""
+    with Session(engine) as s:
+        per_patient = {pid: avg_mood_for_user(s, pid, days=days) for pid in patients}
+    # the cohort average weights each patient by their entries in the window
+    counts = {pid: sum(1 for ago, _ in moods if ago < days) for pid, moods in zip(patients, MOODS)}
+    total = sum(per_patient[pid] * counts[pid] for pid in patients if counts[pid])
+    return per_patient, total / sum(counts.values())
+
+@pytest.mark.parametrize("days", [7, 30])
+def test_cohort_matches_avg_mood_for_user(client, cohort, days):
+    therapist_id, patients = cohort
+    r = client.get("/api/therapist/cohort", params={"days": 30, "limit": 10}, headers=_bearer(therapist_id))
+    assert r.status_code == 200, r.text
+    body = r.json()
+    per_patient, cohort_avg = _expected(patients, days)
+
+    rows = {p["id"]: p for p in body["patients"]}
+    for pid in patients:
+        assert rows[pid][f"avg_{days}_days"] == pytest.approx(per_patient[pid], abs=0.01)
+    assert body["summary"][f"avg_{days}_days"] == pytest.approx(cohort_avg, abs=0.01)
+
+def test_mood_analytics_matches_avg_mood_for_user(client, cohort):
+    _, patients = cohort
+    for pid in patients:
+        r = client.get("/api/mood/analytics", headers=_bearer(pid))
+        assert r.status_code == 200, r.text
+        with Session(engine) as s:
+            assert r.json() == {"avg_7_days": avg_mood_for_user(s, pid, days=7), "avg_30_days": avg_mood_for_user(s, pid, days=30)}
@@ -0,0 +1,53 @@
+# backend/tests/test_cohort.py
+"""
+The cohort summary's 7/30-day averages cover the same N calendar days
+(including today) as the per-patient rows, so the summary is the
+count-weighted mean of the patients' windows.
+
+  cd backend && python -m pytest tests/test_cohort.py
+"""
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.cohort import CohortData, _LEAD
+
+TODAY = date(2026, 3, 31)
+DAYS = 90
+
+# (patient, days before today, sentiment sum, entries); entries on each side of both cutoffs
+ENTRIES = [
+    (1, 0, 0.8, 1), (1, 6, 1.2, 2), (1, 7, -3.0, 3), (1, 29, 0.5, 1), (1, 30, -2.0, 2),
+    (2, 3, -0.9, 1), (2, 7, 2.7, 3), (2, 20, -1.2, 2), (2, 31, 0.9, 1),
+    (3, 45, -0.6, 1),
+]
+
+def _window(n: int) -> dict:
+    """patient -> (sentiment sum, entries) over the last n days including today."""
+    out = {}
+    for pid, ago, s, c in ENTRIES:
+        if ago < n:
+            ps, pc = out.get(pid, (0.0, 0))
+            out[pid] = (ps + s, pc + c)
+    return out
+
+@pytest.fixture
+def result():
+    today_col = DAYS + _LEAD - 1
+    rows = np.array([(pid, today_col - ago, s, c, 0, 0) for pid, ago, s, c in ENTRIES], dtype=np.float64)
+    return CohortData([1, 2, 3], rows, TODAY, DAYS, high_water=0, expires=0.0).analyze(days=DAYS, limit=10)
+
+@pytest.mark.parametrize("n", [7, 30])
+def test_summary_is_weighted_mean_of_patient_windows(result, n):
+    window = _window(n)
+    rows = {p["id"]: p for p in result["patients"]}
+    for pid, (s, c) in window.items():
+        assert rows[pid][f"avg_{n}_days"] == pytest.approx(s / c, abs=0.01)
+    assert rows[3][f"avg_{n}_days"] is None
+
+    weighted = sum(rows[pid][f"avg_{n}_days"] * c for pid, (_, c) in window.items()) / sum(c for _, c in window.values())
+    assert result["summary"][f"avg_{n}_days"] == pytest.approx(weighted, abs=0.01)
+    exact = sum(s for s, _ in window.values()) / sum(c for _, c in window.values())
+    assert result["summary"][f"avg_{n}_days"] == pytest.approx(exact, abs=0.01)
@@ -0,0 +1,28 @@
+# backend/tests/test_db_concurrency.py
+"""
+A short run of bench/db_concurrency.py: concurrent writers and readers on a
+temporary SQLite file must not hit "database is locked" (or any other error).
+
+Runs in a subprocess because the bench configures the engines through the
+environment before importing src.
+
+  cd backend && python -m pytest tests/test_db_concurrency.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_concurrent_writers_and_readers_do_not_lock():
+    env = {**os.environ, "SENTIMENT_BACKEND": "stub"}
+    proc = subprocess.run(
+        [sys.executable, "-m", "bench.db_concurrency", "--writers", "4", "--readers", "8", "--seconds", "2", "--users", "10"],
+        cwd=BACKEND, env=env, capture_output=True, text=True, timeout=120,
+    )
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert report["lock_errors"] == 0, report
+    assert report["other_errors"] == 0, report
+    assert report["writes"] > 0 and report["reads"] > 0, report
+    assert proc.returncode == 0, proc.stderr
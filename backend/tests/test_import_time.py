@@ -0,0 +1,45 @@
+# backend/tests/test_import_time.py
+"""
+Importing the API (backend.src.main) must not load the ML stack: torch and
+transformers are imported on first use, not at startup (the enforced part of
+bench/import_time.py; the time budget stays in the bench).
+
+The probe runs in a fresh interpreter and also records import *attempts*, so
+an eager `import torch` is caught even where torch isn't installed.
+
+  cd backend && python -m pytest tests/test_import_time.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+from bench.import_time import REPO_ROOT
+
+HEAVY = ("torch", "transformers")
+
+PROBE = """
+import json, sys
+
+attempted = set()
+
+class Recorder:
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in %(heavy)r:
+            attempted.add(name.split(".")[0])
+        return None
+
+sys.meta_path.insert(0, Recorder())
+import backend.src.main
+loaded = sorted(m for m in %(heavy)r if m in sys.modules)
+print(json.dumps({"attempted": sorted(attempted), "loaded": loaded}))
+""" % {"heavy": HEAVY}
+
+def test_main_import_does_not_load_torch_or_transformers():
+    # the default sentiment backend, whatever other test modules have set
+    env = {k: v for k, v in os.environ.items() if k != "SENTIMENT_BACKEND"}
+    proc = subprocess.run([sys.executable, "-c", PROBE], cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert report["loaded"] == [], report
+    assert report["attempted"] == [], report
@@ -0,0 +1,35 @@
+# backend/tests/test_query_plans.py
+"""
+Every hot query (manage.HOT_QUERIES) is answered from an index on a freshly
+created and migrated SQLite database: no full table scan, no sort in a temp
+B-tree. The automated part of `python -m src.manage explain`, so a dropped
+or renamed index fails here.
+
+  cd backend && python -m pytest tests/test_query_plans.py
+"""
+import os
+import tempfile
+
+_DB = os.path.join(tempfile.mkdtemp(), "query_plans.db")
+for key, value in {"DATABASE_URL": f"sqlite:///{_DB}", "SENTIMENT_BACKEND": "stub"}.items():
+    os.environ.setdefault(key, value)
+
+import pytest
+
+from src.database import create_db_and_tables, engine
+from src.manage import HOT_QUERIES, query_plan_problems
+from src.migrations import run_migrations
+
+@pytest.fixture(scope="module")
+def conn():
+    if engine.dialect.name != "sqlite":
+        pytest.skip("query plans are checked on SQLite")
+    create_db_and_tables()
+    run_migrations(engine)
+    with engine.connect() as c:
+        yield c
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_uses_an_index(conn, name):
+    plan, problems = query_plan_problems(conn, HOT_QUERIES[name])
+    assert not problems, f"{name}: {' | '.join(plan)}"
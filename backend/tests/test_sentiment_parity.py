@@ -0,0 +1,49 @@
+# backend/tests/test_sentiment_parity.py
+"""
+Parity of the optimized sentiment backends against the fp32 pytorch pipeline
+on a fixed corpus (the automated part of bench/sentiment_backends.py).
+
+Skipped when torch/transformers (or onnxruntime, or an exported model for
+onnx) are missing, or when the model weights can't be loaded. The onnx check
+reads the exported graph from SENTIMENT_MODEL_DIR.
+
+  cd backend && python -m pytest tests/test_sentiment_parity.py
+"""
+import os
+
+import pytest
+
+from bench.sentiment_backends import CORPUS, compare
+from src.ml import sentiment_backends
+from src.ml.sentiment_bert import MODEL_NAME, _to_scores
+
+MODEL_DIR = os.getenv("SENTIMENT_MODEL_DIR", "")
+MIN_AGREEMENT = float(os.getenv("SENTIMENT_PARITY_MIN_AGREEMENT", "0.9"))
+TOLERANCE = float(os.getenv("SENTIMENT_PARITY_TOLERANCE", "0.05"))
+
+def _scores(backend: str, model_path: str) -> dict:
+    try:
+        pipe = sentiment_backends.build(backend, model_path, -1)
+    except (OSError, ValueError) as e:
+        pytest.skip(f"{backend} model not available: {e}")
+    return {"results": [_to_scores(r) for r in pipe(CORPUS, batch_size=8)]}
+
+@pytest.fixture(scope="module")
+def reference():
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    return _scores("pytorch", MODEL_DIR or MODEL_NAME)
+
+def _assert_parity(reference, other):
+    parity = compare(reference, other, TOLERANCE)
+    assert parity["label_agreement"] >= MIN_AGREEMENT, parity
+    assert parity["within_tolerance"] >= MIN_AGREEMENT, parity
+
+def test_quantized_matches_pytorch(reference):
+    _assert_parity(reference, _scores("quantized", MODEL_DIR or MODEL_NAME))
+
+def test_onnx_matches_pytorch(reference):
+    pytest.importorskip("onnxruntime")
+    if not MODEL_DIR or not os.path.exists(os.path.join(MODEL_DIR, os.getenv("SENTIMENT_ONNX_FILE", "model.onnx"))):
+        pytest.skip("no exported ONNX model in SENTIMENT_MODEL_DIR (python -m src.ml.export_onnx --out DIR)")
+    _assert_parity(reference, _scores("onnx", MODEL_DIR))